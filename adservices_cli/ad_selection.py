@@ -15,14 +15,28 @@
 """Command for interacting with Protected Audience Ad Selection CLI Commands."""
 
 import base64
+import collections
+from collections.abc import Iterator
+import concurrent.futures
+import contextlib
 import gzip
+import itertools
 import json
+import os
+import subprocess
+import sys
+import uuid
+import zlib
 
-from google.protobuf.json_format import MessageToJson
 from google.protobuf.message import DecodeError
 
 import adb
+import async_adb
+import auction_result_cache
 import bidding_auction_servers_pb2
+import payload_size
+import profiler
+import proto_json
 import utilities
 
 _COMMAND_PREFIX = "ad-selection"
@@ -37,6 +51,18 @@ _GET_AD_SELECTION_DATA_COMMAND = "get-ad-selection-data"
 _VIEW_AUCTION_RESULT_COMMAND = "view-auction-result"
 _ARG_BUYER = "--buyer"
 _ARG_AD_SELECTION_ID = "--ad-selection-id"
+# Below this many compressed bytes of buyer inputs, starting worker processes
+# costs more than it saves.
+_PARALLEL_DECODE_MIN_BYTES = 256 * 1024
+_CHUNKS_PER_WORKER = 4
+# Auction results fetched per adb round trip.
+_VIEW_AUCTION_RESULTS_BATCH_SIZE = 16
+# Batches in flight per worker, which bounds the results held in memory.
+_BATCHES_PER_WORKER = 2
+_SERIAL_COMMAND = "getprop ro.serialno"
+_CACHED = "cached"
+_FETCHED = "fetched"
+_FAILED = "failed"
 
 
 class AdSelection:
@@ -52,8 +78,10 @@ class AdSelection:
   def __init__(
       self,
       adb_client: adb.AdbClient,
+      result_cache: auction_result_cache.AuctionResultCache | None = None,
   ):
     self._adb = adb_client
+    self._result_cache = result_cache
 
   def view_consented_debug(self) -> str:
     """View adtech consented debugging information on the device.
@@ -61,19 +89,11 @@ class AdSelection:
     Returns:
       Textual output of consented debug view command.
     """
-    view_output: str = self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _CONSENTED_DEBUG_COMMAND,
-            _CONSENTED_DEBUG_COMMAND_VIEW,
-            {},
+    return _format_consented_debug_view(
+        self._adb.execute_adservices_shell_command(
+            _consented_debug_command(_CONSENTED_DEBUG_COMMAND_VIEW)
         )
     )
-    try:
-      json_obj = json.loads(view_output)
-      return json.dumps(json_obj, indent=4)
-    except ValueError as unused_error:
-      return view_output
 
   def enable_consented_debug(
       self,
@@ -91,17 +111,7 @@ class AdSelection:
     """
 
     enable_output: str = self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _CONSENTED_DEBUG_COMMAND,
-            _CONSENTED_DEBUG_COMMAND_ENABLE,
-            {
-                _CONSENTED_DEBUG_COMMAND_ENABLE_SECRET_DEBUG_TOKEN: token,
-                _CONSENTED_DEBUG_COMMAND_ENABLE_EXPIRY_IN_HOURS: (
-                    expiry_in_hours
-                ),
-            },
-        )
+        _enable_consented_debug_command(token, expiry_in_hours)
     )
     print(enable_output)
     return self.view_consented_debug()
@@ -113,12 +123,7 @@ class AdSelection:
       Textual output of consented debug disable command.
     """
     return self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _CONSENTED_DEBUG_COMMAND,
-            _CONSENTED_DEBUG_COMMAND_DISABLE,
-            {},
-        )
+        _consented_debug_command(_CONSENTED_DEBUG_COMMAND_DISABLE)
     )
 
   def get_ad_selection_data(self, buyer: str = "") -> str:
@@ -133,105 +138,337 @@ class AdSelection:
     Returns:
       Textual output of get_ad_selection__data command.
     """
-    command_output = self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _GET_AD_SELECTION_DATA_COMMAND,
-            "",
-            {_ARG_BUYER: buyer} if buyer else {},
+    return _decode_ad_selection_data(
+        self._adb.execute_adservices_shell_command(
+            _get_ad_selection_data_command(buyer)
+        ),
+        buyer,
+    )
+
+  def view_auction_result(self, ad_selection_id: str) -> str:
+    """View the result of an auction.
+
+    Args:
+      ad_selection_id: Identifier for the auction, sometimes called "Generation
+        ID" in B&A terminology.
+
+    Returns:
+      Textual output of view_auction_result command.
+    """
+    return _decode_auction_result(
+        self._adb.execute_adservices_shell_command(
+            _view_auction_result_command(ad_selection_id)
         )
     )
-    try:
-      proto_json = json.loads(command_output.replace("\n", ""))
-      base64_decoded_str = base64.b64decode(proto_json.get("output_proto"))
-      if buyer:
-        print("Querying for buyer: " + buyer)
+
+  def view_auction_results(
+      self,
+      ad_selection_ids=(),
+      ids_file: str = "",
+      max_workers: int = 4,
+      output: str = "-",
+      cache: bool = True,
+  ) -> None:
+    """View the results of many auctions as NDJSON.
+
+    Results are fetched in batches, several batches at once, and written as
+    they arrive, one line per auction in the order of the IDs. Results never
+    change once written, so they are cached on disk by device serial and ID.
+
+    Args:
+      ad_selection_ids: identifiers of the auctions, comma separated.
+      ids_file: file with one ad selection ID per line, viewed after
+        `ad_selection_ids`.
+      max_workers: maximum number of batches fetched at once.
+      output: NDJSON file to write, or `-` for stdout.
+      cache: if true, read and write the on-disk result cache.
+    """
+    if max_workers < 1:
+      raise ValueError(f"max_workers must be at least 1, was {max_workers}.")
+    ids = itertools.chain(
+        _parse_ids(ad_selection_ids), _read_ids(ids_file) if ids_file else ()
+    )
+    result_cache = None
+    serial = ""
+    if cache:
+      serial = self._adb.serial or self._adb.shell(_SERIAL_COMMAND, silent=True)
+      if serial:
+        result_cache = (
+            self._result_cache or auction_result_cache.AuctionResultCache()
+        )
+    counts = collections.Counter()
+    if output == "-":
+      ndjson = contextlib.nullcontext(sys.stdout)
+    else:
+      ndjson = open(output, "w")
+    batches = iter(
+        lambda: list(itertools.islice(ids, _VIEW_AUCTION_RESULTS_BATCH_SIZE)),
+        [],
+    )
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers)
+    with ndjson as f, pool:
+      for lines in utilities.map_bounded(
+          pool,
+          lambda batch: self._view_auction_result_batch(
+              batch, serial, result_cache
+          ),
+          batches,
+          max_workers * _BATCHES_PER_WORKER,
+      ):
+        for line, status in lines:
+          f.write(line + "\n")
+          counts[status] += 1
+    print(
+        f"Viewed {counts.total()} auction results, {counts[_CACHED]} cached,"
+        f" {counts[_FAILED]} failed.",
+        file=sys.stderr,
+    )
+
+  def _view_auction_result_batch(
+      self,
+      ad_selection_ids: list[str],
+      serial: str,
+      result_cache: auction_result_cache.AuctionResultCache | None,
+  ) -> list[tuple[str, str]]:
+    """Fetch the uncached results of a batch in one adb round trip.
+
+    If the round trip fails, every uncached auction of the batch is reported
+    as failed, so the other batches are still written.
+
+    Returns:
+      the NDJSON line of every auction, and whether it was `cached`,
+      `fetched` or `failed`.
+    """
+    cached = {}
+    if result_cache:
+      for ad_selection_id in ad_selection_ids:
+        result = result_cache.get(serial, ad_selection_id)
+        if result is None:
+          continue
         try:
-          message = bidding_auction_servers_pb2.GetBidsRequest.GetBidsRawRequest.FromString(
-              base64_decoded_str
-          )
-          return MessageToJson(message)
-        except DecodeError as e:
-          return _FAILURE_TEMPLATE % e
+          cached[ad_selection_id] = decode_auction_result(result, indent=None)
+        except (DecodeError, ValueError):
+          # The entry is corrupt, so fetch the result again.
+          result_cache.evict(serial, ad_selection_id)
+    missing = [
+        ad_selection_id
+        for ad_selection_id in ad_selection_ids
+        if ad_selection_id not in cached
+    ]
+    fetched = {}
+    # Set if the whole batch failed, such as when the device went offline.
+    batch_error = None
+    if missing:
+      try:
+        outputs = self._adb.shell_batch([
+            f"cmd adservices_manager {_view_auction_result_command(id_)}"
+            for id_ in missing
+        ])
+      except (ValueError, subprocess.TimeoutExpired) as e:
+        batch_error = str(e)
       else:
-        print("Querying for seller")
+        fetched = dict(zip(missing, outputs))
+    lines = []
+    for ad_selection_id in ad_selection_ids:
+      key = json.dumps(ad_selection_id)
+      if ad_selection_id in cached:
+        lines.append((
+            f'{{"ad_selection_id": {key},'
+            f' "auction_result": {cached[ad_selection_id]}}}',
+            _CACHED,
+        ))
+        continue
+      error = batch_error
+      if error is None:
         try:
-          auction_input = (
-              bidding_auction_servers_pb2.ProtectedAuctionInput.FromString(
-                  base64_decoded_str
-              )
-          )
+          result = output_proto(fetched[ad_selection_id])
+          decoded = decode_auction_result(result, indent=None)
         except DecodeError as e:
-          return _FAILURE_TEMPLATE % e
-        decompressed_buyer_inputs = {}
-        for buyer, compressed_buyer_input in auction_input.buyer_input.items():
-          buyer_input_bytes = gzip.decompress(compressed_buyer_input)
-          buyer_input = bidding_auction_servers_pb2.BuyerInput.FromString(
-              buyer_input_bytes
+          error = _FAILURE_TEMPLATE % e
+        except ValueError as e:
+          error = fetched.get(ad_selection_id, str(e))
+      if error is not None:
+        lines.append((
+            f'{{"ad_selection_id": {key}, "error": {json.dumps(error)}}}',
+            _FAILED,
+        ))
+        continue
+      if result_cache:
+        result_cache.put(serial, ad_selection_id, result)
+      lines.append((
+          f'{{"ad_selection_id": {key}, "auction_result": {decoded}}}',
+          _FETCHED,
+      ))
+    return lines
+
+  def payload_size(
+      self,
+      top: int = 10,
+      output_format: str = "table",
+      input: str = "",  # pylint: disable=redefined-builtin
+  ) -> str:
+    """Break down the size of the ad selection data sent to the seller.
+
+    Reports the compressed and uncompressed bytes, and their share of the
+    total, of every buyer, of the largest interest groups and of the
+    `bidding_signals_keys`, `ad_render_ids`, `component_ads` and
+    `user_bidding_signals` fields.
+
+    Args:
+      top: number of largest interest groups to show.
+      output_format: `table`, or `json` for a machine readable report.
+      input: captured seller payload to analyze instead of fetching one from
+        the device, or `-` for stdin. It holds the JSON output of
+        `get-ad-selection-data`, a bare base64 `output_proto`, or the raw
+        proto bytes.
+
+    Returns:
+      Textual size report.
+    """
+    if output_format not in ("table", "json"):
+      raise ValueError(
+          "Expected one of ('table', 'json') as output format, was"
+          f" {output_format}."
+      )
+    try:
+      if input:
+        serialized = _read_captured_payload(input)
+      else:
+        command_output = self._adb.execute_adservices_shell_command(
+            _get_ad_selection_data_command("")
+        )
+        try:
+          serialized = output_proto(command_output)
+        except ValueError:
+          return command_output
+      auction_input = (
+          bidding_auction_servers_pb2.ProtectedAuctionInput.FromString(
+              serialized
           )
-          interest_groups = []
-          for interest_group in buyer_input.interest_groups:
-            interest_groups.append({
-                "name": interest_group.name,
-                "origin": interest_group.origin,
-                "bidding_signals_keys": list(
-                    interest_group.bidding_signals_keys
-                ),
-                "ad_render_ids": list(interest_group.ad_render_ids),
-                "component_ads": list(interest_group.component_ads),
-                "user_bidding_signals": interest_group.user_bidding_signals,
-            })
-          raw_buyer_input = {
-              "interest_groups": interest_groups,
-          }
-          if buyer_input.protected_app_signals.app_install_signals:
-            raw_buyer_input["protected_app_signals"] = {
-                "app_install_signals": base64.b64encode(
-                    buyer_input.protected_app_signals.app_install_signals
-                    or "{}"
-                ).decode("utf-8"),
-                "encoding_version": (
-                    buyer_input.protected_app_signals.encoding_version
-                ),
-            }
-          decompressed_buyer_inputs[buyer] = raw_buyer_input
-        empty_per_buyer_config = {}
-        for buyer in decompressed_buyer_inputs:
-          empty_per_buyer_config[buyer] = {
-              "buyer_signals": "Replace-With-Buyer-Signals",
-              "auction_signals": "Replace-With-Auction-Signals",
-          }
-        return json.dumps({
-            "auction_config": {
-                "seller_signals": "Replace-With-Seller-Signals",
-                "auction_signals": "Replace-With-Auction-Signals",
-                "buyer_list": list(decompressed_buyer_inputs.keys()),
-                "seller": "Replace-With-Seller",
-                "per_buyer_config": empty_per_buyer_config,
-            },
-            "client_type": "CLIENT_TYPE_ANDROID",
-            "raw_protected_audience_input": {
-                "raw_buyer_input": decompressed_buyer_inputs,
-                "publisher_name": auction_input.publisher_name,
-                "enable_debug_reporting": auction_input.enable_debug_reporting,
-                "generation_id": auction_input.generation_id,
-                "consented_debug_config": {
-                    "is_consented": (
-                        auction_input.consented_debug_config.is_consented
-                    ),
-                    "token": auction_input.consented_debug_config.token,
-                    "is_debug_info_in_response": (
-                        auction_input.consented_debug_config.is_debug_info_in_response
-                    ),
-                },
-            },
-        })
-
-    except ValueError as e:
-      print("Failed to parse output: %s" % e)
-      return command_output
+      )
+    except (DecodeError, ValueError) as e:
+      return _FAILURE_TEMPLATE % e
+    report = payload_size.breakdown(auction_input, top)
+    if output_format == "json":
+      return json.dumps(report, indent=2)
+    return payload_size.format_table(report)
 
-  def view_auction_result(self, ad_selection_id: str) -> str:
+  def decode(
+      self,
+      *paths: str,
+      kind: str = "seller",
+      output: str = "-",
+      max_workers: int = 0,
+  ) -> None:
+    """Decode captured payloads into NDJSON, without a device.
+
+    Every file holds the JSON output of `get-ad-selection-data` or
+    `view-auction-result`, a bare base64 `output_proto`, or the raw proto
+    bytes. On stdin, every line holds a JSON or base64 payload. Payloads are
+    decoded in a pool of processes.
+
+    Args:
+      *paths: files, or directories to decode every file of. Without paths,
+        payloads are read from stdin.
+      kind: `seller` or `buyer` for ad selection data, or `auction_result`.
+      output: NDJSON file to write, or `-` for stdout.
+      max_workers: maximum number of processes. Defaults to the number of
+        CPUs.
+    """
+    import offline_decode  # pylint: disable=g-import-not-at-top
+
+    lines = offline_decode.decode(
+        offline_decode.read_payloads(paths or (offline_decode.STDIN,)),
+        kind,
+        max_workers,
+    )
+    decoded = 0
+    failed = 0
+    if output == "-":
+      ndjson = contextlib.nullcontext(sys.stdout)
+    else:
+      ndjson = open(output, "w")
+    with ndjson as f:
+      for line in lines:
+        f.write(line + "\n")
+        decoded += 1
+        failed += offline_decode.is_error(line)
+    print(f"Decoded {decoded} payloads, {failed} failed.", file=sys.stderr)
+
+
+class AsyncAdSelection:
+  """Interact with Ad Selection using asyncio.
+
+  Mirrors AdSelection, so that many queries can run concurrently.
+  """
+
+  def __init__(
+      self,
+      adb_client: async_adb.AsyncAdbClient,
+  ):
+    self._adb = adb_client
+
+  async def view_consented_debug(self) -> str:
+    """View adtech consented debugging information on the device.
+
+    Returns:
+      Textual output of consented debug view command.
+    """
+    return _format_consented_debug_view(
+        await self._adb.execute_adservices_shell_command(
+            _consented_debug_command(_CONSENTED_DEBUG_COMMAND_VIEW)
+        )
+    )
+
+  async def enable_consented_debug(
+      self,
+      token: str,
+      expiry_in_hours: int = 30 * 24,  # 30 days
+  ) -> str:
+    """Enable adtech consented debugging on the device.
+
+    Args:
+      token: Secret token which is also set on the TEE server.
+      expiry_in_hours: Hours after which the consented debug will be disabled.
+
+    Returns:
+      Textual output of consented debug enable command.
+    """
+    enable_output: str = await self._adb.execute_adservices_shell_command(
+        _enable_consented_debug_command(token, expiry_in_hours)
+    )
+    print(enable_output)
+    return await self.view_consented_debug()
+
+  async def disable_consented_debug(self) -> str:
+    """Disable adtech consented debugging on the device.
+
+    Returns:
+      Textual output of consented debug disable command.
+    """
+    return await self._adb.execute_adservices_shell_command(
+        _consented_debug_command(_CONSENTED_DEBUG_COMMAND_DISABLE)
+    )
+
+  async def get_ad_selection_data(self, buyer: str = "") -> str:
+    """Returns the JSON formatted input for usage with secure_invoke.
+
+    Args:
+      buyer: AdTech buyer used to generate the payload to a BuyerFrontend
+        GetBids API. If omitted, then an "raw" SelectAdRequest will be returned
+        for usage with an SellerFrontend SelectAds API.
+
+    Returns:
+      Textual output of get_ad_selection__data command.
+    """
+    return _decode_ad_selection_data(
+        await self._adb.execute_adservices_shell_command(
+            _get_ad_selection_data_command(buyer)
+        ),
+        buyer,
+    )
+
+  async def view_auction_result(self, ad_selection_id: str) -> str:
     """View the result of an auction.
 
     Args:
@@ -241,21 +478,355 @@ class AdSelection:
     Returns:
       Textual output of view_auction_result command.
     """
-    command_output = self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _VIEW_AUCTION_RESULT_COMMAND,
-            "",
-            {_ARG_AD_SELECTION_ID: ad_selection_id},
+    return _decode_auction_result(
+        await self._adb.execute_adservices_shell_command(
+            _view_auction_result_command(ad_selection_id)
         )
     )
+
+
+def _consented_debug_command(
+    sub_command_name: str, args_dict: dict[str, str] | None = None
+) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _CONSENTED_DEBUG_COMMAND,
+      sub_command_name,
+      args_dict or {},
+  )
+
+
+def _enable_consented_debug_command(token: str, expiry_in_hours: int) -> str:
+  return _consented_debug_command(
+      _CONSENTED_DEBUG_COMMAND_ENABLE,
+      {
+          _CONSENTED_DEBUG_COMMAND_ENABLE_SECRET_DEBUG_TOKEN: token,
+          _CONSENTED_DEBUG_COMMAND_ENABLE_EXPIRY_IN_HOURS: expiry_in_hours,
+      },
+  )
+
+
+def _format_consented_debug_view(view_output: str) -> str:
+  try:
+    json_obj = json.loads(view_output)
+    return json.dumps(json_obj, indent=4)
+  except ValueError as unused_error:
+    return view_output
+
+
+def _get_ad_selection_data_command(buyer: str) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _GET_AD_SELECTION_DATA_COMMAND,
+      "",
+      {_ARG_BUYER: buyer} if buyer else {},
+  )
+
+
+@profiler.traced("decode ad selection data")
+def _decode_ad_selection_data(command_output: str, buyer: str) -> str:
+  """Decodes the output of the get-ad-selection-data shell command.
+
+  Args:
+    command_output: JSON output of the shell command, holding a base64 encoded
+      `output_proto`.
+    buyer: buyer the data was requested for, or empty for the seller.
+
+  Returns:
+    JSON for usage with secure_invoke, or the raw output if it could not be
+    decoded.
+  """
+  try:
+    proto_json = json.loads(command_output.replace("\n", ""))
+    base64_decoded_str = base64.b64decode(proto_json.get("output_proto"))
+    if buyer:
+      print("Querying for buyer: " + buyer)
+      try:
+        return decode_get_bids_request(base64_decoded_str)
+      except DecodeError as e:
+        return _FAILURE_TEMPLATE % e
+    else:
+      print("Querying for seller")
+      try:
+        return decode_select_ad_request(base64_decoded_str)
+      except (DecodeError, OSError, EOFError, zlib.error) as e:
+        # Buyer inputs are gzipped, and may be corrupt.
+        return _FAILURE_TEMPLATE % e
+
+  except ValueError as e:
+    print("Failed to parse output: %s" % e)
+    return command_output
+
+
+def decode_get_bids_request(data: bytes, indent: int | None = 2) -> str:
+  """Decodes a serialized `GetBidsRawRequest` for a BuyerFrontend.
+
+  Args:
+    data: the serialized proto.
+    indent: JSON indent, or None for a single line.
+
+  Raises:
+    DecodeError: if the data is not a `GetBidsRawRequest`.
+
+  Returns:
+    JSON of the request.
+  """
+  return proto_json.to_json(
+      bidding_auction_servers_pb2.GetBidsRequest.GetBidsRawRequest.FromString(
+          data
+      ),
+      indent,
+  )
+
+
+def decode_select_ad_request(data: bytes, max_workers: int = 0) -> str:
+  """Decodes a serialized `ProtectedAuctionInput` for a SellerFrontend.
+
+  Args:
+    data: the serialized proto.
+    max_workers: maximum number of processes for decoding buyer inputs.
+      Defaults to the number of CPUs.
+
+  Raises:
+    DecodeError: if the data is not a `ProtectedAuctionInput`.
+
+  Returns:
+    single line JSON of a raw SelectAdRequest for usage with secure_invoke,
+    with placeholders for the signals the device does not know.
+  """
+  auction_input = bidding_auction_servers_pb2.ProtectedAuctionInput.FromString(
+      data
+  )
+  decompressed_buyer_inputs = decode_buyer_inputs(
+      dict(auction_input.buyer_input), max_workers
+  )
+  empty_per_buyer_config = {}
+  for buyer in decompressed_buyer_inputs:
+    empty_per_buyer_config[buyer] = {
+        "buyer_signals": "Replace-With-Buyer-Signals",
+        "auction_signals": "Replace-With-Auction-Signals",
+    }
+  # Buyer inputs are already JSON, so splice them in rather than decoding
+  # and encoding them again.
+  placeholder = f"__RAW_BUYER_INPUT_{uuid.uuid4().hex}__"
+  output = json.dumps({
+      "auction_config": {
+          "seller_signals": "Replace-With-Seller-Signals",
+          "auction_signals": "Replace-With-Auction-Signals",
+          "buyer_list": list(decompressed_buyer_inputs.keys()),
+          "seller": "Replace-With-Seller",
+          "per_buyer_config": empty_per_buyer_config,
+      },
+      "client_type": "CLIENT_TYPE_ANDROID",
+      "raw_protected_audience_input": {
+          "raw_buyer_input": placeholder,
+          "publisher_name": auction_input.publisher_name,
+          "enable_debug_reporting": auction_input.enable_debug_reporting,
+          "generation_id": auction_input.generation_id,
+          "consented_debug_config": {
+              "is_consented": auction_input.consented_debug_config.is_consented,
+              "token": auction_input.consented_debug_config.token,
+              "is_debug_info_in_response": (
+                  auction_input.consented_debug_config.is_debug_info_in_response
+              ),
+          },
+      },
+  })
+  raw_buyer_input = ", ".join(
+      f"{json.dumps(buyer)}: {buyer_input}"
+      for buyer, buyer_input in decompressed_buyer_inputs.items()
+  )
+  return output.replace(f'"{placeholder}"', f"{{{raw_buyer_input}}}", 1)
+
+
+def decode_auction_result(data: bytes, indent: int | None = 2) -> str:
+  """Decodes a serialized `AuctionResult`.
+
+  Args:
+    data: the serialized proto.
+    indent: JSON indent, or None for a single line.
+
+  Raises:
+    DecodeError: if the data is not an `AuctionResult`.
+
+  Returns:
+    JSON of the result.
+  """
+  return proto_json.to_json(
+      bidding_auction_servers_pb2.AuctionResult.FromString(data), indent
+  )
+
+
+def decode_buyer_inputs(
+    compressed_buyer_inputs: dict[str, bytes],
+    max_workers: int = 0,
+) -> dict[str, str]:
+  """Decodes the compressed `BuyerInput` of every buyer.
+
+  Large payloads are decoded in a pool of processes, with buyers split into
+  chunks of similar size. Small payloads are not worth starting the pool for.
+
+  Args:
+    compressed_buyer_inputs: gzipped `BuyerInput` protos, by buyer.
+    max_workers: maximum number of processes. Defaults to the number of CPUs.
+
+  Returns:
+    JSON of the raw buyer input of every buyer, in the same order.
+  """
+  workers = min(
+      max_workers or os.cpu_count() or 1, len(compressed_buyer_inputs)
+  )
+  total_size = sum(map(len, compressed_buyer_inputs.values()))
+  if workers < 2 or total_size < _PARALLEL_DECODE_MIN_BYTES:
+    return {
+        buyer: _decode_buyer_input(compressed)
+        for buyer, compressed in compressed_buyer_inputs.items()
+    }
+  chunks = _chunk_by_size(
+      list(compressed_buyer_inputs.values()),
+      workers * _CHUNKS_PER_WORKER,
+  )
+  decoded = _decode_in_pool(chunks, workers)
+  if decoded is None:
+    decoded = [
+        _decode_buyer_input(compressed)
+        for compressed in compressed_buyer_inputs.values()
+    ]
+  return dict(zip(compressed_buyer_inputs, decoded))
+
+
+def _decode_in_pool(
+    chunks: list[list[bytes]], workers: int
+) -> list[str] | None:
+  """Decodes chunks of buyer inputs in a pool of processes.
+
+  Raises:
+    DecodeError: if a buyer input is not a `BuyerInput`. Corrupt gzip streams
+      raise OSError, EOFError or zlib.error instead.
+
+  Returns:
+    the decoded buyer inputs in order, or None if the pool is unavailable.
+  """
+  try:
+    pool = concurrent.futures.ProcessPoolExecutor(workers)
+  except OSError:
+    # Some sandboxes do not allow starting processes.
+    return None
+  with pool:
     try:
-      proto_json = json.loads(command_output)
-      base64_decoded_str = base64.b64decode(proto_json.get("output_proto"))
-      return MessageToJson(
-          bidding_auction_servers_pb2.AuctionResult.FromString(
-              base64_decoded_str
-          )
-      )
-    except ValueError:
-      return command_output
+      # Worker processes are started on submit.
+      futures = [
+          pool.submit(_decode_buyer_input_chunk, chunk) for chunk in chunks
+      ]
+    except (OSError, concurrent.futures.BrokenExecutor):
+      return None
+    try:
+      results = [future.result() for future in futures]
+    except concurrent.futures.BrokenExecutor:
+      # Workers died, rather than failing to decode a buyer input.
+      return None
+  return [buyer_input for chunk in results for buyer_input in chunk]
+
+
+def _chunk_by_size(values: list[bytes], chunk_count: int) -> list[list[bytes]]:
+  """Splits values into consecutive chunks of about the same total size."""
+  target = sum(map(len, values)) / chunk_count
+  chunks = [[]]
+  size = 0
+  for value in values:
+    if size >= target:
+      chunks.append([])
+      size = 0
+    chunks[-1].append(value)
+    size += len(value)
+  return chunks
+
+
+def _decode_buyer_input_chunk(chunk: list[bytes]) -> list[str]:
+  return [_decode_buyer_input(compressed) for compressed in chunk]
+
+
+def _decode_buyer_input(compressed_buyer_input: bytes) -> str:
+  """Decodes a gzipped `BuyerInput` into the JSON of a raw buyer input."""
+  buyer_input = bidding_auction_servers_pb2.BuyerInput.FromString(
+      gzip.decompress(compressed_buyer_input)
+  )
+  interest_groups = []
+  for interest_group in buyer_input.interest_groups:
+    interest_groups.append({
+        "name": interest_group.name,
+        "origin": interest_group.origin,
+        "bidding_signals_keys": list(interest_group.bidding_signals_keys),
+        "ad_render_ids": list(interest_group.ad_render_ids),
+        "component_ads": list(interest_group.component_ads),
+        "user_bidding_signals": interest_group.user_bidding_signals,
+    })
+  raw_buyer_input = {
+      "interest_groups": interest_groups,
+  }
+  if buyer_input.protected_app_signals.app_install_signals:
+    raw_buyer_input["protected_app_signals"] = {
+        "app_install_signals": base64.b64encode(
+            buyer_input.protected_app_signals.app_install_signals or "{}"
+        ).decode("utf-8"),
+        "encoding_version": buyer_input.protected_app_signals.encoding_version,
+    }
+  return json.dumps(raw_buyer_input)
+
+
+def _view_auction_result_command(ad_selection_id: str) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _VIEW_AUCTION_RESULT_COMMAND,
+      "",
+      {_ARG_AD_SELECTION_ID: ad_selection_id},
+  )
+
+
+def _parse_ids(ad_selection_ids) -> list[str]:
+  # Fire parses `--ad-selection-ids=1,2` as a tuple and a single ID as an int.
+  if isinstance(ad_selection_ids, (tuple, list)):
+    return [str(id_) for id_ in ad_selection_ids]
+  return [id_ for id_ in str(ad_selection_ids).split(",") if id_]
+
+
+def _read_ids(path: str) -> Iterator[str]:
+  with open(path) as f:
+    for line in f:
+      if line.strip():
+        yield line.strip()
+
+
+def output_proto(command_output: str) -> bytes:
+  """Extracts the proto from the JSON output of an ad selection shell command.
+
+  Raises:
+    ValueError: if the output is not JSON with a base64 `output_proto`.
+  """
+  proto_json = json.loads(command_output.replace("\n", ""))
+  output_proto = proto_json.get("output_proto")
+  if not isinstance(output_proto, str):
+    raise ValueError(f"Expected output_proto in {command_output}")
+  return base64.b64decode(output_proto)
+
+
+def _read_captured_payload(path: str) -> bytes:
+  """Read the serialized proto of a captured payload from a file or stdin."""
+  import offline_decode  # pylint: disable=g-import-not-at-top
+
+  if path == offline_decode.STDIN:
+    content = sys.stdin.buffer.read()
+  else:
+    with open(path, "rb") as f:
+      content = f.read()
+  return offline_decode.payload_proto(content)
+
+
+@profiler.traced("decode auction result")
+def _decode_auction_result(command_output: str) -> str:
+  try:
+    proto_json = json.loads(command_output)
+    base64_decoded_str = base64.b64decode(proto_json.get("output_proto"))
+    return decode_auction_result(base64_decoded_str)
+  except ValueError:
+    return command_output
@@ -0,0 +1,100 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares sequential and parallel decoding of large ad selection data.
+
+Builds a synthetic payload, so no device is needed:
+
+  python3 ad_selection_benchmark.py --buyers=200 --interest_groups=1000
+"""
+
+import gzip
+import json
+import os
+import statistics
+import time
+
+from absl import app
+from absl import flags
+
+import ad_selection
+import bidding_auction_servers_pb2
+
+_BUYERS = flags.DEFINE_integer("buyers", 100, "Buyers in the payload.")
+_INTEREST_GROUPS = flags.DEFINE_integer(
+    "interest_groups", 1000, "Interest groups of every buyer."
+)
+_RUNS = flags.DEFINE_integer("runs", 3, "Decodes per mode.")
+_MAX_WORKERS = flags.DEFINE_integer(
+    "max_workers", 0, "Processes for parallel decoding. Defaults to CPUs."
+)
+
+
+def synthetic_buyer_inputs(
+    buyers: int, interest_groups: int
+) -> dict[str, bytes]:
+  """Build gzipped `BuyerInput` protos shaped like real ones."""
+  compressed_buyer_inputs = {}
+  for buyer in range(buyers):
+    buyer_input = bidding_auction_servers_pb2.BuyerInput()
+    for index in range(interest_groups):
+      buyer_input.interest_groups.add(
+          name=f"interest-group-{index}",
+          origin="com.example.app",
+          bidding_signals_keys=[f"key-{key}" for key in range(5)],
+          ad_render_ids=[f"ad-{ad}" for ad in range(10)],
+          user_bidding_signals=json.dumps({"index": index}),
+      )
+    compressed_buyer_inputs[f"buyer-{buyer}.example.com"] = gzip.compress(
+        buyer_input.SerializeToString()
+    )
+  return compressed_buyer_inputs
+
+
+def _measure(compressed_buyer_inputs: dict[str, bytes], max_workers: int):
+  latencies = []
+  for _ in range(_RUNS.value):
+    start = time.perf_counter()
+    decoded = ad_selection.decode_buyer_inputs(
+        compressed_buyer_inputs, max_workers
+    )
+    latencies.append(time.perf_counter() - start)
+  return latencies, decoded
+
+
+def main(argv):
+  del argv  # Unused.
+  compressed_buyer_inputs = synthetic_buyer_inputs(
+      _BUYERS.value, _INTEREST_GROUPS.value
+  )
+  size = sum(map(len, compressed_buyer_inputs.values()))
+  print(
+      f"{_BUYERS.value} buyers, {_INTEREST_GROUPS.value} interest groups"
+      f" each, {size / 1024:.0f} KiB compressed, {os.cpu_count()} CPUs"
+  )
+  sequential, expected = _measure(compressed_buyer_inputs, 1)
+  parallel, decoded = _measure(compressed_buyer_inputs, _MAX_WORKERS.value)
+  if decoded != expected:
+    print("FAIL: parallel decoding differs from sequential decoding")
+    return 1
+  for name, latencies in (("sequential", sequential), ("parallel", parallel)):
+    print(
+        f"{name:<12}median {statistics.median(latencies) * 1000:8.1f} ms"
+        f"  min {min(latencies) * 1000:8.1f} ms"
+    )
+  return 0
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -12,11 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import base64
+import concurrent.futures
+import contextlib
+import gzip
+import io
 import json
+import os
+import subprocess
+import tempfile
+from unittest import mock
 
 from absl.testing import absltest
 
 import ad_selection
+import adb
+import auction_result_cache
+import bidding_auction_servers_pb2
 import fake_adb
 import utilities
 
@@ -54,6 +67,7 @@ _GET_AD_SELECTION_DATA_SHELL_CMD_NO_DATA_RESPONSE = (
     "could not find data for buyer: test-buyer"
 )
 
+_ARG_BUYER_FLAG = "--buyer"
 _TEST_AD_SELECTION_ID = "-123456789"
 _VIEW_AUCTION_RESULT_SHELL_CMD_RESPONSE = '{"output_proto":"Ck9odHRwczovLzI0YjZiYjJjLTY1NzEtNDYzMi1iNTQ5LTZhNDk2YzE1MTk4OC5tb2NrLnBzdG1uLmlvL2JpZGRpbmcvcmVuZGVyX3Nob2VzGgVzaG9lcyIyMjRiNmJiMmMtNjU3MS00NjMyLWI1NDktNmE0OTZjMTUxOTg4Lm1vY2sucHN0bW4uaW81AAAgQUIECgAaAGovY29tLmV4YW1wbGUuYWRzZXJ2aWNlcy5zYW1wbGVzLmZsZWRnZS5zYW1wbGVhcHA="}'
 _VIEW_AUCTION_RESULT_EXPECTED_RESPONSE = json.loads(
@@ -203,6 +217,159 @@ class AdSelectionTest(absltest.TestCase):
         json_output, _GET_AD_SELECTION_DATA_EXPECTED_RESPONSE_FOR_SELLER_EMPTY
     )
 
+  def test_decode_buyer_inputs_in_parallel(self):
+    compressed_buyer_inputs = {}
+    for buyer_index in range(5):
+      buyer_input = bidding_auction_servers_pb2.BuyerInput()
+      for index in range(buyer_index + 1):
+        buyer_input.interest_groups.add(
+            name=f"ca-{index}", ad_render_ids=[str(index)]
+        )
+      compressed_buyer_inputs[f"buyer-{buyer_index}.com"] = gzip.compress(
+          buyer_input.SerializeToString()
+      )
+
+    sequential = ad_selection.decode_buyer_inputs(
+        compressed_buyer_inputs, max_workers=1
+    )
+    with mock.patch.object(ad_selection, "_PARALLEL_DECODE_MIN_BYTES", 0):
+      parallel = ad_selection.decode_buyer_inputs(
+          compressed_buyer_inputs, max_workers=2
+      )
+
+    self.assertEqual(parallel, sequential)
+    self.assertEqual(list(parallel), list(compressed_buyer_inputs))
+    self.assertLen(
+        json.loads(parallel["buyer-4.com"])["interest_groups"], 5
+    )
+
+  def test_decode_buyer_inputs_without_processes(self):
+    compressed_buyer_inputs = {
+        f"buyer-{index}.com": gzip.compress(
+            bidding_auction_servers_pb2.BuyerInput().SerializeToString()
+        )
+        for index in range(3)
+    }
+    self.enter_context(
+        mock.patch.object(ad_selection, "_PARALLEL_DECODE_MIN_BYTES", 0)
+    )
+    self.enter_context(
+        mock.patch.object(
+            ad_selection.concurrent.futures,
+            "ProcessPoolExecutor",
+            side_effect=PermissionError("no processes"),
+        )
+    )
+
+    decoded = ad_selection.decode_buyer_inputs(
+        compressed_buyer_inputs, max_workers=2
+    )
+
+    self.assertEqual(list(decoded), list(compressed_buyer_inputs))
+
+  def test_decode_buyer_inputs_in_parallel_corrupt_input(self):
+    compressed_buyer_inputs = {
+        "good.com": gzip.compress(
+            bidding_auction_servers_pb2.BuyerInput().SerializeToString()
+        ),
+        "bad-header.com": b"not gzip",
+    }
+    self.enter_context(
+        mock.patch.object(ad_selection, "_PARALLEL_DECODE_MIN_BYTES", 0)
+    )
+    # Threads see the patched decoder, which processes would not.
+    self.enter_context(
+        mock.patch.object(
+            ad_selection.concurrent.futures,
+            "ProcessPoolExecutor",
+            concurrent.futures.ThreadPoolExecutor,
+        )
+    )
+    decode = self.enter_context(
+        mock.patch.object(
+            ad_selection,
+            "_decode_buyer_input",
+            wraps=ad_selection._decode_buyer_input,
+        )
+    )
+
+    with self.assertRaises(gzip.BadGzipFile):
+      ad_selection.decode_buyer_inputs(compressed_buyer_inputs, max_workers=2)
+
+    # The corrupt input is not decoded a second time without the pool.
+    self.assertLessEqual(decode.call_count, 2)
+
+  def test_payload_size(self):
+    self.adb.set_shell_outputs(
+        [_GET_AD_SELECTION_DATA_SHELL_CMD_RESPONSE_FOR_SELLER]
+    )
+
+    report = json.loads(self.ad_selection.payload_size(output_format="json"))
+
+    self.assertNotIn(_ARG_BUYER_FLAG, self.adb.shell_calls[0])
+    self.assertEqual(
+        [buyer["buyer"] for buyer in report["buyers"]], ["example.com"]
+    )
+    self.assertLen(report["interest_groups"], 2)
+
+  def test_payload_size_of_captured_payload(self):
+    path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), "payload.json"
+    )
+    with open(path, "w") as f:
+      f.write(_GET_AD_SELECTION_DATA_SHELL_CMD_RESPONSE_FOR_SELLER)
+
+    report = json.loads(
+        self.ad_selection.payload_size(output_format="json", input=path)
+    )
+
+    self.assertFalse(self.adb.shell_called)
+    self.assertEqual(
+        [buyer["buyer"] for buyer in report["buyers"]], ["example.com"]
+    )
+
+  def test_payload_size_of_captured_payload_on_stdin(self):
+    stdin = io.TextIOWrapper(
+        io.BytesIO(
+            _GET_AD_SELECTION_DATA_SHELL_CMD_RESPONSE_FOR_SELLER.encode("utf-8")
+        )
+    )
+    self.enter_context(mock.patch("sys.stdin", stdin))
+
+    report = json.loads(
+        self.ad_selection.payload_size(output_format="json", input="-")
+    )
+
+    self.assertFalse(self.adb.shell_called)
+    self.assertLen(report["interest_groups"], 2)
+
+  def test_payload_size_reports_corrupt_buyer_input(self):
+    auction_input = bidding_auction_servers_pb2.ProtectedAuctionInput()
+    auction_input.buyer_input["buyer.com"] = gzip.compress(b"")[:-4]
+    self.adb.set_shell_outputs([
+        json.dumps({
+            "output_proto": base64.b64encode(
+                auction_input.SerializeToString()
+            ).decode("utf-8")
+        })
+    ])
+
+    report = json.loads(self.ad_selection.payload_size(output_format="json"))
+
+    self.assertEqual(
+        [buyer["buyer"] for buyer in report["unreadable_buyers"]],
+        ["buyer.com"],
+    )
+
+  def test_payload_size_no_data(self):
+    self.adb.set_shell_outputs(
+        [_GET_AD_SELECTION_DATA_SHELL_CMD_NO_DATA_RESPONSE]
+    )
+
+    output = self.ad_selection.payload_size()
+
+    self.assertEqual(output, _GET_AD_SELECTION_DATA_SHELL_CMD_NO_DATA_RESPONSE)
+
   def test_get_ad_selection_data_invalid_proto(self):
     self.adb.set_shell_outputs(
         [_GET_AD_SELECTION_DATA_SHELL_CMD_INVALID_PROTO_RESPONSE]
@@ -235,6 +402,24 @@ class AdSelectionTest(absltest.TestCase):
         self.adb.shell_calls[0],
     )
 
+  def test_get_ad_selection_data_corrupt_buyer_input_seller(self):
+    auction_input = bidding_auction_servers_pb2.ProtectedAuctionInput()
+    # A valid gzip header followed by an invalid deflate block.
+    auction_input.buyer_input["buyer.com"] = (
+        gzip.compress(b"")[:10] + b"\xff" * 20
+    )
+    self.adb.set_shell_outputs([
+        json.dumps({
+            "output_proto": base64.b64encode(
+                auction_input.SerializeToString()
+            ).decode("utf-8")
+        })
+    ])
+
+    output = self.ad_selection.get_ad_selection_data()
+
+    self.assertStartsWith(output, ad_selection._FAILURE_TEMPLATE % "")
+
   def test_get_ad_selection_data_no_data_for_buyer(self):
     self.adb.set_shell_outputs(
         [_GET_AD_SELECTION_DATA_SHELL_CMD_NO_DATA_RESPONSE]
@@ -286,5 +471,173 @@ class AdSelectionTest(absltest.TestCase):
     self.assertEqual(output, _VIEW_AUCTION_RESULT_SHELL_CMD_NO_DATA_RESPONSE)
 
 
+class ViewAuctionResultsTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.directory = self.enter_context(tempfile.TemporaryDirectory())
+    self.adb = mock.create_autospec(adb.AdbClient)
+    self.adb.serial = "emulator-5554"
+    self.adb.shell_batch.side_effect = lambda commands: [
+        _VIEW_AUCTION_RESULT_SHELL_CMD_RESPONSE
+        if command.endswith(_TEST_AD_SELECTION_ID)
+        else _VIEW_AUCTION_RESULT_SHELL_CMD_NO_DATA_RESPONSE
+        for command in commands
+    ]
+    self.cache = auction_result_cache.AuctionResultCache(
+        os.path.join(self.directory, "cache")
+    )
+    self.ad_selection = ad_selection.AdSelection(self.adb, self.cache)
+
+  def _view(self, **kwargs) -> tuple[list[dict[str, object]], str]:
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+      self.ad_selection.view_auction_results(**kwargs)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()], (
+        stderr.getvalue()
+    )
+
+  def test_view_auction_results_in_order(self):
+    ids_file = os.path.join(self.directory, "ids.txt")
+    with open(ids_file, "w") as f:
+      f.write(f"{_TEST_AD_SELECTION_ID}\n\n")
+
+    results, summary = self._view(
+        ad_selection_ids=("1", "2"), ids_file=ids_file, max_workers=2
+    )
+
+    self.assertEqual(
+        [result["ad_selection_id"] for result in results],
+        ["1", "2", _TEST_AD_SELECTION_ID],
+    )
+    self.assertEqual(
+        results[0]["error"], _VIEW_AUCTION_RESULT_SHELL_CMD_NO_DATA_RESPONSE
+    )
+    self.assertEqual(
+        results[2]["auction_result"], _VIEW_AUCTION_RESULT_EXPECTED_RESPONSE
+    )
+    self.assertIn("Viewed 3 auction results, 0 cached, 2 failed.", summary)
+
+  def test_view_auction_results_in_batches(self):
+    ids = tuple(str(index) for index in range(40))
+
+    results, _ = self._view(ad_selection_ids=ids, max_workers=3)
+
+    self.assertLen(results, 40)
+    self.assertEqual(self.adb.shell_batch.call_count, 3)
+
+  def test_view_auction_results_reports_failed_batches(self):
+    ids = tuple(f"id-{index}" for index in range(32)) + (
+        _TEST_AD_SELECTION_ID,
+    )
+    fetch = self.adb.shell_batch.side_effect
+
+    def shell_batch(commands):
+      if commands[0].endswith("id-0"):
+        raise subprocess.TimeoutExpired(commands, 80)
+      if commands[0].endswith("id-16"):
+        raise ValueError("Unexpected output from batch")
+      return fetch(commands)
+
+    self.adb.shell_batch.side_effect = shell_batch
+
+    results, summary = self._view(ad_selection_ids=ids, max_workers=2)
+
+    self.assertEqual(
+        [result["ad_selection_id"] for result in results], list(ids)
+    )
+    self.assertIn("timed out", results[0]["error"])
+    self.assertEqual(results[16]["error"], "Unexpected output from batch")
+    self.assertEqual(
+        results[32]["auction_result"], _VIEW_AUCTION_RESULT_EXPECTED_RESPONSE
+    )
+    self.assertIn("Viewed 33 auction results, 0 cached, 32 failed.", summary)
+
+  def test_view_auction_results_caches_results(self):
+    self._view(ad_selection_ids=_TEST_AD_SELECTION_ID)
+    self.adb.shell_batch.reset_mock()
+
+    results, summary = self._view(ad_selection_ids=_TEST_AD_SELECTION_ID)
+
+    self.adb.shell_batch.assert_not_called()
+    self.assertEqual(
+        results[0]["auction_result"], _VIEW_AUCTION_RESULT_EXPECTED_RESPONSE
+    )
+    self.assertIn("1 cached", summary)
+
+  def test_view_auction_results_refetches_corrupt_cache_entries(self):
+    self.cache.put("emulator-5554", _TEST_AD_SELECTION_ID, b"\xff\xff")
+    self.cache.put("emulator-5554", "1", b"\xff\xff")
+
+    results, summary = self._view(ad_selection_ids=(_TEST_AD_SELECTION_ID, "1"))
+
+    self.assertEqual(
+        results[0]["auction_result"], _VIEW_AUCTION_RESULT_EXPECTED_RESPONSE
+    )
+    self.assertEqual(
+        results[1]["error"], _VIEW_AUCTION_RESULT_SHELL_CMD_NO_DATA_RESPONSE
+    )
+    self.assertIn("0 cached, 1 failed.", summary)
+    self.assertIsNone(self.cache.get("emulator-5554", "1"))
+    self.assertIsNotNone(self.cache.get("emulator-5554", _TEST_AD_SELECTION_ID))
+
+  def test_view_auction_results_does_not_cache_failures(self):
+    self._view(ad_selection_ids="1")
+
+    self.assertIsNone(self.cache.get("emulator-5554", "1"))
+
+  def test_view_auction_results_without_cache(self):
+    self._view(ad_selection_ids=_TEST_AD_SELECTION_ID, cache=False)
+    self._view(ad_selection_ids=_TEST_AD_SELECTION_ID, cache=False)
+
+    self.assertEqual(self.adb.shell_batch.call_count, 2)
+    self.assertIsNone(self.cache.get("emulator-5554", _TEST_AD_SELECTION_ID))
+
+
+class AsyncAdSelectionTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb = fake_adb.FakeAsyncAdb()
+    self.ad_selection = ad_selection.AsyncAdSelection(self.adb)
+
+  def test_view_consented_debug_happy_path(self):
+    self.adb.set_shell_outputs([_VIEW_CONSENTED_DEBUG_VIEW_RESPONSE])
+
+    output = asyncio.run(self.ad_selection.view_consented_debug())
+
+    self.assertContainsSubset(
+        [
+            ad_selection._CONSENTED_DEBUG_COMMAND,
+            ad_selection._CONSENTED_DEBUG_COMMAND_VIEW,
+        ],
+        self.adb.shell_calls[0],
+    )
+    json_output = json.dumps(json.loads(output))
+    self.assertEqual(json_output, _VIEW_CONSENTED_DEBUG_VIEW_RESPONSE)
+
+  def test_concurrent_queries(self):
+    self.adb.set_shell_outputs([
+        _GET_AD_SELECTION_DATA_SHELL_CMD_RESPONSE,
+        _VIEW_AUCTION_RESULT_SHELL_CMD_RESPONSE,
+    ])
+
+    async def query():
+      return await asyncio.gather(
+          self.ad_selection.get_ad_selection_data("test-buyer"),
+          self.ad_selection.view_auction_result(_TEST_AD_SELECTION_ID),
+      )
+
+    ad_selection_data, auction_result = asyncio.run(query())
+
+    self.assertEqual(
+        json.loads(ad_selection_data), _GET_AD_SELECTION_DATA_EXPECTED_RESPONSE
+    )
+    self.assertEqual(
+        json.loads(auction_result), _VIEW_AUCTION_RESULT_EXPECTED_RESPONSE
+    )
+
+
 if __name__ == "__main__":
   absltest.main()
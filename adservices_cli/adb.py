@@ -14,21 +14,98 @@
 
 """ADB commands expressed as simple functions."""
 
+from collections.abc import Iterator
+import functools
 import subprocess
+import time
+import uuid
+
+import device_cache
+import profiler
+import shell_session
 
 _TIMEOUT_SEC = 5
+# adb limits the length of a shell command line. Longer batches are split.
+_MAX_BATCH_LENGTH = 32 * 1024
+# Bytes read at a time from streamed commands.
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def list_devices() -> list[str]:
+  """Return the serials of all attached devices which are ready for use.
+
+  Raises:
+    CalledProcessError: if the underlying subprocess.run() command fails.
+
+  Returns:
+    serials reported by `adb devices` in the `device` state.
+  """
+  result = subprocess.run(
+      ["adb", "devices"],
+      capture_output=True,
+      check=True,
+      timeout=_TIMEOUT_SEC,
+  )
+  serials = []
+  for line in result.stdout.decode("utf-8").splitlines()[1:]:
+    serial, _, state = line.partition("\t")
+    if state.strip() == "device":
+      serials.append(serial)
+  return serials
+
+
+class _FactUnavailableError(Exception):
+  """A device fact could not be read, so must not be cached."""
+
+  def __init__(self, output: str):
+    super().__init__(output)
+    self.output = output
 
 
 class AdbClient:
   """Client for interacting with ADB (Android Debug Bridge)."""
 
+  def __init__(
+      self,
+      serial: str = "",
+      persistent_session: bool = False,
+      fact_cache: device_cache.DeviceFactsCache | None = None,
+  ):
+    """Initializes the ADB client.
+
+    Args:
+      serial: serial of the device to use. If empty, adb picks the only
+        attached device.
+      persistent_session: if true, run all shell commands through one
+        long-lived `adb shell` process instead of spawning `adb shell` for
+        every command.
+      fact_cache: if set, facts which only change on reboot, such as the SDK
+        version and installed APEX packages, are read once per boot.
+    """
+    self.serial = serial
+    self._fact_cache = fact_cache
+    self._boot_identity = None
+    self._adb = ["adb", "-s", serial] if serial else ["adb"]
+    self._session = (
+        shell_session.ShellSession(self._adb + ["shell", "-T"])
+        if persistent_session
+        else None
+    )
+
+  def close(self):
+    """Release the persistent shell session, if any."""
+    if self._session:
+      self._session.close()
+
   def root(self):
     """Try elevate to root permissions.
 
     Raises:
       CalledProcessError: if the underlying subprocess.run() command fails.
     """
-    subprocess.run("adb root".split(" "), check=True)
+    subprocess.run(self._adb + ["root"], check=True)
+    # adbd restarts when switching to root, which ends any open shell.
+    self.close()
 
   def is_root(self) -> bool:
     """Return true if ADB is root.
@@ -48,14 +125,21 @@ class AdbClient:
       package info if currently installed, otherwise an empty string. Android
       package info format looks like "package:com.example versionCode:123".
     """
-    packages = self.shell(
-        "pm list packages --apex-only --show-versioncode", silent=True
-    )
-    for installed_package_info in packages.split("\n"):
+    for installed_package_info in self.get_apex_packages().split("\n"):
       if package in installed_package_info:
         return installed_package_info
     return ""
 
+  def get_apex_packages(self) -> str:
+    """Return all installed APEX packages with their version codes.
+
+    Returns:
+      output of `pm list packages --apex-only --show-versioncode`.
+    """
+    return self._cached_fact(
+        "apex_packages", "pm list packages --apex-only --show-versioncode"
+    )
+
   def is_package_installed(self, package: str) -> bool:
     """Return true if a given package is currently installed.
 
@@ -76,7 +160,18 @@ class AdbClient:
     Returns:
       true if process is currently running.
     """
-    return self._pidof(process) > -1
+    return self.get_pid(process) > -1
+
+  def get_pid(self, process: str) -> int:
+    """Return the pid of a given process.
+
+    Args:
+      process: key of the process to lookup.
+
+    Returns:
+      pid of the process, or -1 if it is not running.
+    """
+    return self._pidof(process)
 
   def is_userdebug(self) -> bool:
     """Return true if device is a userdebug build.
@@ -87,7 +182,10 @@ class AdbClient:
     Returns:
       true if device is a userdebug build.
     """
-    return self.getprop("ro.product.build.type") == "userdebug"
+    build_type = self._cached_fact(
+        "build_type", "getprop ro.product.build.type"
+    )
+    return build_type == "userdebug"
 
   def get_sdk_version(self) -> int:
     """Get Android SDK version on running device.
@@ -95,38 +193,206 @@ class AdbClient:
     Returns:
       int representation of SDK version, or -1 if unknown.
     """
-    version_str = self.getprop("ro.build.version.sdk")
+    version_str = self._cached_fact(
+        "sdk_version", "getprop ro.build.version.sdk"
+    )
     if not version_str:
       return -1
     return int(version_str)
 
-  def shell(self, command: str, silent: bool = False) -> str:
+  def set_boot_identity(self, output: str):
+    """Remember the boot identity read as part of another batch of commands.
+
+    Saves the round trip otherwise needed before the first cached fact is
+    read.
+
+    Args:
+      output: output of `device_cache.BOOT_IDENTITY_COMMAND`.
+    """
+    self._boot_identity = device_cache.parse_boot_identity(output)
+
+  def forget_boot_identity(self):
+    """Read the boot identity again before the next cached fact.
+
+    Long-lived clients, such as those of the interactive shell, call this
+    between commands, since the device may reboot or update an APEX in
+    between.
+    """
+    self._boot_identity = None
+
+  def shell(
+      self, command: str, silent: bool = False, timeout: float = _TIMEOUT_SEC
+  ) -> str:
     """Run an arbitrary `adb shell` command.
 
     Args:
       command: shell command to execute on-device.
       silent: if false, print the command to stdout for additional debugging.
+      timeout: seconds to wait for the command to complete.
 
     Raises:
       CalledProcessError: if the underlying subprocess.run() command fails.
+      TimeoutExpired: if the command did not complete in time.
 
     Returns:
       string output for additional processing.
     """
-    exec_command = f"adb shell {command}"
+    exec_command = " ".join(self._adb + ["shell", command])
     if not silent:
       print(exec_command)
-    result = subprocess.run(
-        exec_command.split(" "),
-        capture_output=True,
-        check=False,
-        timeout=_TIMEOUT_SEC,
+    stdout, stderr, _ = profiler.record_shell(
+        command, functools.partial(self._run_shell, timeout=timeout)
     )
-    if result.stderr:
+    if stderr:
       if not silent:
         print(f"Error occurred while running {exec_command}")
-      return result.stderr.decode("utf-8").strip("\n")
-    return result.stdout.decode("utf-8").strip("\n")
+      return stderr.decode("utf-8").strip("\n")
+    return stdout.decode("utf-8").strip("\n")
+
+  def shell_batch(self, commands: list[str], silent: bool = True) -> list[str]:
+    """Run several shell commands in a single `adb shell` round trip.
+
+    Stderr of each command is merged into its output, so an error in one
+    command does not hide the output of the others. Batches too long for a
+    single adb command line are split over as few round trips as possible.
+    Each round trip may take as long as its commands would have taken one by
+    one.
+
+    Args:
+      commands: shell commands to execute on-device, in order.
+      silent: if false, print the command to stdout for additional debugging.
+
+    Raises:
+      ValueError: if the output could not be split back into one entry per
+        command, for example because no device is attached.
+      TimeoutExpired: if a round trip did not complete in time.
+
+    Returns:
+      output of each command, in the same order as `commands`.
+    """
+    separator = f"__ADSERVICES_CLI_BATCH_{uuid.uuid4().hex}__"
+    joiner = f"; printf '\\n%s\\n' {separator}; "
+    outputs = []
+    chunk = []
+    chunk_length = 0
+    for command in [f"{{ {command}; }} 2>&1" for command in commands]:
+      if chunk and chunk_length + len(joiner) + len(command) > _MAX_BATCH_LENGTH:
+        outputs.extend(self._run_batch(chunk, joiner, separator, silent))
+        chunk = []
+        chunk_length = 0
+      chunk.append(command)
+      chunk_length += len(joiner) + len(command)
+    if chunk:
+      outputs.extend(self._run_batch(chunk, joiner, separator, silent))
+    if len(outputs) != len(commands):
+      raise ValueError(f"Unexpected output from batch: {outputs}")
+    return outputs
+
+  def shell_stream(self, command: str, silent: bool = False) -> Iterator[bytes]:
+    """Stream the output of an `adb shell` command as it arrives.
+
+    For commands whose output is too large to hold several copies of. Stderr
+    is merged into the output, and there is no timeout.
+
+    Args:
+      command: shell command to execute on-device.
+      silent: if false, print the command to stdout for additional debugging.
+
+    Yields:
+      chunks of output, which may split lines and UTF-8 characters.
+    """
+    exec_command = self._adb + ["shell"] + command.split(" ")
+    if not silent:
+      print(" ".join(exec_command))
+    start_time = time.perf_counter()
+    bytes_out = 0
+    process = subprocess.Popen(
+        exec_command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+      for chunk in iter(
+          lambda: process.stdout.read1(_STREAM_CHUNK_SIZE), b""
+      ):
+        bytes_out += len(chunk)
+        yield chunk
+    finally:
+      process.stdout.close()
+      if process.poll() is None:
+        process.terminate()
+      profiler.record_adb_call(command, start_time, bytes_out, process.wait())
+
+  def logcat(self, args: list[str]) -> Iterator[str]:
+    """Stream the output of `adb logcat` line by line.
+
+    Lines are yielded as they arrive. The logcat process is stopped when the
+    iterator is closed, and ends on its own if `args` include `-d`.
+
+    Args:
+      args: arguments for logcat, for example `["-v", "threadtime"]`.
+
+    Yields:
+      lines of logcat output, without the trailing newline.
+    """
+    process = subprocess.Popen(
+        self._adb + ["logcat"] + args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        encoding="utf-8",
+        errors="replace",
+    )
+    try:
+      for line in process.stdout:
+        yield line.rstrip("\n")
+    finally:
+      process.stdout.close()
+      if process.poll() is None:
+        process.terminate()
+      process.wait()
+
+  def push(self, local: str, remote: str):
+    """Copy a file to the device.
+
+    Args:
+      local: path of the file on this machine.
+      remote: path to copy the file to on-device.
+
+    Raises:
+      CalledProcessError: if adb could not copy the file.
+    """
+    with profiler.span(f"push {remote}", profiler.CATEGORY_ADB):
+      subprocess.run(
+          self._adb + ["push", local, remote], capture_output=True, check=True
+      )
+
+  def pull(self, remote: str, local: str):
+    """Copy a file from the device.
+
+    Args:
+      remote: path of the file on-device.
+      local: path to copy the file to on this machine.
+
+    Raises:
+      CalledProcessError: if adb could not copy the file.
+    """
+    with profiler.span(f"pull {remote}", profiler.CATEGORY_ADB):
+      subprocess.run(
+          self._adb + ["pull", remote, local], capture_output=True, check=True
+      )
+
+  def _run_batch(
+      self, commands: list[str], joiner: str, separator: str, silent: bool
+  ) -> list[str]:
+    # Each command would have had its own timeout if run on its own.
+    script_output = self.shell(
+        joiner.join(commands), silent, timeout=_TIMEOUT_SEC * len(commands)
+    )
+    return [
+        output.strip("\n") for output in script_output.split(separator)
+    ]
 
   def set_sync_disabled_for_tests(self, value: str):
     """Set sync disabled for tests.
@@ -240,6 +506,63 @@ class AdbClient:
     """
     return self.shell(f"cmd jobscheduler run -f {namespace} {job_id}")
 
+  def _run_shell(
+      self, command: str, timeout: float = _TIMEOUT_SEC
+  ) -> tuple[bytes, bytes, int]:
+    """Run a shell command on-device.
+
+    Args:
+      command: shell command to execute on-device.
+      timeout: seconds to wait for the command to complete.
+
+    Returns:
+      tuple of (stdout, stderr, exit code) of the command.
+    """
+    if self._session:
+      return self._session.run(command, timeout=timeout)
+    result = subprocess.run(
+        self._adb + ["shell"] + command.split(" "),
+        capture_output=True,
+        check=False,
+        timeout=timeout,
+    )
+    return result.stdout, result.stderr, result.returncode
+
+  def _cached_fact(self, name: str, command: str) -> str:
+    """Return the output of a command which only changes on reboot.
+
+    Args:
+      name: name of the fact in the cache.
+      command: shell command which reads the fact.
+
+    Returns:
+      the output of the command, or its error if it failed.
+    """
+    if not self._fact_cache:
+      return self.shell(command, silent=True)
+    if self._boot_identity is None:
+      self.set_boot_identity(
+          self.shell(device_cache.BOOT_IDENTITY_COMMAND, silent=True)
+      )
+    try:
+      return self._fact_cache.get(
+          self.serial,
+          self._boot_identity,
+          name,
+          lambda: self._read_fact(command),
+      )
+    except _FactUnavailableError as e:
+      return e.output
+
+  def _read_fact(self, command: str) -> str:
+    stdout, stderr, returncode = profiler.record_shell(command, self._run_shell)
+    if stderr or returncode:
+      # Errors are often transient, so must not be cached for the whole boot.
+      raise _FactUnavailableError(
+          (stderr or stdout).decode("utf-8", "replace").strip("\n")
+      )
+    return stdout.decode("utf-8").strip("\n")
+
   def _pidof(self, process: str) -> int:
     try:
       pid = self.shell(f"pidof -s {process}", silent=True)
@@ -0,0 +1,383 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""ADB client which talks to the adb server directly instead of forking `adb`.
+
+Implements the subset of the adb host protocol needed by the CLI:
+https://android.googlesource.com/platform/packages/modules/adb/+/HEAD/SERVICES.TXT
+
+Every request is a 4 digit hex length followed by the payload, and is answered
+with `OKAY` or `FAIL` followed by a hex length prefixed message. A connection is
+bound to a device with `host:transport:<serial>`, after which a single device
+service such as `shell,v2,raw:<command>` can be opened on it. Shell v2 output
+is a stream of packets, each a 1 byte id and a 4 byte little-endian length
+followed by the data, so stdout, stderr and the exit code arrive separately.
+"""
+
+from collections.abc import Iterator
+import functools
+import os
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+import adb
+import device_cache
+import profiler
+
+_DEFAULT_HOST = "127.0.0.1"
+_DEFAULT_PORT = 5037
+_PORT_ENV_VAR = "ANDROID_ADB_SERVER_PORT"
+_TIMEOUT_SEC = 5
+
+_OKAY = b"OKAY"
+_FAIL = b"FAIL"
+
+_SHELL_V2_HEADER = struct.Struct("<BI")
+_SHELL_V2_STDOUT = 1
+_SHELL_V2_STDERR = 2
+_SHELL_V2_EXIT = 3
+
+
+class AdbProtocolError(Exception):
+  """Raised when the adb server rejects a request or sends malformed data."""
+
+
+def default_port() -> int:
+  """Returns the adb server port, honouring ANDROID_ADB_SERVER_PORT."""
+  return int(os.environ.get(_PORT_ENV_VAR, _DEFAULT_PORT))
+
+
+def encode_request(payload: str) -> bytes:
+  """Encodes a host protocol request.
+
+  Args:
+    payload: request, for example `host:version`.
+
+  Returns:
+    the payload prefixed by its length as 4 hex digits.
+  """
+  data = payload.encode("utf-8")
+  return b"%04x" % len(data) + data
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+  """Reads exactly `size` bytes from a socket.
+
+  Args:
+    sock: socket to read from.
+    size: number of bytes to read.
+
+  Raises:
+    AdbProtocolError: if the connection closed early.
+
+  Returns:
+    the bytes read.
+  """
+  chunks = []
+  while size:
+    chunk = sock.recv(size)
+    if not chunk:
+      raise AdbProtocolError("Connection closed by adb server.")
+    chunks.append(chunk)
+    size -= len(chunk)
+  return b"".join(chunks)
+
+
+def _send_request(sock: socket.socket, payload: str):
+  sock.sendall(encode_request(payload))
+  status = recv_exactly(sock, 4)
+  if status == _OKAY:
+    return
+  if status == _FAIL:
+    length = int(recv_exactly(sock, 4), 16)
+    message = recv_exactly(sock, length).decode("utf-8", "replace")
+    raise AdbProtocolError(f"{payload} failed: {message}")
+  raise AdbProtocolError(f"{payload} got unexpected status {status!r}")
+
+
+class ConnectionPool:
+  """Keeps connections to the adb server bound to one device ready for use.
+
+  The adb server closes a connection once the device service opened on it
+  finishes, so connections are used once. The pool hides the connect and
+  `host:transport` round trips by opening replacements on a background thread
+  while the previous command is still running.
+
+  Thread-safe.
+  """
+
+  def __init__(
+      self,
+      serial: str = "",
+      host: str = _DEFAULT_HOST,
+      port: int = 0,
+      size: int = 2,
+  ):
+    """Initializes the pool. No connections are opened until first use.
+
+    Args:
+      serial: serial of the device to bind connections to. If empty, any
+        single attached device is used.
+      host: host of the adb server.
+      port: port of the adb server. Defaults to ANDROID_ADB_SERVER_PORT or
+        5037.
+      size: number of idle connections to keep ready.
+    """
+    self._serial = serial
+    self._address = (host, port or default_port())
+    self._size = size
+    self._idle = []
+    self._lock = threading.Lock()
+    self._closed = False
+    # Whether a thread is opening connections. One at a time is enough, and
+    # keeps commands fanned out over many threads from starting more.
+    self._replenishing = False
+
+  def acquire(self) -> socket.socket:
+    """Returns a connection bound to the device, ready for a service request.
+
+    Raises:
+      AdbProtocolError: if the device is not available.
+      OSError: if the adb server is not reachable.
+
+    Returns:
+      a connected socket owned by the caller.
+    """
+    with self._lock:
+      sock = self._idle.pop() if self._idle else None
+      start_replenishing = not self._replenishing
+      self._replenishing = True
+    if start_replenishing:
+      threading.Thread(target=self._replenish, daemon=True).start()
+    if sock is None:
+      sock = self._connect()
+    return sock
+
+  def discard_idle(self):
+    """Closes idle connections, for example after the device restarted."""
+    with self._lock:
+      idle, self._idle = self._idle, []
+    for sock in idle:
+      sock.close()
+
+  def close(self):
+    """Closes the pool and all idle connections."""
+    self._closed = True
+    self.discard_idle()
+
+  def _connect(self) -> socket.socket:
+    sock = socket.create_connection(self._address, timeout=_TIMEOUT_SEC)
+    try:
+      _send_request(
+          sock,
+          f"host:transport:{self._serial}"
+          if self._serial
+          else "host:transport-any",
+      )
+    except (AdbProtocolError, OSError):
+      sock.close()
+      raise
+    return sock
+
+  def _replenish(self):
+    """Opens connections until the pool is full, then stops."""
+    while True:
+      # Connections taken meanwhile are replaced by this same thread.
+      with self._lock:
+        if self._closed or len(self._idle) >= self._size:
+          self._replenishing = False
+          return
+      try:
+        sock = self._connect()
+      except (AdbProtocolError, OSError):
+        with self._lock:
+          self._replenishing = False
+        return
+      with self._lock:
+        if not self._closed:
+          self._idle.append(sock)
+          continue
+      sock.close()
+
+
+class AdbServerClient(adb.AdbClient):
+  """AdbClient which speaks the adb server protocol over TCP.
+
+  Unlike the subprocess client, `shell` only returns stdout. Stderr is printed
+  unless the call is silent.
+  """
+
+  def __init__(
+      self,
+      serial: str = "",
+      host: str = _DEFAULT_HOST,
+      port: int = 0,
+      pool_size: int = 2,
+      fact_cache: device_cache.DeviceFactsCache | None = None,
+  ):
+    """Initializes the client.
+
+    Args:
+      serial: serial of the device to use. If empty, any single attached
+        device is used.
+      host: host of the adb server.
+      port: port of the adb server. Defaults to ANDROID_ADB_SERVER_PORT or
+        5037.
+      pool_size: number of connections to keep ready.
+      fact_cache: if set, facts which only change on reboot are read once
+        per boot.
+    """
+    super().__init__(serial, fact_cache=fact_cache)
+    self._pool = ConnectionPool(serial, host, port, pool_size)
+
+  def close(self):
+    """Close all pooled connections."""
+    self._pool.close()
+
+  def root(self):
+    """Try elevate to root permissions.
+
+    Raises:
+      AdbProtocolError: if adbd could not be restarted as root.
+    """
+    with self._open_service("root:") as sock:
+      output = _recv_all(sock).decode("utf-8", "replace").strip()
+    print(output)
+    if "cannot run as root" in output:
+      raise AdbProtocolError(output)
+    # adbd restarts when switching to root, which drops pooled connections.
+    self._pool.discard_idle()
+
+  def shell(
+      self, command: str, silent: bool = False, timeout: float = _TIMEOUT_SEC
+  ) -> str:
+    """Run an arbitrary shell command through the adb server.
+
+    Args:
+      command: shell command to execute on-device.
+      silent: if false, print the command and any stderr output.
+      timeout: seconds to wait for output of the command.
+
+    Raises:
+      AdbProtocolError: if the device is not available.
+      TimeoutExpired: if the command did not complete in time.
+
+    Returns:
+      stdout of the command for additional processing.
+    """
+    if not silent:
+      print(f"adb shell {command}")
+    stdout, stderr, _ = profiler.record_shell(
+        command, functools.partial(self._run_shell, timeout=timeout)
+    )
+    if stderr and not silent:
+      print(stderr.decode("utf-8", "replace").strip("\n"))
+    return stdout.decode("utf-8").strip("\n")
+
+  def shell_stream(self, command: str, silent: bool = False) -> Iterator[bytes]:
+    """Stream the stdout of a shell command as it arrives.
+
+    Args:
+      command: shell command to execute on-device.
+      silent: if false, print the command and any stderr output.
+
+    Raises:
+      AdbProtocolError: if the device is not available.
+      TimeoutExpired: if no output arrived in time.
+
+    Yields:
+      chunks of stdout, which may split lines and UTF-8 characters.
+    """
+    if not silent:
+      print(f"adb shell {command}")
+    start_time = time.perf_counter()
+    bytes_out = 0
+    returncode = None
+    stderr = []
+    try:
+      with self._open_service(f"shell,v2,raw:{command}") as sock:
+        for packet_id, data in _shell_v2_packets(sock):
+          bytes_out += len(data)
+          if packet_id == _SHELL_V2_STDOUT:
+            yield data
+          elif packet_id == _SHELL_V2_STDERR:
+            stderr.append(data)
+          elif packet_id == _SHELL_V2_EXIT:
+            returncode = data[0]
+            break
+    except socket.timeout as e:
+      raise subprocess.TimeoutExpired(command, _TIMEOUT_SEC) from e
+    finally:
+      profiler.record_adb_call(command, start_time, bytes_out, returncode)
+    if stderr and not silent:
+      print(b"".join(stderr).decode("utf-8", "replace").strip("\n"))
+
+  def _run_shell(
+      self, command: str, timeout: float = _TIMEOUT_SEC
+  ) -> tuple[bytes, bytes, int]:
+    try:
+      sock = self._open_service(f"shell,v2,raw:{command}")
+      with sock:
+        sock.settimeout(timeout)
+        return _read_shell_v2(sock)
+    except socket.timeout as e:
+      raise subprocess.TimeoutExpired(command, timeout) from e
+
+  def _open_service(self, service: str) -> socket.socket:
+    sock = self._pool.acquire()
+    try:
+      _send_request(sock, service)
+      return sock
+    except (AdbProtocolError, ConnectionError):
+      sock.close()
+    # Pooled connections go stale if the device disconnected or adbd
+    # restarted. The service was never opened, so retry on a fresh connection.
+    self._pool.discard_idle()
+    sock = self._pool.acquire()
+    try:
+      _send_request(sock, service)
+    except BaseException:
+      sock.close()
+      raise
+    return sock
+
+
+def _read_shell_v2(sock: socket.socket) -> tuple[bytes, bytes, int]:
+  stdout = []
+  stderr = []
+  for packet_id, data in _shell_v2_packets(sock):
+    if packet_id == _SHELL_V2_STDOUT:
+      stdout.append(data)
+    elif packet_id == _SHELL_V2_STDERR:
+      stderr.append(data)
+    elif packet_id == _SHELL_V2_EXIT:
+      return b"".join(stdout), b"".join(stderr), data[0]
+
+
+def _shell_v2_packets(sock: socket.socket) -> Iterator[tuple[int, bytes]]:
+  while True:
+    packet_id, length = _SHELL_V2_HEADER.unpack(
+        recv_exactly(sock, _SHELL_V2_HEADER.size)
+    )
+    yield packet_id, recv_exactly(sock, length)
+
+
+def _recv_all(sock: socket.socket) -> bytes:
+  chunks = []
+  for chunk in iter(lambda: sock.recv(4096), b""):
+    chunks.append(chunk)
+  return b"".join(chunks)
@@ -0,0 +1,141 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb_server
+import fake_adb_server
+
+_TEST_SERIAL = 'emulator-5554'
+
+
+class AdbServerClientTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.server = fake_adb_server.FakeAdbServer(serials=(_TEST_SERIAL,))
+    self.adb = adb_server.AdbServerClient(
+        serial=_TEST_SERIAL, port=self.server.port
+    )
+
+  def tearDown(self):
+    super().tearDown()
+    self.adb.close()
+    self.server.close()
+
+  def test_encode_request(self):
+    self.assertEqual(
+        adb_server.encode_request('host:version'), b'000chost:version'
+    )
+
+  def test_shell_returns_stdout(self):
+    output = self.adb.shell('echo hello', silent=True)
+
+    self.assertEqual(output, 'hello')
+    self.assertEqual(self.server.commands, ['echo hello'])
+
+  def test_shell_does_not_return_stderr_as_output(self):
+    output = self.adb.shell('echo out; echo err >&2', silent=True)
+
+    self.assertEqual(output, 'out')
+
+  def test_run_shell_demultiplexes_output(self):
+    stdout, stderr, returncode = self.adb._run_shell(
+        'echo out; echo err >&2; exit 3'
+    )
+
+    self.assertEqual(stdout, b'out\n')
+    self.assertEqual(stderr, b'err\n')
+    self.assertEqual(returncode, 3)
+
+  def test_shell_stream_yields_stdout(self):
+    chunks = list(
+        self.adb.shell_stream('echo out; echo err >&2; exit 3', silent=True)
+    )
+
+    self.assertEqual(b''.join(chunks), b'out\n')
+    self.assertEqual(self.server.commands, ['echo out; echo err >&2; exit 3'])
+
+  def test_getprop_and_device_config_use_server(self):
+    self.adb.getprop('ro.build.version.sdk')
+    self.adb.get_device_config('adservices', 'global_kill_switch')
+
+    self.assertEqual(
+        self.server.commands,
+        [
+            'getprop ro.build.version.sdk',
+            'device_config get adservices global_kill_switch',
+        ],
+    )
+
+  def test_pool_keeps_transport_bound_connections_ready(self):
+    pool = adb_server.ConnectionPool(
+        serial=_TEST_SERIAL, port=self.server.port, size=2
+    )
+    pool.acquire().close()
+
+    deadline = time.monotonic() + 5
+    while len(pool._idle) < 2 and time.monotonic() < deadline:
+      time.sleep(0.01)
+    self.assertLen(pool._idle, 2)
+    # A pooled connection is already bound to the device, so it accepts a
+    # device service right away.
+    sock = pool.acquire()
+    with sock:
+      adb_server._send_request(sock, 'shell,v2,raw:true')
+    pool.close()
+
+  def test_pool_replenishes_on_one_thread(self):
+    pool = adb_server.ConnectionPool(
+        serial=_TEST_SERIAL, port=self.server.port, size=2
+    )
+    # The replenisher never finishes, so it is still busy on later acquires.
+    replenish = self.enter_context(mock.patch.object(pool, '_replenish'))
+
+    for _ in range(5):
+      pool.acquire().close()
+    pool.close()
+
+    replenish.assert_called_once()
+
+  def test_shell_retries_after_stale_connections(self):
+    self.adb._pool._idle.append(_ClosedSocket())
+
+    self.assertEqual(self.adb.shell('echo ok', silent=True), 'ok')
+
+  def test_unknown_serial_raises(self):
+    client = adb_server.AdbServerClient(serial='missing', port=self.server.port)
+
+    with self.assertRaisesRegex(adb_server.AdbProtocolError, 'not found'):
+      client.shell('true', silent=True)
+
+  def test_root(self):
+    self.adb.root()
+
+
+class _ClosedSocket:
+  """Stand-in for a pooled connection the server has already closed."""
+
+  def sendall(self, unused_data):
+    raise ConnectionResetError()
+
+  def close(self):
+    pass
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import adb
+import fake_adb
+
+
+class AdbClientTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    fake_adb_dir = self.enter_context(tempfile.TemporaryDirectory())
+    fake_adb.write_fake_adb_executable(fake_adb_dir)
+    self.enter_context(
+        mock.patch.dict(
+            os.environ,
+            {'PATH': fake_adb_dir + os.pathsep + os.environ['PATH']},
+        )
+    )
+
+  @parameterized.named_parameters(
+      {'testcase_name': 'subprocess', 'persistent_session': False},
+      {'testcase_name': 'session', 'persistent_session': True},
+  )
+  def test_shell_batch(self, persistent_session):
+    adb_client = adb.AdbClient(persistent_session=persistent_session)
+
+    outputs = adb_client.shell_batch(
+        ['echo one', 'printf two', 'echo error >&2', 'true']
+    )
+    adb_client.close()
+
+    self.assertEqual(outputs, ['one', 'two', 'error', ''])
+
+  def test_shell_batch_splits_long_batches(self):
+    adb_client = adb.AdbClient()
+    self.enter_context(mock.patch.object(adb, '_MAX_BATCH_LENGTH', 300))
+    shell = self.enter_context(
+        mock.patch.object(adb_client, 'shell', wraps=adb_client.shell)
+    )
+
+    outputs = adb_client.shell_batch([f'echo {i}' for i in range(10)])
+
+    self.assertEqual(outputs, [str(i) for i in range(10)])
+    self.assertGreater(shell.call_count, 1)
+    self.assertLess(shell.call_count, 10)
+
+  def test_shell_batch_timeout_scales_with_commands(self):
+    adb_client = adb.AdbClient()
+    shell = self.enter_context(
+        mock.patch.object(adb_client, 'shell', wraps=adb_client.shell)
+    )
+
+    adb_client.shell_batch([f'echo {i}' for i in range(62)])
+
+    self.assertEqual(shell.call_args.kwargs['timeout'], 62 * adb._TIMEOUT_SEC)
+
+  def test_shell_stream(self):
+    adb_client = adb.AdbClient()
+    self.enter_context(mock.patch.object(adb, '_STREAM_CHUNK_SIZE', 4))
+
+    chunks = list(
+        adb_client.shell_stream('echo streamed; echo error >&2', silent=True)
+    )
+
+    self.assertGreater(len(chunks), 1)
+    self.assertEqual(b''.join(chunks), b'streamed\nerror\n')
+
+  def test_list_devices(self):
+    self.enter_context(
+        mock.patch.dict(os.environ, {'FAKE_ADB_SERIALS': 'serial-1 serial-2'})
+    )
+
+    self.assertEqual(adb.list_devices(), ['serial-1', 'serial-2'])
+
+  def test_serial_is_passed_to_adb(self):
+    adb_client = adb.AdbClient('serial-1')
+    run = self.enter_context(
+        mock.patch.object(adb.subprocess, 'run', wraps=adb.subprocess.run)
+    )
+
+    adb_client.shell('true', silent=True)
+
+    self.assertEqual(
+        run.call_args.args[0], ['adb', '-s', 'serial-1', 'shell', 'true']
+    )
+
+
+class FakeAdbTest(absltest.TestCase):
+
+  def test_behaves_like_a_client(self):
+    adb_client = fake_adb.FakeAdb()
+    adb_client.set_shell_outputs(['34'])
+
+    self.assertEqual(adb_client.get_sdk_version(), 34)
+    adb_client.close()
+    self.assertEqual(
+        adb_client.shell_calls, [['getprop', 'ro.build.version.sdk']]
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
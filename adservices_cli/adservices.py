@@ -14,17 +14,40 @@
 
 """Command for interacting with adservices."""
 
-import webbrowser
+import functools
+import json
+import shlex
+import time
+from typing import TYPE_CHECKING
 
-import ad_selection
 import adb
-import app_signals
 import constants
-import custom_audience
-import dev_session
+import device_state
 import device_utils
 import flag_constants
 
+# Command groups are imported on first use, so commands such as `status` do not
+# pay for loading protobuf descriptors and jsondiff.
+if TYPE_CHECKING:
+  import ad_selection
+  import app_signals
+  import custom_audience
+  import dev_session
+  import logcat
+  import perfetto_trace
+
+# Kinds of flag writes made by enable/disable.
+_SYS_PROP = "sys_prop"
+_DEVICE_CONFIG = "device_config"
+_SYNC_DISABLED = "sync_disabled"
+
+_KILL_TIMEOUT_SEC = 5
+RESTART_TIMEOUT_SEC = 30
+# Any adservices shell command binds to adservices, which starts the process.
+_WAKE_COMMAND = (
+    f"cmd adservices_manager echo --message {constants.ADSERVICES_API_PACKAGE}"
+)
+
 
 class AdServices:
   """Privacy Sandbox for Android CLI (http://g.co/privacysandbox)."""
@@ -44,64 +67,113 @@ class AdServices:
       adb_client: adb.AdbClient,
   ):
     self.adb = adb_client
-    self.custom_audience = custom_audience.CustomAudience(adb_client)
-    self.ad_selection = ad_selection.AdSelection(adb_client)
-    self.app_signals = app_signals.AppSignals(adb_client)
-    self.dev_session = dev_session.DevSession(adb_client)
+
+  @functools.cached_property
+  def custom_audience(self) -> "custom_audience.CustomAudience":
+    """Inspect and refresh custom audiences."""
+    import custom_audience  # pylint: disable=g-import-not-at-top
+
+    return custom_audience.CustomAudience(self.adb)
+
+  @functools.cached_property
+  def ad_selection(self) -> "ad_selection.AdSelection":
+    """Debug ad selection and auctions."""
+    import ad_selection  # pylint: disable=g-import-not-at-top
+
+    return ad_selection.AdSelection(self.adb)
+
+  @functools.cached_property
+  def app_signals(self) -> "app_signals.AppSignals":
+    """Trigger Protected App Signals encoding."""
+    import app_signals  # pylint: disable=g-import-not-at-top
+
+    return app_signals.AppSignals(self.adb)
+
+  @functools.cached_property
+  def dev_session(self) -> "dev_session.DevSession":
+    """Manage developer sessions."""
+    import dev_session  # pylint: disable=g-import-not-at-top
+
+    return dev_session.DevSession(self.adb)
+
+  @functools.cached_property
+  def logs(self) -> "logcat.Logs":
+    """View adservices logs."""
+    import logcat  # pylint: disable=g-import-not-at-top
+
+    return logcat.Logs(self.adb)
+
+  @functools.cached_property
+  def trace(self) -> "perfetto_trace.Trace":
+    """Capture and analyze Perfetto traces."""
+    import perfetto_trace  # pylint: disable=g-import-not-at-top
+
+    return perfetto_trace.Trace(self.adb)
 
   def status(self):
     """Print details about running adservices.
 
     This also queries for relevant device properties, such as the configuration
-    for the Privacy Sandbox feature flag and enrollment checks.
+    for the Privacy Sandbox feature flag and enrollment checks. All values are
+    read with a single `adb shell` call.
     """
-    print("DEVICE INFORMATION")
-    sdk_version = self.adb.get_sdk_version()
-    print(f"Android SDK Version: {sdk_version}")
-    print(f"Is AdServices installed: {self._is_adservices_installed()}")
-    print(f"AdServices extension version: {self._get_ad_services_version()}")
-    print(f"Apex version: {self.adb.get_package(self._ADSERVICES_PACKAGE)}")
-    print(f"Is AdServices running: {self._is_adservices_running()}")
-    print("")
-    print("AD SERVICES INFORMATION")
-    for kill_switch in flag_constants.KILL_SWITCHES:
-      sys_property_value = self._get_adservices_sys_prop(kill_switch)
-      if not sys_property_value:
-        sys_property_value = "unknown"
-      print(f"{kill_switch}: {sys_property_value}")
+    report = self.status_report(device_state.DeviceState.read(self.adb))
+    for section, values in report.items():
+      print(section)
+      for key, value in values.items():
+        print(f"{key}: {value}")
+      print("")
 
-    for flag in flag_constants.ENABLE_DEFAULT_FLAGS:
-      device_config_value = self._get_adservices_device_config(flag)
-      if not device_config_value:
-        device_config_value = "unknown"
-      print(f"{flag}: {device_config_value}")
+  def status_report(
+      self, state: device_state.DeviceState
+  ) -> dict[str, dict[str, str]]:
+    """Build the status report from a device state snapshot.
 
-    for cli_flag in flag_constants.DEBUG_FLAGS:
-      sys_property_value = self._get_adservices_sys_prop(cli_flag)
-      if not sys_property_value:
-        sys_property_value = "unknown"
-      print(f"{cli_flag}: {sys_property_value}")
+    This is what `status` prints, for callers which render it themselves,
+    such as a fleet of devices.
 
-    for allow_list in flag_constants.ALLOW_LISTS:
-      allow_list_value = self._get_adservices_device_config(allow_list)
-      if not allow_list_value:
-        allow_list_value = ""
-      print(f"{allow_list}: {allow_list_value}")
+    Args:
+      state: snapshot of the device state.
 
-    feature_flag_set = set()
+    Returns:
+      report sections, each mapping a property or flag name to its value.
+    """
+    apex_version = state.get_package(self._ADSERVICES_PACKAGE)
+    device_info = {
+        "Android SDK Version": state.sdk_version,
+        "Is AdServices installed": bool(apex_version),
+        "AdServices extension version": state.ad_services_version,
+        "Apex version": apex_version,
+        "Is AdServices running": state.is_adservices_running,
+    }
+
+    def sys_prop(key: str) -> str:
+      return state.props.get(
+          f"{self._ADSERVICES_SYSTEM_PROPERTIES_NAMESPACE}.{key}", ""
+      )
+
+    adservices_info = {}
+    for kill_switch in flag_constants.KILL_SWITCHES:
+      adservices_info[kill_switch] = sys_prop(kill_switch) or "unknown"
+    for flag in flag_constants.ENABLE_DEFAULT_FLAGS:
+      adservices_info[flag] = state.device_config.get(flag) or "unknown"
+    for cli_flag in flag_constants.DEBUG_FLAGS:
+      adservices_info[cli_flag] = sys_prop(cli_flag) or "unknown"
+    for allow_list in flag_constants.ALLOW_LISTS:
+      adservices_info[allow_list] = state.device_config.get(allow_list, "")
     for feature_name in flag_constants.FEATURE_NAMES:
       for feature_flag in flag_constants.FEATURE_FLAGS_MAP.get(feature_name):
-        feature_flag_set.add(feature_flag)
-
-    for flag in feature_flag_set:
-      device_config_value = self._get_adservices_device_config(flag)
-      if not device_config_value:
-        device_config_value = "unknown"
-      print(f"{flag}: {device_config_value}")
-    print(
-        f"{flag_constants.AD_SELECTION_BIDDING_LOGIC_V3},"
-        f" {self._get_adservices_device_config(flag_constants.AD_SELECTION_BIDDING_LOGIC_V3)}"
+        adservices_info[feature_flag] = (
+            state.device_config.get(feature_flag) or "unknown"
+        )
+    adservices_info[flag_constants.AD_SELECTION_BIDDING_LOGIC_V3] = (
+        state.device_config.get(flag_constants.AD_SELECTION_BIDDING_LOGIC_V3)
+        or "unknown"
     )
+    return {
+        "DEVICE INFORMATION": {k: str(v) for k, v in device_info.items()},
+        "AD SERVICES INFORMATION": adservices_info,
+    }
 
   def enable(
       self,
@@ -189,10 +261,115 @@ class AdServices:
 
     self.adb.shell(f"am force-stop {constants.ADSERVICES_API_PACKAGE}")
 
-    if self._is_adservices_running():
-      print("Error: adservices module is still running.")
-    else:
+    # The process takes a moment to exit after force-stop returns.
+    if device_utils.wait_until(
+        lambda: not self._is_adservices_running(), _KILL_TIMEOUT_SEC
+    ):
       print("Success: adservices process is not running after killing.")
+    else:
+      print("Error: adservices module is still running.")
+
+  def restart(
+      self,
+      wait_ready: bool = False,
+      timeout_sec: float = RESTART_TIMEOUT_SEC,
+  ) -> dict[str, float | int]:
+    """Restart the core adservices process, for example to reload flags.
+
+    Stops adservices with `am force-stop`, waits for the process to exit and
+    starts it again by running an adservices shell command. Both waits poll
+    the device with exponential backoff, so no fixed sleeps are needed.
+
+    Args:
+      wait_ready: if true, wait until the new process is running.
+      timeout_sec: maximum time to wait for the process to exit, and again for
+        the new process to start.
+
+    Raises:
+      TimeoutError: if adservices did not exit or start in time.
+
+    Returns:
+      `kill_to_dead_ms`, the time from force-stop until the old process
+      exited. With `wait_ready`, also `dead_to_ready_ms`, the time until the
+      new process was running, and its `pid`.
+    """
+    package = constants.ADSERVICES_API_PACKAGE
+    old_pid = self.adb.get_pid(package)
+    kill_time = time.monotonic()
+    self.adb.shell(f"am force-stop {package}")
+    if not device_utils.wait_until(
+        lambda: old_pid == -1 or self.adb.get_pid(package) != old_pid,
+        timeout_sec,
+    ):
+      raise TimeoutError(
+          f"adservices process {old_pid} still running after {timeout_sec}s."
+      )
+    dead_time = time.monotonic()
+    latencies = {"kill_to_dead_ms": _to_ms(dead_time - kill_time)}
+
+    self.adb.shell(_WAKE_COMMAND, silent=True)
+    if not wait_ready:
+      return latencies
+    pid = -1
+
+    def is_ready() -> bool:
+      nonlocal pid
+      pid = self.adb.get_pid(package)
+      return pid > -1
+
+    if not device_utils.wait_until(is_ready, timeout_sec):
+      raise TimeoutError(f"adservices did not start within {timeout_sec}s.")
+    latencies["dead_to_ready_ms"] = _to_ms(time.monotonic() - dead_time)
+    latencies["pid"] = pid
+    return latencies
+
+  def bench(
+      self,
+      iterations: int = 10,
+      buyer: str = "",
+      ad_selection_id: str = "",
+      owner_app_package: str = "",
+      modes=("cold", "warm"),
+      output: str = "adservices_bench.json",
+  ):
+    """Measure cold and warm latency of ad selection commands.
+
+    Runs `ad-selection get-ad-selection-data`, `ad-selection
+    view-auction-result`, `custom-audience list` and `app-signals
+    trigger-encoding`. Cold runs kill adservices first; warm runs follow an
+    untimed run. Commands whose arguments are not given are skipped.
+
+    Args:
+      iterations: timed runs of each command in each mode.
+      buyer: buyer to get ad selection data, list custom audiences and
+        trigger encoding for.
+      ad_selection_id: auction to view.
+      owner_app_package: app which owns the custom audiences to list.
+      modes: comma separated modes to run, `cold`, `warm` or both.
+      output: JSON file to write the device details, summaries and every
+        latency to, for comparing adservices versions. Not written if empty.
+    """
+    import bench  # pylint: disable=g-import-not-at-top
+
+    if isinstance(modes, str):
+      modes = modes.split(",")
+    commands = bench.workloads(self, buyer, ad_selection_id, owner_app_package)
+    state = device_state.DeviceState.read(self.adb)
+    report = {
+        "device": {
+            "serial": self.adb.serial,
+            "sdk_version": state.sdk_version,
+            "ad_services_version": state.ad_services_version,
+            "apex_version": state.get_package(self._ADSERVICES_PACKAGE),
+        },
+        "iterations": iterations,
+        "results": bench.run(self, commands, iterations, tuple(modes)),
+    }
+    print(bench.format_report(report))
+    if output:
+      with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+      print(f"Wrote results to {output}.")
 
   def view_logs_cmd(self) -> str:
     """Prints the command to view filtered logs for adservices."""
@@ -208,16 +385,20 @@ class AdServices:
 
   def open_docs(self):
     """Open Privacy Sandbox for Android documentation."""
+    import webbrowser  # pylint: disable=g-import-not-at-top
+
     webbrowser.open(self._ADSERVICES_DOCS_URL)
 
   def feedback(self):
     """Open Privacy Sandbox for DevTools feedback page."""
+    import webbrowser  # pylint: disable=g-import-not-at-top
+
     webbrowser.open(self._ADSERVICES_CLI_ISSUES_URL)
 
-  def _is_service_supported(self) -> bool:
+  def _is_service_supported(self, state: device_state.DeviceState) -> bool:
     # TODO(b/328846161): Add support for ExtServices.
-    version_code = self.adb.get_sdk_version()
-    adservices_ext = self._get_ad_services_version()
+    version_code = state.sdk_version
+    adservices_ext = state.ad_services_version
     return (
         version_code >= 33 and adservices_ext >= 4
     ) and not device_utils.is_extservices(version_code)
@@ -230,92 +411,105 @@ class AdServices:
   ):
     """Set the adservices process and feature flags to enabled or not.
 
+    The current flag values are read once, and only the writes which change
+    something are sent to the device, as a single batch.
+
     Args:
       enabled: If true, disable all kill switches.
       feature_name: enables/disables a specific feature or all features.
       disable_flag_push: If true, prevent remote flag pushes from being set.
         Uses the test override to do this.
     """
-    if not self._is_service_supported():
+    state = device_state.DeviceState.read(self.adb)
+    if not self._is_service_supported(state):
       print("Warning: adservices is supported from 33-ext4+")
     self._is_valid_feature_name(feature_name)
 
+    writes = self._plan_flag_writes(enabled, feature_name, disable_flag_push)
+    pending = [
+        _flag_write_command(kind, key, value)
+        for (kind, key), value in writes.items()
+        if _current_flag_value(state, kind, key) != value
+    ]
+    if pending:
+      for command, output in zip(pending, self.adb.shell_batch(pending)):
+        print(f"adb shell {command}")
+        if output:
+          print(output)
+    print(
+        f"Applied {len(pending)} flag changes, skipped"
+        f" {len(writes) - len(pending)} already set."
+    )
+    if not pending:
+      return
+
+    print("Killing adservices process to reset flags.")
+    self.kill()
+
+  def _plan_flag_writes(
+      self,
+      enabled: bool,
+      feature_name: str,
+      disable_flag_push: bool,
+  ) -> dict[tuple[str, str], str]:
+    """Compute the desired value of every flag touched by enable/disable.
+
+    Args:
+      enabled: If true, disable all kill switches.
+      feature_name: enables/disables a specific feature or all features.
+      disable_flag_push: If true, prevent remote flag pushes from being set.
+
+    Returns:
+      desired values keyed by (kind, key), where kind is one of _SYS_PROP,
+      _DEVICE_CONFIG or _SYNC_DISABLED. Later writes to the same key override
+      earlier ones.
+    """
     kill_switch_value = "false" if enabled else "true"
     flag_value = "true" if enabled else "false"
-    allow_list_value = '"*"' if enabled else '""'
+    allow_list_value = "*" if enabled else ""
 
+    def sys_prop(key: str) -> tuple[str, str]:
+      return _SYS_PROP, f"{self._ADSERVICES_SYSTEM_PROPERTIES_NAMESPACE}.{key}"
+
+    writes = {}
     for kill_switch in flag_constants.KILL_SWITCHES:
-      self._put_adservices_sys_prop(kill_switch, kill_switch_value)
+      writes[sys_prop(kill_switch)] = kill_switch_value
 
     for flag in flag_constants.ENABLE_DEFAULT_FLAGS:
-      self._put_adservices_device_config(flag, flag_value)
+      writes[(_DEVICE_CONFIG, flag)] = flag_value
 
     for cli_flag in flag_constants.DEBUG_FLAGS:
-      self._put_adservices_sys_prop(cli_flag, flag_value)
+      writes[sys_prop(cli_flag)] = flag_value
 
     for allow_list in flag_constants.ALLOW_LISTS:
-      self._put_adservices_device_config(allow_list, allow_list_value)
+      writes[(_DEVICE_CONFIG, allow_list)] = allow_list_value
 
     if feature_name == flag_constants.FEATURE_ALL:
-      for feature in flag_constants.FEATURE_NAMES:
-        self._enable_feature(feature, flag_value)
+      features = flag_constants.FEATURE_NAMES
     else:
-      self._enable_feature(feature_name, flag_value)
+      features = [feature_name]
+    for feature in features:
+      for feature_flag in flag_constants.FEATURE_FLAGS_MAP.get(feature):
+        writes[(_DEVICE_CONFIG, feature_flag)] = flag_value
 
     if feature_name in flag_constants.FEATURES_WITH_DISABLED_JS_CACHING:
-      self._put_adservices_device_config(
-          flag_constants.ENABLE_HTTP_CACHE_JS_CACHING, kill_switch_value
+      writes[(_DEVICE_CONFIG, flag_constants.ENABLE_HTTP_CACHE_JS_CACHING)] = (
+          kill_switch_value
       )
 
     if feature_name == flag_constants.ON_DEVICE_AUCTION_V3:
-      bidding_logic_js_version = "3" if enabled else "2"
-      self._put_adservices_device_config(
-          flag_constants.AD_SELECTION_BIDDING_LOGIC_V3, bidding_logic_js_version
+      writes[(_DEVICE_CONFIG, flag_constants.AD_SELECTION_BIDDING_LOGIC_V3)] = (
+          "3" if enabled else "2"
       )
 
-    self.adb.set_sync_disabled_for_tests(
-        "until_reboot" if disable_flag_push else "none",
+    writes[(_SYNC_DISABLED, "")] = (
+        "until_reboot" if disable_flag_push else "none"
     )
 
     if enabled:
       for log_tag in flag_constants.LOG_TAGS_FOR_VERBOSE_LOGGING:
-        self.adb.setprop(f"log.tag.{log_tag}", "VERBOSE", False)
-
-    print("Killing adservices process to reset flags.")
-    self.kill()
-
-  def _get_ad_services_version(self) -> int:
-    """Get AdServices extension version on device.
-
-    Returns:
-      int representation of SDK version, or -1 if unknown.
-    """
-    version_str = self.adb.getprop("build.version.extensions.ad_services")
-    if not version_str:
-      return -1
-    return int(version_str)
-
-  def _get_adservices_device_config(self, key: str, silent: bool = True) -> str:
-    return self.adb.get_device_config(
-        constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE, key, silent
-    )
-
-  def _put_adservices_device_config(self, key: str, value: str):
-    self.adb.put_device_config(
-        constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE, key, value, silent=False
-    )
-
-  def _get_adservices_sys_prop(self, key: str, silent: bool = True) -> str:
-    return self.adb.getprop(
-        f"{self._ADSERVICES_SYSTEM_PROPERTIES_NAMESPACE}.{key}", silent
-    )
-
-  def _put_adservices_sys_prop(self, key: str, value: str):
-    self.adb.setprop(
-        f"{self._ADSERVICES_SYSTEM_PROPERTIES_NAMESPACE}.{key}",
-        value,
-        silent=False,
-    )
+        writes[(_SYS_PROP, f"log.tag.{log_tag}")] = "VERBOSE"
+    return writes
 
   def _is_adservices_installed(self) -> bool:
     """Return true if adservices is currently installed.
@@ -339,6 +533,27 @@ class AdServices:
       )
     print(f"Enabling {feature_name}")
 
-  def _enable_feature(self, feature_name: str, feature_flag_value: str):
-    for feature_flag in flag_constants.FEATURE_FLAGS_MAP.get(feature_name):
-      self._put_adservices_device_config(feature_flag, feature_flag_value)
+
+def _current_flag_value(
+    state: device_state.DeviceState, kind: str, key: str
+) -> str | None:
+  if kind == _SYS_PROP:
+    return state.props.get(key)
+  if kind == _DEVICE_CONFIG:
+    return state.device_config.get(key)
+  return state.sync_disabled_mode
+
+
+def _flag_write_command(kind: str, key: str, value: str) -> str:
+  if kind == _SYS_PROP:
+    return f"setprop {key} {shlex.quote(value)}"
+  if kind == _DEVICE_CONFIG:
+    return (
+        f"device_config put {constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE}"
+        f" {key} {shlex.quote(value)}"
+    )
+  return f"device_config set_sync_disabled_for_tests {value}"
+
+
+def _to_ms(seconds: float) -> float:
+  return round(seconds * 1000, 1)
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
 from unittest import mock
 
 from absl.testing import absltest
@@ -20,6 +21,7 @@ from absl.testing import parameterized
 import adb
 import adservices
 import constants
+import device_state
 import flag_constants
 
 
@@ -30,6 +32,12 @@ class AdServicesTest(parameterized.TestCase):
     self.adb = mock.create_autospec(adb.AdbClient)
     self.adservices = adservices.AdServices(self.adb)
     self.adb.get_sdk_version.return_value = 33
+    self.adb.get_apex_packages.return_value = ''
+    # adservices is running until it is killed.
+    self.adb.is_process_running.side_effect = [True, False]
+    self.adb.shell_batch.side_effect = lambda commands, silent=True: [''] * len(
+        commands
+    )
 
   @parameterized.named_parameters(
       {
@@ -74,12 +82,143 @@ class AdServicesTest(parameterized.TestCase):
   ):
     self.adservices._set_service_enabled(feature_enabled, feature_name)
 
-    self.adb.put_device_config.assert_any_call(
-        constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE,
-        flag_constants.ENABLE_HTTP_CACHE_JS_CACHING,
-        js_cache_enabled,
-        silent=False,
+    self.assertIn(
+        f'device_config put {constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE}'
+        f' {flag_constants.ENABLE_HTTP_CACHE_JS_CACHING} {js_cache_enabled}',
+        self.adb.shell_batch.call_args.args[0],
+    )
+
+  def test_set_service_enabled_skips_flags_already_set(self):
+    writes = self.adservices._plan_flag_writes(
+        True, flag_constants.FEATURE_ALL, disable_flag_push=True
+    )
+    props = ''.join(
+        f'[{key}]: [{value}]\n'
+        for (kind, key), value in writes.items()
+        if kind == adservices._SYS_PROP
+    )
+    device_config = ''.join(
+        f'{key}={value}\n'
+        for (kind, key), value in writes.items()
+        if kind == adservices._DEVICE_CONFIG
+    )
+    self.adb.shell_batch.side_effect = None
+    self.adb.shell_batch.return_value = [
+        props,
+        device_config,
+        '1234',
+        'until_reboot',
+        '',
+    ]
+
+    self.adservices._set_service_enabled(
+        True, flag_constants.FEATURE_ALL, disable_flag_push=True
+    )
+
+    # Only the device state was read, and adservices was not restarted.
+    self.adb.shell_batch.assert_called_once()
+    self.adb.shell.assert_not_called()
+
+  def test_set_service_enabled_writes_only_changed_flags(self):
+    self.adb.shell_batch.side_effect = [
+        [
+            '[debug.adservices.global_kill_switch]: [true]',
+            'ppapi_app_allow_list=*',
+            '',
+            'none',
+            '',
+        ],
+        [''] * 1000,
+    ]
+
+    self.adservices._set_service_enabled(True, flag_constants.FEATURE_ALL)
+
+    written = self.adb.shell_batch.call_args.args[0]
+    self.assertIn('setprop debug.adservices.global_kill_switch false', written)
+    self.assertNotIn(
+        f'device_config put {constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE}'
+        " ppapi_app_allow_list '*'",
+        written,
+    )
+    self.assertNotIn('device_config set_sync_disabled_for_tests none', written)
+
+  def test_status_report_reads_snapshot(self):
+    state = device_state.DeviceState(
+        props={
+            'ro.build.version.sdk': '34',
+            'build.version.extensions.ad_services': '12',
+            'debug.adservices.global_kill_switch': 'false',
+        },
+        device_config={flag_constants.AD_SELECTION_BIDDING_LOGIC_V3: '3'},
+        apex_packages='package:com.google.android.adservices versionCode:1',
+        adservices_pid=-1,
+    )
+
+    report = self.adservices.status_report(state)
+
+    self.assertEqual(
+        report['DEVICE INFORMATION'],
+        {
+            'Android SDK Version': '34',
+            'Is AdServices installed': 'True',
+            'AdServices extension version': '12',
+            'Apex version': (
+                'package:com.google.android.adservices versionCode:1'
+            ),
+            'Is AdServices running': 'False',
+        },
     )
+    adservices_info = report['AD SERVICES INFORMATION']
+    self.assertEqual(adservices_info['global_kill_switch'], 'false')
+    self.assertEqual(
+        adservices_info[flag_constants.AD_SELECTION_BIDDING_LOGIC_V3], '3'
+    )
+    self.assertEqual(adservices_info['fledge_auction_server_enabled'], 'unknown')
+
+  def test_status_report_without_adservices_apex(self):
+    state = device_state.DeviceState(
+        props={}, device_config={}, apex_packages='', adservices_pid=-1
+    )
+
+    report = self.adservices.status_report(state)
+
+    self.assertEqual(
+        report['DEVICE INFORMATION']['Is AdServices installed'], 'False'
+    )
+    self.assertEqual(
+        report['AD SERVICES INFORMATION'][
+            flag_constants.AD_SELECTION_BIDDING_LOGIC_V3
+        ],
+        'unknown',
+    )
+
+  def test_restart_waits_for_respawn(self):
+    self.enter_context(mock.patch.object(time, 'sleep'))
+    self.adb.get_pid.side_effect = [100, 100, -1, -1, 200]
+
+    latencies = self.adservices.restart(wait_ready=True)
+
+    self.assertEqual(latencies['pid'], 200)
+    self.assertGreaterEqual(latencies['kill_to_dead_ms'], 0)
+    self.assertGreaterEqual(latencies['dead_to_ready_ms'], 0)
+    self.assertIn('force-stop', self.adb.shell.call_args_list[0].args[0])
+    self.assertIn(
+        'adservices_manager', self.adb.shell.call_args_list[1].args[0]
+    )
+
+  def test_restart_without_waiting_does_not_poll_for_respawn(self):
+    self.adb.get_pid.side_effect = [100, -1]
+
+    latencies = self.adservices.restart()
+
+    self.assertEqual(list(latencies), ['kill_to_dead_ms'])
+    self.assertEqual(self.adb.get_pid.call_count, 2)
+
+  def test_restart_times_out_if_process_survives(self):
+    self.adb.get_pid.return_value = 100
+
+    with self.assertRaises(TimeoutError):
+      self.adservices.restart(wait_ready=True, timeout_sec=0)
 
 
 if __name__ == '__main__':
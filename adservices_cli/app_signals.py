@@ -15,6 +15,7 @@
 """Command for interacting with Protected App Signals CLI Commands."""
 
 import adb
+import async_adb
 import constants
 import utilities
 
@@ -50,15 +51,50 @@ class AppSignals:
     """
     if buyer:
       return self._adb.execute_adservices_shell_command(
-          utilities.format_command(
-              _COMMAND_PREFIX,
-              _TRIGGER_ENCODING_COMMAND,
-              "",
-              {
-                  _ARG_BUYER: buyer,
-              },
-          )
+          _trigger_encoding_command(buyer)
       )
     return self._adb.run_scheduled_background_job(
         constants.ADSERVICES_API_PACKAGE, _TRIGGER_ENCODING_JOB_ID
     )
+
+
+class AsyncAppSignals:
+  """Interact with Protected App Signals using asyncio.
+
+  Mirrors AppSignals, so that many queries can run concurrently.
+  """
+
+  def __init__(
+      self,
+      adb_client: async_adb.AsyncAdbClient,
+  ):
+    self._adb = adb_client
+
+  async def trigger_encoding(self, buyer: str = "") -> str:
+    """Triggers script download, update and encoding for signals on the device.
+
+    Args:
+      buyer: Optional. The specific buyer to trigger encoding for. If unset,
+        then encoding will run for all buyers.
+
+    Returns:
+      Textual output of trigger encoding command.
+    """
+    if buyer:
+      return await self._adb.execute_adservices_shell_command(
+          _trigger_encoding_command(buyer)
+      )
+    return await self._adb.run_scheduled_background_job(
+        constants.ADSERVICES_API_PACKAGE, _TRIGGER_ENCODING_JOB_ID
+    )
+
+
+def _trigger_encoding_command(buyer: str) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _TRIGGER_ENCODING_COMMAND,
+      "",
+      {
+          _ARG_BUYER: buyer,
+      },
+  )
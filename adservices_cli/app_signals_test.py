@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+
 from absl.testing import absltest
 
 import app_signals
@@ -85,5 +87,39 @@ class AdSelectionTest(absltest.TestCase):
     self.assertEqual(output, _TRIGGER_ENCODING_FAILURE_RESPONSE)
 
 
+class AsyncAppSignalsTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb = fake_adb.FakeAsyncAdb()
+    self.app_signals = app_signals.AsyncAppSignals(self.adb)
+
+  def test_trigger_encoding_happy_path(self):
+    self.adb.set_shell_outputs([_TRIGGER_ENCODING_SUCCESS_RESPONSE])
+
+    output = asyncio.run(self.app_signals.trigger_encoding())
+
+    self.assertContainsSubset(
+        utilities.split_adb_command(
+            "cmd jobscheduler run -f"
+            f" {constants.ADSERVICES_API_PACKAGE} {app_signals._TRIGGER_ENCODING_JOB_ID}"
+        ),
+        self.adb.shell_calls[0],
+    )
+    self.assertEqual(output, _TRIGGER_ENCODING_SUCCESS_RESPONSE)
+
+  def test_trigger_encoding_for_buyer_happy_path(self):
+    buyer = "example.com"
+    self.adb.set_shell_outputs([_TRIGGER_ENCODING_SUCCESS_RESPONSE])
+
+    output = asyncio.run(self.app_signals.trigger_encoding(buyer))
+
+    self.assertContainsSubset(
+        [app_signals._TRIGGER_ENCODING_COMMAND, app_signals._ARG_BUYER, buyer],
+        self.adb.shell_calls[0],
+    )
+    self.assertEqual(output, _TRIGGER_ENCODING_SUCCESS_RESPONSE)
+
+
 if __name__ == "__main__":
   absltest.main()
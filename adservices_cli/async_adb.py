@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""ADB commands expressed as asyncio coroutines."""
+
+import asyncio
+import subprocess
+import time
+
+import profiler
+
+_TIMEOUT_SEC = 5
+_DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncAdbClient:
+  """Asyncio client for interacting with ADB (Android Debug Bridge).
+
+  Independent queries can be awaited concurrently, for example with
+  `asyncio.gather`. At most `max_concurrency` `adb` processes run at once.
+  """
+
+  def __init__(
+      self,
+      serial: str = "",
+      max_concurrency: int = _DEFAULT_MAX_CONCURRENCY,
+  ):
+    """Initializes the client.
+
+    Args:
+      serial: serial of the device to use. If empty, adb picks the only
+        attached device.
+      max_concurrency: maximum number of `adb` processes running at once.
+    """
+    if max_concurrency < 1:
+      raise ValueError(
+          f"max_concurrency must be at least 1, was {max_concurrency}."
+      )
+    self.serial = serial
+    self._adb = ["adb", "-s", serial] if serial else ["adb"]
+    self._max_concurrency = max_concurrency
+    self._semaphore = None
+
+  async def shell(self, command: str, silent: bool = False) -> str:
+    """Run an arbitrary `adb shell` command.
+
+    Args:
+      command: shell command to execute on-device.
+      silent: if false, print the command to stdout for additional debugging.
+
+    Raises:
+      TimeoutExpired: if the command did not complete in time.
+
+    Returns:
+      string output for additional processing. Like AdbClient.shell, this is
+      stderr if the command wrote to it.
+    """
+    exec_command = " ".join(self._adb + ["shell", command])
+    if not silent:
+      print(exec_command)
+    start_time = time.perf_counter()
+    stdout, stderr, returncode = await self._run(
+        self._adb + ["shell"] + command.split(" ")
+    )
+    profiler.record_adb_call(
+        command, start_time, len(stdout) + len(stderr), returncode
+    )
+    if stderr:
+      if not silent:
+        print(f"Error occurred while running {exec_command}")
+      return stderr.decode("utf-8").strip("\n")
+    return stdout.decode("utf-8").strip("\n")
+
+  async def execute_adservices_shell_command(self, command: str) -> str:
+    """Executes the adservices shell command.
+
+    Args:
+      command: the complete command with arguments.
+
+    Returns:
+      the result of the command.
+    """
+    return await self.shell(f"cmd adservices_manager {command}")
+
+  async def run_scheduled_background_job(
+      self, namespace: str, job_id: int
+  ) -> str:
+    """Force runs a scheduled background job.
+
+    Args:
+      namespace: the namespace of the background job.
+      job_id: the identifier of the background job.
+
+    Returns:
+      Textual output of the command execution
+    """
+    return await self.shell(f"cmd jobscheduler run -f {namespace} {job_id}")
+
+  async def _run(self, args: list[str]) -> tuple[bytes, bytes, int]:
+    # The semaphore binds to the running event loop, so create it lazily.
+    if self._semaphore is None:
+      self._semaphore = asyncio.Semaphore(self._max_concurrency)
+    async with self._semaphore:
+      process = await asyncio.create_subprocess_exec(
+          *args,
+          stdin=asyncio.subprocess.DEVNULL,
+          stdout=asyncio.subprocess.PIPE,
+          stderr=asyncio.subprocess.PIPE,
+      )
+      try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(), timeout=_TIMEOUT_SEC
+        )
+      except asyncio.TimeoutError as e:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(args, _TIMEOUT_SEC) from e
+      return stdout, stderr, process.returncode
@@ -0,0 +1,89 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import tempfile
+import time
+from unittest import mock
+
+from absl.testing import absltest
+
+import async_adb
+import fake_adb
+
+_SLEEP_SEC = 0.2
+
+
+class AsyncAdbClientTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    fake_adb_dir = self.enter_context(tempfile.TemporaryDirectory())
+    fake_adb.write_fake_adb_executable(fake_adb_dir)
+    self.enter_context(
+        mock.patch.dict(
+            os.environ,
+            {'PATH': fake_adb_dir + os.pathsep + os.environ['PATH']},
+        )
+    )
+
+  def _run_sleeps(self, adb_client: async_adb.AsyncAdbClient, count: int):
+    async def run():
+      return await asyncio.gather(*[
+          adb_client.shell(f'sleep {_SLEEP_SEC}; echo {i}', silent=True)
+          for i in range(count)
+      ])
+
+    start = time.monotonic()
+    outputs = asyncio.run(run())
+    return outputs, time.monotonic() - start
+
+  def test_shell_returns_stdout(self):
+    output = asyncio.run(
+        async_adb.AsyncAdbClient().shell('echo hello', silent=True)
+    )
+
+    self.assertEqual(output, 'hello')
+
+  def test_shell_returns_stderr(self):
+    output = asyncio.run(
+        async_adb.AsyncAdbClient().shell('echo error >&2', silent=True)
+    )
+
+    self.assertEqual(output, 'error')
+
+  def test_shell_runs_concurrently(self):
+    outputs, elapsed = self._run_sleeps(
+        async_adb.AsyncAdbClient(max_concurrency=4), 4
+    )
+
+    self.assertEqual(outputs, ['0', '1', '2', '3'])
+    self.assertLess(elapsed, 3 * _SLEEP_SEC)
+
+  def test_shell_respects_concurrency_cap(self):
+    outputs, elapsed = self._run_sleeps(
+        async_adb.AsyncAdbClient(max_concurrency=1), 3
+    )
+
+    self.assertEqual(outputs, ['0', '1', '2'])
+    self.assertGreaterEqual(elapsed, 3 * _SLEEP_SEC)
+
+  def test_invalid_concurrency_raises(self):
+    with self.assertRaises(ValueError):
+      async_adb.AsyncAdbClient(max_concurrency=0)
+
+
+if __name__ == '__main__':
+  absltest.main()
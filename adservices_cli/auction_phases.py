@@ -0,0 +1,264 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-phase latency of on-device auctions, extracted from fledge logs.
+
+With verbose `adservices.fledge` logging enabled, `selectAds` logs the start
+and end of each of its steps. Records are grouped into one timeline per
+auction, from the log which starts an ad selection to the log which ends it,
+and every phase within it is timed from its start log to its end log.
+Reporting happens after `selectAds` returns, so it is attributed to the
+auction which ended last.
+
+Phases which run concurrently, such as `generateBid` for each custom
+audience, are matched by thread first and then in the order they started.
+Auctions are assumed not to overlap, which holds when they are driven one at
+a time by a test app.
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+import datetime
+import json
+import math
+import re
+
+import logcat
+
+PHASE_AUCTION = "auction"
+PERCENTILES = (50, 90, 99)
+FLEDGE_TAG = "adservices.fledge"
+
+
+class Phase:
+  """Log patterns which start and end a phase of an auction.
+
+  Attributes:
+    name: name of the phase, such as `score_ad`.
+    start: pattern of the log message which starts the phase.
+    end: pattern of the log message which ends the phase.
+  """
+
+  def __init__(self, name: str, start: str, end: str):
+    self.name = name
+    self.start = re.compile(start, re.IGNORECASE)
+    self.end = re.compile(end, re.IGNORECASE)
+
+
+# Patterns for the verbose logs of the AdServices module. Wording differs a
+# little between module versions, so they can be overridden with
+# `--phases=<file>`.
+DEFAULT_PHASES = (
+    Phase(
+        PHASE_AUCTION,
+        r"(starting|beginning|running) (on-device )?ad selection",
+        r"ad selection (completed|finished|succeeded|failed)"
+        r"|completed ad selection",
+    ),
+    Phase(
+        "bidding_logic_fetch",
+        r"fetching (buyer )?(decision|bidding) logic",
+        r"fetched (buyer )?(decision|bidding) logic"
+        r"|(decision|bidding) logic (fetched|downloaded)",
+    ),
+    Phase(
+        "trusted_signals_fetch",
+        r"fetching trusted bidding signals",
+        r"fetched trusted bidding signals"
+        r"|trusted bidding signals (fetched|received)",
+    ),
+    Phase(
+        "generate_bid",
+        r"(invoking|running) generatebid|generating bids? for",
+        r"generatebid (completed|finished)|generated bids? for",
+    ),
+    Phase(
+        "score_ad",
+        r"(invoking|running) scoread|scoring ads?\b",
+        r"scoread (completed|finished)|scored ads?\b"
+        r"|scoring (completed|finished)",
+    ),
+    Phase(
+        "reporting",
+        r"(starting|beginning) (impression |event )?report",
+        r"(impression |event )?report(ing)? (completed|finished|succeeded)",
+    ),
+)
+
+
+class Timeline:
+  """Phase durations of one auction.
+
+  Attributes:
+    start: time the auction started, as `MM-DD HH:MM:SS.mmm`.
+    durations: milliseconds spent in each phase, by phase name. Phases which
+      ran several times, such as `generate_bid`, have one entry per run.
+  """
+
+  def __init__(self, start: str):
+    self.start = start
+    self.durations: dict[str, list[float]] = {}
+
+
+def load_phases(path: str) -> tuple[Phase, ...]:
+  """Load phase patterns from a JSON file.
+
+  Args:
+    path: file mapping each phase name to `{"start": ..., "end": ...}`
+      regular expressions. Must include the `auction` phase.
+
+  Returns:
+    the phases, with `auction` first.
+
+  Raises:
+    ValueError: if the `auction` phase is missing.
+  """
+  with open(path) as f:
+    patterns = json.load(f)
+  if PHASE_AUCTION not in patterns:
+    raise ValueError(f"Expected an {PHASE_AUCTION!r} phase in {path}.")
+  return tuple(
+      Phase(name, pattern["start"], pattern["end"])
+      for name, pattern in sorted(
+          patterns.items(), key=lambda item: item[0] != PHASE_AUCTION
+      )
+  )
+
+
+def timelines(
+    records: Iterable[logcat.LogRecord],
+    phases: tuple[Phase, ...] = DEFAULT_PHASES,
+) -> Iterator[Timeline]:
+  """Group records into per-auction timelines.
+
+  Args:
+    records: fledge log records in the order they were logged.
+    phases: phases to time, with the whole auction first.
+
+  Yields:
+    a timeline for every auction which both started and ended in the records.
+  """
+  auction, steps = phases[0], phases[1:]
+  timeline = None
+  auction_start = 0.0
+  # Start times of running phases, by phase name and thread.
+  running: dict[tuple[str, int], list[float]] = {}
+  for record in records:
+    message = record.message
+    seconds = _seconds(record.timestamp)
+    if auction.start.search(message):
+      if timeline is not None and auction.name in timeline.durations:
+        yield timeline
+      timeline = Timeline(record.timestamp)
+      auction_start = seconds
+      running.clear()
+      continue
+    if timeline is None:
+      continue
+    if auction.end.search(message):
+      timeline.durations[auction.name] = [(seconds - auction_start) * 1000]
+      continue
+    # Reporting follows `selectAds`, so phases after the end of an auction
+    # still count towards it.
+    for phase in steps:
+      if phase.start.search(message):
+        running.setdefault((phase.name, record.tid), []).append(seconds)
+        break
+      if phase.end.search(message):
+        started = _pop_start(running, phase.name, record.tid)
+        if started is not None:
+          timeline.durations.setdefault(phase.name, []).append(
+              (seconds - started) * 1000
+          )
+        break
+  if timeline is not None and auction.name in timeline.durations:
+    yield timeline
+
+
+def summarize(
+    auctions: Iterable[Timeline],
+) -> tuple[int, dict[str, dict[str, float]]]:
+  """Compute latency percentiles of every phase across auctions.
+
+  Args:
+    auctions: timelines of the auctions in a run.
+
+  Returns:
+    tuple of (number of auctions, statistics by phase name). Statistics have
+    the number of runs as `count` and milliseconds as `p50`, `p90` and `p99`.
+  """
+  count = 0
+  durations: dict[str, list[float]] = {}
+  for auction in auctions:
+    count += 1
+    for name, values in auction.durations.items():
+      durations.setdefault(name, []).extend(values)
+  summary = {}
+  for name, values in durations.items():
+    values.sort()
+    summary[name] = {"count": len(values)} | {
+        f"p{p}": percentile(values, p) for p in PERCENTILES
+    }
+  return count, summary
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+  """Return the nearest-rank percentile of non-empty sorted values."""
+  rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+  return sorted_values[rank - 1]
+
+
+def format_table(
+    count: int,
+    summary: Mapping[str, Mapping[str, float]],
+    phases: tuple[Phase, ...] = DEFAULT_PHASES,
+) -> str:
+  """Format a summary as a table, with phases in the order they run."""
+  lines = [
+      f"{count} auctions",
+      f"{'phase':<24}{'count':>7}"
+      + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES),
+  ]
+  for phase in phases:
+    stats = summary.get(phase.name)
+    if stats is None:
+      continue
+    lines.append(
+        f"{phase.name:<24}{stats['count']:>7}"
+        + "".join(f"{stats[f'p{p}']:>10.1f}" for p in PERCENTILES)
+    )
+  return "\n".join(lines)
+
+
+def _pop_start(
+    running: dict[tuple[str, int], list[float]], name: str, tid: int
+) -> float | None:
+  starts = running.get((name, tid))
+  if not starts:
+    # Asynchronous steps can end on another thread, so fall back to the
+    # earliest start of the phase on any thread.
+    candidates = [
+        key for key, values in running.items() if key[0] == name and values
+    ]
+    if not candidates:
+      return None
+    starts = min((running[key] for key in candidates), key=lambda s: s[0])
+  return starts.pop(0)
+
+
+def _seconds(timestamp: str) -> float:
+  # Logcat omits the year, so use a leap year to accept `02-29`.
+  parsed = datetime.datetime.strptime(
+      "2000-" + timestamp, "%Y-%m-%d %H:%M:%S.%f"
+  )
+  return (parsed - datetime.datetime(2000, 1, 1)).total_seconds()
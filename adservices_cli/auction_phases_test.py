@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import auction_phases
+import logcat
+
+
+def _record(seconds: float, tid: int, message: str) -> logcat.LogRecord:
+  minutes, seconds = divmod(seconds, 60)
+  timestamp = f'01-02 03:{int(minutes):02}:{seconds:06.3f}'
+  return logcat.LogRecord(
+      timestamp, 100, tid, 'V', 'adservices.fledge', message
+  )
+
+
+def _auction(offset: float) -> list[logcat.LogRecord]:
+  return [
+      _record(offset + 0.000, 1, 'Starting ad selection'),
+      _record(offset + 0.010, 2, 'Fetching buyer decision logic'),
+      _record(offset + 0.050, 2, 'Fetched buyer decision logic'),
+      _record(offset + 0.060, 3, 'Fetching trusted bidding signals'),
+      _record(offset + 0.080, 3, 'Fetched trusted bidding signals'),
+      _record(offset + 0.100, 4, 'Running generateBid for CA shoes'),
+      _record(offset + 0.101, 5, 'Running generateBid for CA hats'),
+      _record(offset + 0.130, 5, 'generateBid completed for CA hats'),
+      # Ends on a different thread than it started on.
+      _record(offset + 0.150, 6, 'generateBid completed for CA shoes'),
+      _record(offset + 0.160, 1, 'Scoring ads'),
+      _record(offset + 0.190, 1, 'Scoring completed'),
+      _record(offset + 0.200, 1, 'Ad selection completed'),
+      _record(offset + 0.300, 7, 'Starting impression reporting'),
+      _record(offset + 0.340, 7, 'Impression reporting completed'),
+  ]
+
+
+class AuctionPhasesTest(absltest.TestCase):
+
+  def test_timelines(self):
+    (timeline,) = auction_phases.timelines(_auction(0))
+
+    self.assertEqual(timeline.start, '01-02 03:00:00.000')
+    durations = {
+        name: [round(value) for value in values]
+        for name, values in timeline.durations.items()
+    }
+    self.assertEqual(
+        durations,
+        {
+            'auction': [200],
+            'bidding_logic_fetch': [40],
+            'trusted_signals_fetch': [20],
+            'generate_bid': [29, 50],
+            'score_ad': [30],
+            'reporting': [40],
+        },
+    )
+
+  def test_skips_unfinished_auctions(self):
+    records = _auction(0)[:5] + _auction(1)
+
+    self.assertLen(list(auction_phases.timelines(records)), 1)
+
+  def test_summarize(self):
+    auctions = []
+    for index in range(10):
+      timeline = auction_phases.Timeline('01-02 03:04:05.000')
+      timeline.durations['score_ad'] = [float(index + 1)]
+      auctions.append(timeline)
+
+    count, summary = auction_phases.summarize(auctions)
+
+    self.assertEqual(count, 10)
+    self.assertEqual(
+        summary, {'score_ad': {'count': 10, 'p50': 5, 'p90': 9, 'p99': 10}}
+    )
+
+  def test_load_phases(self):
+    path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'phases.json'
+    )
+    with open(path, 'w') as f:
+      json.dump(
+          {
+              'bid': {'start': 'bid start', 'end': 'bid end'},
+              'auction': {'start': 'auction start', 'end': 'auction end'},
+          },
+          f,
+      )
+
+    phases = auction_phases.load_phases(path)
+
+    self.assertEqual([phase.name for phase in phases], ['auction', 'bid'])
+
+
+class LogsAuctionsTest(absltest.TestCase):
+
+  def test_reports_auctions_on_device(self):
+    adb_client = mock.create_autospec(adb.AdbClient)
+    lines = [
+        f'{r.timestamp}  {r.pid}  {r.tid} {r.level} {r.tag}: {r.message}'
+        for r in _auction(0) + _auction(1)
+    ]
+    adb_client.logcat.return_value = (line for line in lines)
+    output = io.StringIO()
+
+    with contextlib.redirect_stdout(output):
+      logcat.Logs(adb_client).auctions(output_format='json')
+
+    summary = json.loads(output.getvalue())
+    self.assertEqual(summary['auctions'], 2)
+    self.assertEqual(summary['phases']['generate_bid']['count'], 4)
+    self.assertIn('adservices.fledge:V', adb_client.logcat.call_args.args[0])
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of auction results, which never change once written."""
+
+import os
+import tempfile
+import urllib.parse
+
+import device_cache
+
+_DIRECTORY_NAME = "auction_results"
+
+
+def default_path() -> str:
+  """Return the default directory of the cache.
+
+  Returns:
+    directory next to the device facts cache.
+  """
+  return os.path.join(
+      os.path.dirname(device_cache.default_path()), _DIRECTORY_NAME
+  )
+
+
+class AuctionResultCache:
+  """Serialized `AuctionResult` protos, by device serial and ad selection ID.
+
+  Every result is a file of its own, so caching thousands of results never
+  rewrites the others, and the cache can be shared between threads and
+  processes. Decoding is left to the reader, so the cache survives changes in
+  how results are printed.
+  """
+
+  def __init__(self, path: str = ""):
+    """Initializes the cache.
+
+    Args:
+      path: directory of the cache. Defaults to `default_path()`.
+    """
+    self._path = path or default_path()
+
+  def get(self, serial: str, ad_selection_id: str) -> bytes | None:
+    """Return a cached result, or None if it is not cached."""
+    try:
+      with open(self._file(serial, ad_selection_id), "rb") as f:
+        return f.read()
+    except OSError:
+      return None
+
+  def put(self, serial: str, ad_selection_id: str, result: bytes):
+    """Cache a result.
+
+    Args:
+      serial: serial of the device which ran the auction.
+      ad_selection_id: identifier of the auction.
+      result: the serialized `AuctionResult`.
+    """
+    path = self._file(serial, ad_selection_id)
+    directory = os.path.dirname(path)
+    try:
+      os.makedirs(directory, exist_ok=True)
+      # Write to a temporary file first, so readers never see a partially
+      # written result.
+      fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+      with os.fdopen(fd, "wb") as f:
+        f.write(result)
+      os.replace(temp_path, path)
+    except OSError:
+      # The cache is only an optimization, so carry on without it.
+      pass
+
+  def evict(self, serial: str, ad_selection_id: str):
+    """Remove a cached result, for example because it is corrupt."""
+    try:
+      os.remove(self._file(serial, ad_selection_id))
+    except OSError:
+      pass
+
+  def _file(self, serial: str, ad_selection_id: str) -> str:
+    # Serials of network devices contain `:`, so quote both parts.
+    return os.path.join(
+        self._path,
+        urllib.parse.quote(serial, safe=""),
+        urllib.parse.quote(ad_selection_id, safe="") + ".pb",
+    )
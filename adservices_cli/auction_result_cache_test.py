@@ -0,0 +1,69 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+
+from absl.testing import absltest
+
+import auction_result_cache
+
+
+class AuctionResultCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'auction_results'
+    )
+
+  def test_persists_across_instances(self):
+    auction_result_cache.AuctionResultCache(self.path).put(
+        '192.168.1.2:5555', '-123', b'\x0a\x01x'
+    )
+
+    cache = auction_result_cache.AuctionResultCache(self.path)
+
+    self.assertEqual(cache.get('192.168.1.2:5555', '-123'), b'\x0a\x01x')
+
+  def test_scoped_to_device(self):
+    cache = auction_result_cache.AuctionResultCache(self.path)
+
+    cache.put('serial-1', '1', b'result')
+
+    self.assertIsNone(cache.get('serial-2', '1'))
+    self.assertIsNone(cache.get('serial-1', '2'))
+
+  def test_evict(self):
+    cache = auction_result_cache.AuctionResultCache(self.path)
+    cache.put('serial-1', '1', b'result')
+
+    cache.evict('serial-1', '1')
+    cache.evict('serial-1', '2')
+
+    self.assertIsNone(cache.get('serial-1', '1'))
+
+  def test_ids_cannot_escape_the_cache(self):
+    cache = auction_result_cache.AuctionResultCache(self.path)
+
+    cache.put('serial-1', '../../escaped', b'result')
+
+    self.assertEqual(cache.get('serial-1', '../../escaped'), b'result')
+    self.assertFalse(
+        os.path.exists(os.path.join(os.path.dirname(self.path), 'escaped.pb'))
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,166 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cold and warm latency benchmarks of ad selection commands.
+
+A cold run kills adservices first, so it includes starting the process. Warm
+runs follow an untimed run, so the process and its caches are loaded.
+"""
+
+from collections.abc import Callable
+import contextlib
+import io
+import math
+import statistics
+import time
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+  import adservices
+
+MODE_COLD = "cold"
+MODE_WARM = "warm"
+_MODES = (MODE_COLD, MODE_WARM)
+
+GET_AD_SELECTION_DATA = "get_ad_selection_data"
+VIEW_AUCTION_RESULT = "view_auction_result"
+CUSTOM_AUDIENCE_LIST = "custom_audience_list"
+TRIGGER_ENCODING = "trigger_encoding"
+WORKLOADS = (
+    GET_AD_SELECTION_DATA,
+    VIEW_AUCTION_RESULT,
+    CUSTOM_AUDIENCE_LIST,
+    TRIGGER_ENCODING,
+)
+
+
+def summarize(latencies_ms: list[float]) -> dict[str, float | int]:
+  """Summarize the latencies of a workload.
+
+  Args:
+    latencies_ms: latency of every run, in milliseconds. Must not be empty.
+
+  Returns:
+    number of runs, and min, median, p95, mean and standard deviation in
+    milliseconds. The p95 is the nearest-rank percentile.
+  """
+  ordered = sorted(latencies_ms)
+  return {
+      "runs": len(ordered),
+      "min_ms": ordered[0],
+      "median_ms": statistics.median(ordered),
+      "p95_ms": ordered[max(1, math.ceil(0.95 * len(ordered))) - 1],
+      "mean_ms": statistics.fmean(ordered),
+      "stdev_ms": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+  }
+
+
+def workloads(
+    cli: "adservices.AdServices",
+    buyer: str = "",
+    ad_selection_id: str = "",
+    owner_app_package: str = "",
+) -> dict[str, Callable[[], Any]]:
+  """Build the commands to benchmark.
+
+  Commands which need an argument that was not given are left out.
+
+  Args:
+    cli: the adservices command.
+    buyer: buyer for `get-ad-selection-data`, `custom-audience list` and
+      `trigger-encoding`.
+    ad_selection_id: auction to view with `view-auction-result`.
+    owner_app_package: app which owns the custom audiences to list.
+
+  Returns:
+    functions which run each command, by workload name.
+  """
+  commands = {
+      GET_AD_SELECTION_DATA: lambda: cli.ad_selection.get_ad_selection_data(
+          buyer
+      ),
+      TRIGGER_ENCODING: lambda: cli.app_signals.trigger_encoding(buyer),
+  }
+  if ad_selection_id:
+    commands[VIEW_AUCTION_RESULT] = (
+        lambda: cli.ad_selection.view_auction_result(ad_selection_id)
+    )
+  if owner_app_package and buyer:
+    commands[CUSTOM_AUDIENCE_LIST] = lambda: cli.custom_audience.list(
+        owner_app_package, buyer
+    )
+  return {name: commands[name] for name in WORKLOADS if name in commands}
+
+
+def run(
+    cli: "adservices.AdServices",
+    commands: dict[str, Callable[[], Any]],
+    iterations: int,
+    modes: tuple[str, ...] = _MODES,
+) -> dict[str, Any]:
+  """Benchmark commands.
+
+  Args:
+    cli: the adservices command, used to kill adservices before cold runs.
+    commands: functions which run each command, by workload name.
+    iterations: timed runs of each command in each mode.
+    modes: `cold`, `warm` or both.
+
+  Raises:
+    ValueError: if a mode is unknown or iterations is not positive.
+
+  Returns:
+    the summary and latencies of each workload, by workload name and mode.
+  """
+  if iterations < 1:
+    raise ValueError(f"iterations must be at least 1, was {iterations}.")
+  for mode in modes:
+    if mode not in _MODES:
+      raise ValueError(f"Expected one of {_MODES} as mode, was {mode}.")
+  results = {}
+  for name, command in commands.items():
+    results[name] = {}
+    for mode in modes:
+      latencies = []
+      # Keep the output of the commands out of the report.
+      with contextlib.redirect_stdout(io.StringIO()):
+        if mode == MODE_WARM:
+          command()
+        for _ in range(iterations):
+          if mode == MODE_COLD:
+            cli.kill()
+          start = time.perf_counter()
+          command()
+          latencies.append((time.perf_counter() - start) * 1000)
+      results[name][mode] = summarize(latencies) | {"latencies_ms": latencies}
+  return results
+
+
+def format_report(report: dict[str, Any]) -> str:
+  """Format a report with `device` and `results` as a table."""
+  device = report["device"]
+  lines = [
+      f"SDK {device['sdk_version']}, AdServices extension"
+      f" {device['ad_services_version']}, {device['apex_version']}",
+      f"{'workload':<24}{'mode':<6}{'runs':>6}{'min':>10}{'median':>10}"
+      f"{'p95':>10}{'stdev':>10}",
+  ]
+  for name, modes in report["results"].items():
+    for mode, stats in modes.items():
+      lines.append(
+          f"{name:<24}{mode:<6}{stats['runs']:>6}{stats['min_ms']:>10.1f}"
+          f"{stats['median_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+          f"{stats['stdev_ms']:>10.1f}"
+      )
+  return "\n".join(lines)
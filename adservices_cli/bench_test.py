@@ -0,0 +1,105 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import adservices
+import bench
+
+
+class BenchTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb = mock.create_autospec(adb.AdbClient)
+    self.adb.serial = ''
+    self.adb.get_apex_packages.return_value = ''
+    self.adb.is_process_running.return_value = False
+    self.adb.shell_batch.side_effect = lambda commands, silent=True: [''] * len(
+        commands
+    )
+    self.adb.execute_adservices_shell_command.return_value = (
+        '{"output_proto": ""}'
+    )
+    self.cli = adservices.AdServices(self.adb)
+
+  def test_summarize(self):
+    summary = bench.summarize([float(value) for value in range(20, 0, -1)])
+
+    self.assertEqual(summary['runs'], 20)
+    self.assertEqual(summary['min_ms'], 1)
+    self.assertEqual(summary['median_ms'], 10.5)
+    self.assertEqual(summary['p95_ms'], 19)
+    self.assertAlmostEqual(summary['stdev_ms'], 5.916, places=3)
+
+  def test_workloads_skip_commands_without_arguments(self):
+    self.assertEqual(
+        list(bench.workloads(self.cli)),
+        [bench.GET_AD_SELECTION_DATA, bench.TRIGGER_ENCODING],
+    )
+    self.assertEqual(
+        list(bench.workloads(self.cli, 'buyer.com', '123', 'com.example')),
+        list(bench.WORKLOADS),
+    )
+
+  def test_run_kills_adservices_before_cold_runs(self):
+    command = mock.Mock()
+    kill = self.enter_context(mock.patch.object(self.cli, 'kill'))
+
+    results = bench.run(self.cli, {'command': command}, iterations=3)
+
+    self.assertEqual(kill.call_count, 3)
+    # Three cold runs, then one untimed and three timed warm runs.
+    self.assertEqual(command.call_count, 7)
+    self.assertEqual(results['command']['cold']['runs'], 3)
+    self.assertLen(results['command']['warm']['latencies_ms'], 3)
+
+  def test_run_rejects_unknown_mode(self):
+    with self.assertRaises(ValueError):
+      bench.run(self.cli, {}, iterations=1, modes=('hot',))
+
+  def test_bench_writes_results(self):
+    output = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'bench.json'
+    )
+    stdout = io.StringIO()
+
+    with contextlib.redirect_stdout(stdout):
+      self.cli.bench(
+          iterations=2, buyer='buyer.com', modes='warm', output=output
+      )
+
+    with open(output) as f:
+      report = json.load(f)
+    self.assertEqual(report['iterations'], 2)
+    self.assertEqual(
+        list(report['results']),
+        [bench.GET_AD_SELECTION_DATA, bench.TRIGGER_ENCODING],
+    )
+    self.assertEqual(
+        list(report['results'][bench.TRIGGER_ENCODING]), [bench.MODE_WARM]
+    )
+    self.assertIn('get_ad_selection_data   warm', stdout.getvalue())
+
+
+if __name__ == '__main__':
+  absltest.main()
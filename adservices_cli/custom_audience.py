@@ -14,16 +14,29 @@
 
 """Command for interacting with Protected Audience APIs."""
 
+from collections.abc import Iterator
+import concurrent.futures
+import contextlib
+import functools
+import gzip
 import json
+import sys
+from typing import Any, TextIO
 
 import jsondiff
 
 import adb
+import async_adb
+import json_stream
+import profiler
 import utilities
 
 
 ERROR_FAILED_TO_PARSE = "Failed to decode JSON response from device: "
 ERROR_NOT_FOUND = "Custom audience not found."
+DEFAULT_DATABASE = "custom_audiences.db"
+# Lists in flight per worker of an export, which bounds memory use.
+_LISTS_PER_WORKER = 2
 
 _COMMAND_PREFIX = "custom-audience"
 _GET_COMMAND = "view"
@@ -34,6 +47,13 @@ _ARG_NAME = "--name"
 _ARG_OWNER = "--owner"
 _ARG_BUYER = "--buyer"
 
+_SERIAL_COMMAND = "getprop ro.serialno"
+
+# Keys of the list of audiences in the output of the list command, which
+# changed between releases.
+_AUDIENCES_KEYS = ("custom_audiences", "audiences")
+_INDENT = " " * 4
+
 
 class CustomAudience:
   """Interact with Custom Audience.
@@ -64,45 +84,30 @@ class CustomAudience:
     Returns:
       Textual output of custom audiences data.
     """
-    output = self._do_get_custom_audience(
-        name=name,
-        owner_app_package=owner_app_package,
-        buyer=buyer,
+    return _format_output(
+        self._adb.execute_adservices_shell_command(
+            _get_command(name, owner_app_package, buyer)
+        )
     )
-    try:
-      return json.dumps(json.loads(output), indent=4)
-    except json.JSONDecodeError:
-      return ERROR_FAILED_TO_PARSE + output
 
   def list(
       self,
       owner_app_package: str,
       buyer: str,
-  ) -> str:
+  ) -> None:
     """List all custom audiences on the device.
 
+    Writes the audiences to stdout as they are parsed, so the output of the
+    device is never held as a whole.
+
     Args:
       owner_app_package: Package name of owning app.
       buyer: Ad tech buyer.
-
-    Returns:
-      Textual output of custom audiences data.
     """
-    output = self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _LIST_COMMAND,
-            "",
-            {
-                _ARG_OWNER: owner_app_package,
-                _ARG_BUYER: buyer,
-            },
-        )
+    _write_stream(
+        _stream_list(self._adb, owner_app_package, buyer, silent=False),
+        sys.stdout,
     )
-    try:
-      return json.dumps(json.loads(output), indent=4)
-    except json.JSONDecodeError:
-      return ERROR_FAILED_TO_PARSE + output
 
   def refresh(
       self,
@@ -120,56 +125,440 @@ class CustomAudience:
     Returns:
       Textual output of custom audiences data.
     """
+    get_command = _get_command(name, owner_app_package, buyer)
     try:
       existing_custom_audience = json.loads(
-          self._do_get_custom_audience(name, owner_app_package, buyer)
+          self._adb.execute_adservices_shell_command(get_command)
       )
       if not existing_custom_audience:
         return ERROR_NOT_FOUND
       self._adb.execute_adservices_shell_command(
-          utilities.format_command(
-              _COMMAND_PREFIX,
-              _REFRESH_COMMAND,
-              "",
-              {
-                  _ARG_NAME: name,
-                  _ARG_OWNER: owner_app_package,
-                  _ARG_BUYER: buyer,
-              },
-          )
+          _refresh_command(name, owner_app_package, buyer)
       )
       updated_custom_audience = json.loads(
-          self._do_get_custom_audience(name, owner_app_package, buyer)
-      )
-      diff_in_ca = json.loads(
-          jsondiff.diff(
-              existing_custom_audience,
-              updated_custom_audience,
-              syntax="explicit",
-              dump=True,
-          )
+          self._adb.execute_adservices_shell_command(get_command)
       )
-      return json.dumps(
-          {
-              "existing_custom_audience": existing_custom_audience,
-              "updated_fields": diff_in_ca,
-          },
-          indent=4,
+      return _format_refresh_diff(
+          existing_custom_audience, updated_custom_audience
       )
     except json.JSONDecodeError:
       return ERROR_FAILED_TO_PARSE
 
-  def _do_get_custom_audience(
+  def sync(
+      self,
+      owner_app_packages,
+      buyers,
+      database: str = DEFAULT_DATABASE,
+  ) -> str:
+    """Mirror the custom audiences on the device into a SQLite database.
+
+    Lists the audiences of every owner and buyer in one adb round trip. Only
+    audiences whose content changed since the last sync are written, and
+    audiences which left the device are removed from the mirror. Owners or
+    buyers whose list fails are left as they were. Audiences are mirrored per
+    device serial, so several devices can sync into the same database.
+
+    Args:
+      owner_app_packages: comma separated package names of owning apps.
+      buyers: comma separated ad tech buyers.
+      database: SQLite database to write.
+
+    Returns:
+      how many audiences were added, updated, removed and left unchanged.
+    """
+    import custom_audience_store  # pylint: disable=g-import-not-at-top
+
+    pairs = [
+        (owner, buyer)
+        for owner in _parse_values(owner_app_packages)
+        for buyer in _parse_values(buyers)
+    ]
+    commands = [
+        f"cmd adservices_manager {_list_command(owner, buyer)}"
+        for owner, buyer in pairs
+    ]
+    serial = self._adb.serial
+    if serial:
+      outputs = self._adb.shell_batch(commands)
+    else:
+      # Read the serial in the same round trip.
+      serial, *outputs = self._adb.shell_batch([_SERIAL_COMMAND] + commands)
+    stats = custom_audience_store.SyncStats()
+    failed = []
+    with custom_audience_store.CustomAudienceStore(database) as store:
+      for (owner, buyer), output in zip(pairs, outputs):
+        try:
+          audiences = _audiences(json.loads(output))
+        except ValueError:
+          failed.append(f"{owner} {buyer}: {ERROR_FAILED_TO_PARSE}{output}")
+          continue
+        stats += store.sync(serial, owner, buyer, audiences)
+    return "\n".join(
+        [
+            f"Synced {len(pairs) - len(failed)} of {len(pairs)} owner and"
+            f" buyer pairs into {database}: {stats.added} added,"
+            f" {stats.updated} updated, {stats.removed} removed,"
+            f" {stats.unchanged} unchanged."
+        ]
+        + failed
+    )
+
+  def export(
+      self,
+      owner_app_packages,
+      buyers,
+      output: str = "-",
+      max_workers: int = 8,
+  ) -> None:
+    """Export the custom audiences of many owners and buyers as NDJSON.
+
+    Lists every combination of owner and buyer concurrently, and writes one
+    audience per line in the order of the owners and buyers as the lists
+    complete. Only a few lists are held in memory at once.
+
+    Args:
+      owner_app_packages: comma separated package names of owning apps.
+      buyers: comma separated ad tech buyers.
+      output: NDJSON file to write, gzip compressed if it ends in `.gz`, or
+        `-` for stdout.
+      max_workers: maximum number of lists running at once.
+    """
+    if max_workers < 1:
+      raise ValueError(f"max_workers must be at least 1, was {max_workers}.")
+    pairs = (
+        (owner, buyer)
+        for owner in _parse_values(owner_app_packages)
+        for buyer in _parse_values(buyers)
+    )
+    exported = 0
+    failed = []
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers)
+    with _open_output(output) as f, pool:
+      for lines, error in utilities.map_bounded(
+          pool,
+          functools.partial(_export_lines, self._adb),
+          pairs,
+          max_workers * _LISTS_PER_WORKER,
+      ):
+        if error:
+          failed.append(error)
+          continue
+        for line in lines:
+          f.write(line + "\n")
+        exported += len(lines)
+    for error in failed:
+      print(error, file=sys.stderr)
+    print(
+        f"Exported {exported} custom audiences, {len(failed)} lists failed.",
+        file=sys.stderr,
+    )
+
+  def query(
+      self,
+      database: str = DEFAULT_DATABASE,
+      owner_app_package: str = "",
+      buyer: str = "",
+      name: str = "",
+      expires_before: str = "",
+      limit: int = 100,
+      device_serial: str = "",
+  ) -> str:
+    """Search custom audiences mirrored by `custom-audience sync`.
+
+    Does not touch the device.
+
+    Args:
+      database: SQLite database written by `custom-audience sync`.
+      owner_app_package: if set, only show audiences of this owning app.
+      buyer: if set, only show audiences of this buyer.
+      name: if set, only show audiences with this name.
+      expires_before: if set, only show audiences which expire before this
+        time, such as `2025-03-16` or `2025-03-16T14:13`.
+      limit: maximum number of audiences to show. Unlimited if 0.
+      device_serial: if set, only show audiences synced from this device.
+
+    Returns:
+      Textual output of custom audiences data.
+    """
+    import custom_audience_store  # pylint: disable=g-import-not-at-top
+
+    with custom_audience_store.CustomAudienceStore(database) as store:
+      audiences = store.query(
+          serial=str(device_serial),
+          owner=owner_app_package,
+          buyer=buyer,
+          name=str(name),
+          expires_before=str(expires_before),
+          limit=limit,
+      )
+    return json.dumps({"custom_audiences": audiences}, indent=4)
+
+
+class AsyncCustomAudience:
+  """Interact with Custom Audience using asyncio.
+
+  Mirrors CustomAudience, so that many queries can run concurrently.
+  """
+
+  def __init__(
+      self,
+      adb_client: async_adb.AsyncAdbClient,
+  ):
+    self._adb = adb_client
+
+  async def get(
       self,
       name: str,
       owner_app_package: str,
       buyer: str,
   ) -> str:
-    return self._adb.execute_adservices_shell_command(
-        utilities.format_command(
-            _COMMAND_PREFIX,
-            _GET_COMMAND,
-            "",
-            {_ARG_NAME: name, _ARG_OWNER: owner_app_package, _ARG_BUYER: buyer},
+    """Get custom audience from the device.
+
+    Args:
+      name: Name of custom audience to query.
+      owner_app_package: Package name of owning app.
+      buyer: Ad tech buyer.
+
+    Returns:
+      Textual output of custom audiences data.
+    """
+    return _format_output(
+        await self._adb.execute_adservices_shell_command(
+            _get_command(name, owner_app_package, buyer)
         )
     )
+
+  async def list(
+      self,
+      owner_app_package: str,
+      buyer: str,
+  ) -> str:
+    """List all custom audiences on the device.
+
+    Args:
+      owner_app_package: Package name of owning app.
+      buyer: Ad tech buyer.
+
+    Returns:
+      Textual output of custom audiences data.
+    """
+    return _format_output(
+        await self._adb.execute_adservices_shell_command(
+            _list_command(owner_app_package, buyer)
+        )
+    )
+
+  async def refresh(
+      self,
+      name: str,
+      owner_app_package: str,
+      buyer: str,
+  ) -> str:
+    """Refresh a custom audience on the device.
+
+    Args:
+      name: Name of custom audience to refresh.
+      owner_app_package: Package name of owning app.
+      buyer: Ad tech buyer.
+
+    Returns:
+      Textual output of custom audiences data.
+    """
+    get_command = _get_command(name, owner_app_package, buyer)
+    try:
+      existing_custom_audience = json.loads(
+          await self._adb.execute_adservices_shell_command(get_command)
+      )
+      if not existing_custom_audience:
+        return ERROR_NOT_FOUND
+      await self._adb.execute_adservices_shell_command(
+          _refresh_command(name, owner_app_package, buyer)
+      )
+      updated_custom_audience = json.loads(
+          await self._adb.execute_adservices_shell_command(get_command)
+      )
+      return _format_refresh_diff(
+          existing_custom_audience, updated_custom_audience
+      )
+    except json.JSONDecodeError:
+      return ERROR_FAILED_TO_PARSE
+
+
+def _get_command(name: str, owner_app_package: str, buyer: str) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _GET_COMMAND,
+      "",
+      {_ARG_NAME: name, _ARG_OWNER: owner_app_package, _ARG_BUYER: buyer},
+  )
+
+
+def _list_command(owner_app_package: str, buyer: str) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _LIST_COMMAND,
+      "",
+      {
+          _ARG_OWNER: owner_app_package,
+          _ARG_BUYER: buyer,
+      },
+  )
+
+
+def _refresh_command(name: str, owner_app_package: str, buyer: str) -> str:
+  return utilities.format_command(
+      _COMMAND_PREFIX,
+      _REFRESH_COMMAND,
+      "",
+      {
+          _ARG_NAME: name,
+          _ARG_OWNER: owner_app_package,
+          _ARG_BUYER: buyer,
+      },
+  )
+
+
+def _export_lines(
+    adb_client: adb.AdbClient, pair: tuple[str, str]
+) -> tuple[list[str], str]:
+  """List the audiences of an owner and buyer as lines of NDJSON.
+
+  Returns:
+    the lines, and an error if the list failed.
+  """
+  owner, buyer = pair
+  # Silent, so the command does not end up in the NDJSON on stdout.
+  stream = _stream_list(adb_client, owner, buyer, silent=True)
+  lines = []
+  try:
+    for audience in _stream_audiences(stream):
+      lines.append(json.dumps(audience, separators=(",", ":")))
+  except ValueError:
+    return [], f"{owner} {buyer}: {ERROR_FAILED_TO_PARSE}{stream.remainder()}"
+  return lines, ""
+
+
+def _stream_list(
+    adb_client: adb.AdbClient, owner: str, buyer: str, silent: bool
+) -> json_stream.ObjectStream:
+  """Run the list command, parsing the audiences one by one as they arrive."""
+  return json_stream.ObjectStream(
+      adb_client.shell_stream(
+          f"cmd adservices_manager {_list_command(owner, buyer)}", silent
+      ),
+      _AUDIENCES_KEYS,
+  )
+
+
+def _open_output(output: str) -> contextlib.AbstractContextManager[TextIO]:
+  if output == "-":
+    return contextlib.nullcontext(sys.stdout)
+  if output.endswith(".gz"):
+    # Faster than the default level 9, and barely larger for JSON.
+    return gzip.open(output, "wt", compresslevel=6, encoding="utf-8")
+  return open(output, "w", encoding="utf-8")
+
+
+def _parse_values(values) -> list[str]:
+  # Fire parses `--buyers=a,b` as a tuple.
+  if isinstance(values, (tuple, list)):
+    return [str(value) for value in values]
+  return [value for value in str(values).split(",") if value]
+
+
+def _audiences(list_output: Any) -> list[dict[str, Any]]:
+  """The audiences in the parsed output of the list command.
+
+  Raises:
+    ValueError: if the output has no list of audiences.
+  """
+  audiences = None
+  if isinstance(list_output, dict):
+    audiences = list_output.get(
+        "custom_audiences", list_output.get("audiences")
+    )
+  if not isinstance(audiences, list):
+    raise ValueError(f"Expected a list of audiences, was {list_output}")
+  return audiences
+
+
+def _stream_audiences(
+    stream: json_stream.ObjectStream,
+) -> Iterator[dict[str, Any]]:
+  """The audiences in the output of the list command, as they are parsed.
+
+  Raises:
+    ValueError: if the output has no list of audiences.
+  """
+  for key, value in stream:
+    if key in _AUDIENCES_KEYS:
+      # The stream only yields lists item by item.
+      if not isinstance(value, Iterator):
+        raise ValueError(f"Expected a list of audiences, was {value}")
+      yield from value
+      return
+  raise ValueError("Expected a list of audiences")
+
+
+@profiler.traced("format json")
+def _format_output(output: str) -> str:
+  try:
+    return json.dumps(json.loads(output), indent=4)
+  except json.JSONDecodeError:
+    return ERROR_FAILED_TO_PARSE + output
+
+
+@profiler.traced("format json")
+def _write_stream(stream: json_stream.ObjectStream, f: TextIO) -> None:
+  """Write the output of a command to `f` as it is parsed.
+
+  Writes the same text as `_format_output` of the whole output, followed by a
+  newline. If the output fails to parse, what was written so far is followed
+  by the error and the text which was not parsed.
+  """
+  separator = "{"
+  try:
+    for key, value in stream:
+      f.write(f"{separator}\n{_INDENT}{json.dumps(key)}: ")
+      separator = ","
+      if not isinstance(value, Iterator):
+        f.write(_indented(json.dumps(value, indent=4), 1))
+        continue
+      item_separator = "["
+      for item in value:
+        f.write(f"{item_separator}\n{_INDENT * 2}")
+        f.write(_indented(json.dumps(item, indent=4), 2))
+        item_separator = ","
+      f.write(f"\n{_INDENT}]" if item_separator == "," else "[]")
+  except json.JSONDecodeError:
+    if separator == ",":
+      f.write("\n")
+    f.write(ERROR_FAILED_TO_PARSE + stream.remainder().strip("\n") + "\n")
+    return
+  f.write("\n}\n" if separator == "," else "{}\n")
+
+
+def _indented(value_json: str, level: int) -> str:
+  # Newlines in JSON strings are escaped, so every newline starts a line.
+  return value_json.replace("\n", "\n" + _INDENT * level)
+
+
+@profiler.traced("jsondiff")
+def _format_refresh_diff(
+    existing_custom_audience: dict, updated_custom_audience: dict
+) -> str:
+  diff_in_ca = json.loads(
+      jsondiff.diff(
+          existing_custom_audience,
+          updated_custom_audience,
+          syntax="explicit",
+          dump=True,
+      )
+  )
+  return json.dumps(
+      {
+          "existing_custom_audience": existing_custom_audience,
+          "updated_fields": diff_in_ca,
+      },
+      indent=4,
+  )
@@ -0,0 +1,237 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""SQLite mirror of the custom audiences on devices.
+
+Audiences are stored as JSON together with a hash of their content, so a sync
+only writes the audiences which were added or changed since the last one, and
+dashboards can query the mirror instead of the device. Audiences are kept per
+device serial, so the devices of a fleet can sync into one database.
+"""
+
+from collections.abc import Iterable
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any
+
+_DEFAULT_QUERY_LIMIT = 100
+# Devices of a fleet sync into the same database at once, so writers wait for
+# each other rather than failing.
+_BUSY_TIMEOUT_SEC = 60
+
+# The primary key also serves lookups by serial and owner.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS custom_audiences (
+  serial TEXT NOT NULL,
+  owner TEXT NOT NULL,
+  buyer TEXT NOT NULL,
+  name TEXT NOT NULL,
+  expiration_time TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  content TEXT NOT NULL,
+  updated_at REAL NOT NULL,
+  PRIMARY KEY (serial, owner, buyer, name)
+);
+CREATE INDEX IF NOT EXISTS custom_audiences_buyer ON custom_audiences (buyer);
+CREATE INDEX IF NOT EXISTS custom_audiences_name ON custom_audiences (name);
+CREATE INDEX IF NOT EXISTS custom_audiences_expiration
+  ON custom_audiences (expiration_time);
+"""
+_UPSERT = (
+    "INSERT INTO custom_audiences (serial, owner, buyer, name,"
+    " expiration_time, content_hash, content, updated_at)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (serial, owner, buyer, name) DO UPDATE SET"
+    " expiration_time = excluded.expiration_time,"
+    " content_hash = excluded.content_hash,"
+    " content = excluded.content,"
+    " updated_at = excluded.updated_at"
+)
+
+
+@dataclasses.dataclass
+class SyncStats:
+  """What a sync changed in the mirror."""
+
+  added: int = 0
+  updated: int = 0
+  removed: int = 0
+  unchanged: int = 0
+
+  def __iadd__(self, other: "SyncStats") -> "SyncStats":
+    for field in dataclasses.fields(self):
+      setattr(
+          self,
+          field.name,
+          getattr(self, field.name) + getattr(other, field.name),
+      )
+    return self
+
+
+def _content_hash(content: str) -> str:
+  return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class CustomAudienceStore:
+  """Custom audiences mirrored into a SQLite database."""
+
+  def __init__(self, path: str):
+    """Opens the database, creating it if needed.
+
+    Args:
+      path: location of the database file.
+    """
+    self._connection = sqlite3.connect(path, timeout=_BUSY_TIMEOUT_SEC)
+    # Let dashboards read while a sync writes.
+    self._connection.execute("PRAGMA journal_mode = WAL")
+    columns = [
+        row[1]
+        for row in self._connection.execute(
+            "PRAGMA table_info(custom_audiences)"
+        )
+    ]
+    with self._connection:
+      if columns and "serial" not in columns:
+        # Mirrors from before audiences were kept per device cannot tell the
+        # devices apart. A mirror can always be synced again, so start over.
+        self._connection.execute("DROP TABLE custom_audiences")
+      self._connection.executescript(_SCHEMA)
+
+  def close(self):
+    self._connection.close()
+
+  def __enter__(self) -> "CustomAudienceStore":
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def sync(
+      self,
+      serial: str,
+      owner: str,
+      buyer: str,
+      audiences: Iterable[dict[str, Any]],
+  ) -> SyncStats:
+    """Replace the audiences of an owner and buyer on a device.
+
+    Audiences whose content did not change are not written, and audiences
+    which are no longer listed are removed. Audiences of other devices are
+    left as they are.
+
+    Args:
+      serial: serial of the device the audiences were listed on.
+      owner: package name of the owning app.
+      buyer: ad tech buyer.
+      audiences: every audience of the owner and buyer on the device.
+
+    Returns:
+      how many audiences were added, updated, removed or left unchanged.
+    """
+    stored = dict(
+        self._connection.execute(
+            "SELECT name, content_hash FROM custom_audiences"
+            " WHERE serial = ? AND owner = ? AND buyer = ?",
+            (serial, owner, buyer),
+        )
+    )
+    stats = SyncStats()
+    rows = []
+    now = time.time()
+    for audience in audiences:
+      # Canonical JSON, so the hash only changes with the content.
+      content = json.dumps(audience, sort_keys=True, separators=(",", ":"))
+      digest = _content_hash(content)
+      name = str(audience.get("name", ""))
+      previous = stored.pop(name, None)
+      if previous == digest:
+        stats.unchanged += 1
+        continue
+      if previous is None:
+        stats.added += 1
+      else:
+        stats.updated += 1
+      rows.append((
+          serial,
+          owner,
+          buyer,
+          name,
+          str(audience.get("expiration_time", "")),
+          digest,
+          content,
+          now,
+      ))
+    stats.removed = len(stored)
+    with self._connection:
+      self._connection.executemany(_UPSERT, rows)
+      self._connection.executemany(
+          "DELETE FROM custom_audiences"
+          " WHERE serial = ? AND owner = ? AND buyer = ? AND name = ?",
+          [(serial, owner, buyer, name) for name in stored],
+      )
+    return stats
+
+  def query(
+      self,
+      serial: str = "",
+      owner: str = "",
+      buyer: str = "",
+      name: str = "",
+      expires_before: str = "",
+      limit: int = _DEFAULT_QUERY_LIMIT,
+  ) -> list[dict[str, Any]]:
+    """Find mirrored audiences.
+
+    Args:
+      serial: if set, only include audiences of this device.
+      owner: if set, only include audiences of this owning app.
+      buyer: if set, only include audiences of this buyer.
+      name: if set, only include audiences with this name.
+      expires_before: if set, only include audiences which expire before
+        this time, as an ISO 8601 timestamp such as `2025-03-16T14:13`.
+      limit: maximum number of audiences to return. Unlimited if not
+        positive.
+
+    Returns:
+      matching audiences, ordered by serial, owner, buyer and name.
+    """
+    conditions = []
+    params = []
+    for column, value in (
+        ("serial", serial),
+        ("owner", owner),
+        ("buyer", buyer),
+        ("name", name),
+    ):
+      if value:
+        conditions.append(f"{column} = ?")
+        params.append(value)
+    if expires_before:
+      # ISO 8601 timestamps sort as text.
+      conditions.append("expiration_time < ?")
+      params.append(expires_before)
+    sql = "SELECT content FROM custom_audiences"
+    if conditions:
+      sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY serial, owner, buyer, name"
+    if limit > 0:
+      sql += " LIMIT ?"
+      params.append(limit)
+    return [
+        json.loads(content)
+        for (content,) in self._connection.execute(sql, params)
+    ]
@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sqlite3
+import tempfile
+
+from absl.testing import absltest
+
+import custom_audience_store
+
+_SERIAL = 'emulator-5554'
+_OWNER = 'com.example.app'
+_BUYER = 'buyer.com'
+
+
+def _audience(name: str, expiration_time: str = '2025-03-16T14:13:23.245Z'):
+  return {
+      'name': name,
+      'owner': _OWNER,
+      'buyer': _BUYER,
+      'expiration_time': expiration_time,
+      'ads': [{'render_uri': f'https://{_BUYER}/{name}'}],
+  }
+
+
+class CustomAudienceStoreTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.store = self.enter_context(
+        custom_audience_store.CustomAudienceStore(
+            os.path.join(
+                self.enter_context(tempfile.TemporaryDirectory()), 'ca.db'
+            )
+        )
+    )
+
+  def _updated_at(self) -> dict[str, float]:
+    return dict(
+        self.store._connection.execute(
+            'SELECT name, updated_at FROM custom_audiences'
+        )
+    )
+
+  def test_sync_only_writes_changed_audiences(self):
+    self.store.sync(
+        _SERIAL, _OWNER, _BUYER, [_audience('shoes'), _audience('shirts')]
+    )
+    before = self._updated_at()
+    shirts = _audience('shirts')
+    shirts['ads'].append({'render_uri': 'https://buyer.com/new'})
+
+    stats = self.store.sync(
+        _SERIAL, _OWNER, _BUYER, [_audience('shoes'), shirts, _audience('hats')]
+    )
+
+    self.assertEqual(
+        stats,
+        custom_audience_store.SyncStats(added=1, updated=1, unchanged=1),
+    )
+    after = self._updated_at()
+    self.assertEqual(after['shoes'], before['shoes'])
+    self.assertGreaterEqual(after['shirts'], before['shirts'])
+    self.assertLen(self.store.query(name='shirts')[0]['ads'], 2)
+
+  def test_sync_removes_audiences_which_left_the_device(self):
+    self.store.sync(
+        _SERIAL, _OWNER, _BUYER, [_audience('shoes'), _audience('shirts')]
+    )
+    self.store.sync(_SERIAL, 'com.other.app', _BUYER, [_audience('shoes')])
+
+    stats = self.store.sync(_SERIAL, _OWNER, _BUYER, [_audience('shoes')])
+
+    self.assertEqual(stats.removed, 1)
+    self.assertEqual(
+        [audience['name'] for audience in self.store.query(buyer=_BUYER)],
+        ['shoes', 'shoes'],
+    )
+
+  def test_sync_keeps_audiences_of_other_devices(self):
+    self.store.sync(_SERIAL, _OWNER, _BUYER, [_audience('shoes')])
+
+    stats = self.store.sync('serial-2', _OWNER, _BUYER, [_audience('shirts')])
+
+    self.assertEqual(stats, custom_audience_store.SyncStats(added=1))
+    self.assertEqual(
+        [audience['name'] for audience in self.store.query(serial=_SERIAL)],
+        ['shoes'],
+    )
+    self.assertLen(self.store.query(), 2)
+
+  def test_recreates_database_without_serials(self):
+    path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'old.db'
+    )
+    connection = sqlite3.connect(path)
+    connection.execute(
+        'CREATE TABLE custom_audiences (owner TEXT, buyer TEXT, name TEXT)'
+    )
+    connection.commit()
+    connection.close()
+
+    with custom_audience_store.CustomAudienceStore(path) as store:
+      store.sync(_SERIAL, _OWNER, _BUYER, [_audience('shoes')])
+
+      self.assertLen(store.query(serial=_SERIAL), 1)
+
+  def test_query_filters(self):
+    self.store.sync(
+        _SERIAL,
+        _OWNER,
+        _BUYER,
+        [
+            _audience('shoes', '2025-01-01T00:00:00.000Z'),
+            _audience('shirts', '2025-06-01T00:00:00.000Z'),
+        ],
+    )
+
+    self.assertEqual(
+        [
+            audience['name']
+            for audience in self.store.query(expires_before='2025-03')
+        ],
+        ['shoes'],
+    )
+    self.assertEmpty(self.store.query(owner='com.other.app'))
+    self.assertLen(self.store.query(owner=_OWNER, limit=1), 1)
+
+
+if __name__ == '__main__':
+  absltest.main()
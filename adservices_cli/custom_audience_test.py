@@ -12,10 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+from collections.abc import Iterator
+import concurrent.futures
+import contextlib
+import gzip
+import io
 import json
+import os
+import tempfile
+from unittest import mock
 
 from absl.testing import absltest
 
+import adb
 import custom_audience
 import fake_adb
 import utilities
@@ -44,6 +54,10 @@ _GET_AUDIENCE_RESPONSE_MODIFIED = _TEST_CUSTOM_AUDIENCE_MODIFIED
 _GET_AUDIENCE_RESPONSE_EMPTY = {}
 
 
+def _chunks(data: bytes, size: int) -> Iterator[bytes]:
+  return (data[start : start + size] for start in range(0, len(data), size))
+
+
 class CustomAudienceTest(absltest.TestCase):
 
   def setUp(self):
@@ -55,10 +69,16 @@ class CustomAudienceTest(absltest.TestCase):
     super().tearDown()
     self.adb.reset()
 
+  def _list(self, **kwargs) -> str:
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+      self.assertIsNone(self.custom_audience.list(**kwargs))
+    return stdout.getvalue()
+
   def test_list_audiences_happy_path(self):
     self.adb.set_shell_output(json.dumps(_LIST_AUDIENCES_RESPONSE))
 
-    output = self.custom_audience.list(
+    output = self._list(
         owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
         buyer=_TEST_BUYER,
     )
@@ -79,7 +99,7 @@ class CustomAudienceTest(absltest.TestCase):
   def test_list_audiences_empty_response(self):
     self.adb.set_shell_output(json.dumps(_LIST_AUDIENCES_RESPONSE_EMPTY))
 
-    output = self.custom_audience.list(
+    output = self._list(
         owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
         buyer=_TEST_BUYER,
     )
@@ -87,10 +107,36 @@ class CustomAudienceTest(absltest.TestCase):
     self.assertTrue(self.adb.shell_called)
     self.assertEqual(json.loads(output), _LIST_AUDIENCES_RESPONSE_EMPTY)
 
+  def test_list_audiences_same_as_formatting_whole_output(self):
+    response = {
+        'custom_audiences': [_TEST_CUSTOM_AUDIENCE] * 3,
+        'audiences': [],
+        'count': 3,
+        'owner': {'package': 'com.example.test', 'apps': ['a', 'b']},
+    }
+    self.adb.set_shell_output(json.dumps(response))
+
+    output = self._list(
+        owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
+        buyer=_TEST_BUYER,
+    )
+
+    self.assertEqual(output, json.dumps(response, indent=4) + '\n')
+
+  def test_list_audiences_truncated_adb_response(self):
+    self.adb.set_shell_output(json.dumps(_LIST_AUDIENCES_RESPONSE)[:-20])
+
+    output = self._list(
+        owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
+        buyer=_TEST_BUYER,
+    )
+
+    self.assertIn('\n' + custom_audience.ERROR_FAILED_TO_PARSE, output)
+
   def test_list_audiences_bad_adb_response(self):
     self.adb.set_shell_output('bad_response #%%@')
 
-    output = self.custom_audience.list(
+    output = self._list(
         owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
         buyer=_TEST_BUYER,
     )
@@ -98,6 +144,33 @@ class CustomAudienceTest(absltest.TestCase):
     self.assertTrue(self.adb.shell_called)
     self.assertStartsWith(output, custom_audience.ERROR_FAILED_TO_PARSE)
 
+  def test_list_audiences_writes_before_the_output_ends(self):
+    adb_client = mock.create_autospec(adb.AdbClient)
+    stdout = io.StringIO()
+    written = []
+
+    def shell_stream(command, silent=False):
+      del command, silent
+      yield b'{"custom_audiences": ['
+      yield json.dumps(_TEST_CUSTOM_AUDIENCE).encode() + b', '
+      # The device has not sent the rest yet.
+      written.append(stdout.getvalue())
+      yield json.dumps(_TEST_CUSTOM_AUDIENCE).encode() + b']}'
+
+    adb_client.shell_stream.side_effect = shell_stream
+
+    with contextlib.redirect_stdout(stdout):
+      custom_audience.CustomAudience(adb_client).list(
+          owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
+          buyer=_TEST_BUYER,
+      )
+
+    self.assertIn(f'"name": "{_TEST_CUSTOM_AUDIENCE["name"]}"', written[0])
+    self.assertEqual(
+        json.loads(stdout.getvalue()),
+        {'custom_audiences': [_TEST_CUSTOM_AUDIENCE] * 2},
+    )
+
   def test_get_audiences_happy_path(self):
     self.adb.set_shell_output(json.dumps(_GET_AUDIENCE_RESPONSE))
 
@@ -182,5 +255,231 @@ class CustomAudienceTest(absltest.TestCase):
     )
 
 
+class CustomAudienceSyncTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb = mock.create_autospec(adb.AdbClient)
+    self.adb.serial = 'emulator-5554'
+    self.custom_audience = custom_audience.CustomAudience(self.adb)
+    self.database = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'ca.db'
+    )
+
+  def test_sync_lists_every_owner_and_buyer_in_one_round_trip(self):
+    self.adb.shell_batch.return_value = [
+        json.dumps(_LIST_AUDIENCES_RESPONSE),
+        json.dumps(_LIST_AUDIENCES_RESPONSE_EMPTY),
+        json.dumps(_LIST_AUDIENCES_RESPONSE_EMPTY),
+        'Error: unknown owner',
+    ]
+
+    output = self.custom_audience.sync(
+        owner_app_packages=(_TEST_INSTALLED_OWNER_PACKAGE, 'com.other'),
+        buyers=f'{_TEST_BUYER},other.com',
+        database=self.database,
+    )
+
+    commands = self.adb.shell_batch.call_args.args[0]
+    self.assertLen(commands, 4)
+    self.assertIn(
+        f'{custom_audience._ARG_OWNER} com.other {custom_audience._ARG_BUYER}'
+        ' other.com',
+        commands[3],
+    )
+    self.assertStartsWith(
+        output,
+        f'Synced 3 of 4 owner and buyer pairs into {self.database}: 1 added,',
+    )
+    self.assertIn('Error: unknown owner', output)
+
+  def test_sync_then_query(self):
+    self.adb.shell_batch.return_value = [json.dumps(_LIST_AUDIENCES_RESPONSE)]
+    self.custom_audience.sync(
+        _TEST_INSTALLED_OWNER_PACKAGE, _TEST_BUYER, database=self.database
+    )
+
+    output = self.custom_audience.sync(
+        _TEST_INSTALLED_OWNER_PACKAGE, _TEST_BUYER, database=self.database
+    )
+
+    self.assertIn('0 added, 0 updated, 0 removed, 1 unchanged.', output)
+    self.assertEqual(
+        json.loads(
+            self.custom_audience.query(database=self.database, name='shoes')
+        ),
+        {'custom_audiences': [_TEST_CUSTOM_AUDIENCE]},
+    )
+
+
+  def test_sync_reads_serial_in_the_same_round_trip(self):
+    self.adb.serial = ''
+    self.adb.shell_batch.return_value = [
+        'serial-1',
+        json.dumps(_LIST_AUDIENCES_RESPONSE),
+    ]
+
+    self.custom_audience.sync(
+        _TEST_INSTALLED_OWNER_PACKAGE, _TEST_BUYER, database=self.database
+    )
+
+    self.adb.shell_batch.assert_called_once()
+    self.assertLen(
+        json.loads(
+            self.custom_audience.query(
+                database=self.database, device_serial='serial-1'
+            )
+        )['custom_audiences'],
+        1,
+    )
+
+  def test_devices_sync_into_the_same_database_at_once(self):
+    serials = [f'serial-{index}' for index in range(4)]
+
+    def sync(serial: str) -> str:
+      adb_client = mock.create_autospec(adb.AdbClient)
+      adb_client.serial = serial
+      adb_client.shell_batch.return_value = [
+          json.dumps(_LIST_AUDIENCES_RESPONSE)
+      ]
+      return custom_audience.CustomAudience(adb_client).sync(
+          _TEST_INSTALLED_OWNER_PACKAGE, _TEST_BUYER, database=self.database
+      )
+
+    with concurrent.futures.ThreadPoolExecutor(len(serials)) as pool:
+      outputs = list(pool.map(sync, serials))
+
+    for output in outputs:
+      self.assertIn('1 added', output)
+    for serial in serials:
+      self.assertLen(
+          json.loads(
+              self.custom_audience.query(
+                  database=self.database, device_serial=serial
+              )
+          )['custom_audiences'],
+          1,
+      )
+
+class CustomAudienceExportTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb = mock.create_autospec(adb.AdbClient)
+    self.adb.shell_stream.side_effect = self._list
+    self.custom_audience = custom_audience.CustomAudience(self.adb)
+    self.directory = self.enter_context(tempfile.TemporaryDirectory())
+
+  def _list(self, command: str, silent: bool = False) -> Iterator[bytes]:
+    del silent  # Unused.
+    if 'failing.com' in command:
+      return iter([b'Error: unknown buyer'])
+    owner = command.split(f'{custom_audience._ARG_OWNER} ')[1].split(' ')[0]
+    output = json.dumps({
+        'custom_audiences': [
+            dict(_TEST_CUSTOM_AUDIENCE, owner=owner, name=f'{owner}-{index}')
+            for index in range(2)
+        ]
+    }).encode('utf-8')
+    return _chunks(output, 7)
+
+  def test_export_writes_one_audience_per_line_in_order(self):
+    owners = tuple(f'com.example.app{index}' for index in range(10))
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+      self.custom_audience.export(
+          owner_app_packages=owners,
+          buyers=f'{_TEST_BUYER},failing.com',
+          max_workers=3,
+      )
+
+    audiences = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    self.assertEqual(
+        [audience['name'] for audience in audiences],
+        [f'{owner}-{index}' for owner in owners for index in range(2)],
+    )
+    self.assertEqual(self.adb.shell_stream.call_count, 20)
+    self.assertIn(
+        'Exported 20 custom audiences, 10 lists failed.', stderr.getvalue()
+    )
+
+  def test_export_gzip(self):
+    output = os.path.join(self.directory, 'audiences.ndjson.gz')
+
+    with contextlib.redirect_stderr(io.StringIO()):
+      self.custom_audience.export(
+          _TEST_INSTALLED_OWNER_PACKAGE, _TEST_BUYER, output=output
+      )
+
+    with gzip.open(output, 'rt') as f:
+      self.assertLen(f.readlines(), 2)
+
+
+class AsyncCustomAudienceTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb = fake_adb.FakeAsyncAdb()
+    self.custom_audience = custom_audience.AsyncCustomAudience(self.adb)
+
+  def test_list_audiences_happy_path(self):
+    self.adb.set_shell_outputs([json.dumps(_LIST_AUDIENCES_RESPONSE)])
+
+    output = asyncio.run(
+        self.custom_audience.list(
+            owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
+            buyer=_TEST_BUYER,
+        )
+    )
+
+    self.assertContainsSubset(
+        utilities.split_adb_command(custom_audience._COMMAND_PREFIX)
+        + [
+            custom_audience._LIST_COMMAND,
+            custom_audience._ARG_OWNER,
+            _TEST_INSTALLED_OWNER_PACKAGE,
+            custom_audience._ARG_BUYER,
+            _TEST_BUYER,
+        ],
+        self.adb.shell_calls[0],
+    )
+    self.assertEqual(json.loads(output), _LIST_AUDIENCES_RESPONSE)
+
+  def test_get_audiences_bad_adb_response(self):
+    self.adb.set_shell_outputs(['bad_response #%%@'])
+
+    output = asyncio.run(
+        self.custom_audience.get(
+            name=_TEST_NAME,
+            owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
+            buyer=_TEST_BUYER,
+        )
+    )
+
+    self.assertStartsWith(output, custom_audience.ERROR_FAILED_TO_PARSE)
+
+  def test_refresh_happy_path(self):
+    self.adb.set_shell_outputs([
+        json.dumps(_GET_AUDIENCE_RESPONSE),
+        json.dumps(_REFRESH_AUDIENCE_RESPONSE),
+        json.dumps(_GET_AUDIENCE_RESPONSE_MODIFIED),
+    ])
+
+    diffed_json = json.loads(
+        asyncio.run(
+            self.custom_audience.refresh(
+                name=_TEST_NAME,
+                owner_app_package=_TEST_INSTALLED_OWNER_PACKAGE,
+                buyer=_TEST_BUYER,
+            )
+        )
+    )
+
+    self.assertEqual(diffed_json, _REFRESH_COM_EXPECTED_OUTPUT)
+    self.assertIn(custom_audience._REFRESH_COMMAND, self.adb.shell_calls[1])
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -0,0 +1,148 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache for device facts which only change when the device reboots."""
+
+from collections.abc import Callable
+import json
+import os
+import tempfile
+import threading
+
+# Prints the random id the kernel generates on every boot, the build
+# fingerprint and the time the active APEX list was last written. APEX updates
+# are activated on reboot, or rewrite the APEX list if they are rebootless.
+BOOT_IDENTITY_COMMAND = (
+    "cat /proc/sys/kernel/random/boot_id; getprop ro.build.fingerprint;"
+    " stat -c %Y /apex/apex-info-list.xml"
+)
+_CACHE_FILE_NAME = "device_facts.json"
+
+
+def default_path() -> str:
+  """Return the default location of the cache file.
+
+  Returns:
+    path of the cache file under $XDG_CACHE_HOME, or ~/.cache if not set.
+  """
+  cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+      os.path.expanduser("~"), ".cache"
+  )
+  return os.path.join(cache_home, "adservices_cli", _CACHE_FILE_NAME)
+
+
+def parse_boot_identity(output: str) -> str:
+  """Parses the output of `BOOT_IDENTITY_COMMAND`.
+
+  Args:
+    output: boot id, build fingerprint and APEX list time, one per line.
+
+  Returns:
+    an identity which changes on every reboot and APEX update, or an empty
+    string if the boot id could not be read.
+  """
+  lines = [line.strip() for line in output.strip().splitlines()]
+  if not lines or len(lines[0]) != 36:
+    return ""
+  return "|".join(lines)
+
+
+class DeviceFactsCache:
+  """Persistent cache of device facts, scoped to a single boot of a device.
+
+  Facts are stored per device serial together with the identity of the boot
+  they were read in. Reading a fact with a different identity drops all facts
+  cached for that device. The cache can be shared between threads.
+  """
+
+  def __init__(self, path: str = ""):
+    """Initializes the cache.
+
+    Args:
+      path: location of the cache file. Defaults to `default_path()`.
+    """
+    self._path = path or default_path()
+    self._lock = threading.Lock()
+    self._entries = None
+
+  def get(
+      self,
+      serial: str,
+      boot_identity: str,
+      name: str,
+      fetch: Callable[[], str],
+  ) -> str:
+    """Return a cached fact, reading it from the device if needed.
+
+    Args:
+      serial: serial of the device.
+      boot_identity: current identity of the device, see
+        `parse_boot_identity`. Facts are not cached if empty.
+      name: name of the fact.
+      fetch: reads the fact from the device. If it raises, nothing is
+        cached.
+
+    Returns:
+      the value of the fact.
+    """
+    if not boot_identity:
+      return fetch()
+    with self._lock:
+      entry = self._load().get(serial)
+      if entry and entry.get("boot_identity") == boot_identity:
+        facts = entry.get("facts", {})
+        if name in facts:
+          return facts[name]
+    value = fetch()
+    with self._lock:
+      entries = self._load()
+      entry = entries.get(serial)
+      if not entry or entry.get("boot_identity") != boot_identity:
+        entry = {"boot_identity": boot_identity, "facts": {}}
+        entries[serial] = entry
+      entry["facts"][name] = value
+      self._save(entries)
+    return value
+
+  def clear(self):
+    """Remove all cached facts."""
+    with self._lock:
+      self._entries = {}
+      if os.path.exists(self._path):
+        os.remove(self._path)
+
+  def _load(self) -> dict:
+    if self._entries is None:
+      try:
+        with open(self._path, encoding="utf-8") as f:
+          self._entries = json.load(f)
+      except (OSError, ValueError):
+        self._entries = {}
+      if not isinstance(self._entries, dict):
+        self._entries = {}
+    return self._entries
+
+  def _save(self, entries: dict):
+    directory = os.path.dirname(self._path)
+    try:
+      os.makedirs(directory, exist_ok=True)
+      # Write to a temporary file first, so concurrent CLI invocations never
+      # read a partially written cache.
+      fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+      with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+      os.replace(temp_path, self._path)
+    except OSError:
+      # The cache is only an optimization, so carry on without it.
+      pass
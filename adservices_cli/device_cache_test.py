@@ -0,0 +1,199 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import device_cache
+
+_BOOT_ID = '0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0'
+_OTHER_BOOT_ID = '11111111-2222-3333-4444-555555555555'
+_FINGERPRINT = 'google/device/device:15/AP3A/123:userdebug/dev-keys'
+
+
+def _identity_output(boot_id: str, apex_time: str = '1700000000') -> str:
+  return f'{boot_id}\n{_FINGERPRINT}\n{apex_time}'
+
+
+class DeviceFactsCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()),
+        'cache',
+        'device_facts.json',
+    )
+    self.identity = device_cache.parse_boot_identity(_identity_output(_BOOT_ID))
+
+  def test_fetches_once_per_boot(self):
+    cache = device_cache.DeviceFactsCache(self.path)
+    fetch = mock.Mock(return_value='34')
+
+    first = cache.get('serial-1', self.identity, 'sdk_version', fetch)
+    second = cache.get('serial-1', self.identity, 'sdk_version', fetch)
+
+    self.assertEqual(first, '34')
+    self.assertEqual(second, '34')
+    fetch.assert_called_once()
+
+  def test_persists_across_instances(self):
+    device_cache.DeviceFactsCache(self.path).get(
+        'serial-1', self.identity, 'sdk_version', lambda: '34'
+    )
+    fetch = mock.Mock(return_value='35')
+
+    value = device_cache.DeviceFactsCache(self.path).get(
+        'serial-1', self.identity, 'sdk_version', fetch
+    )
+
+    self.assertEqual(value, '34')
+    fetch.assert_not_called()
+
+  def test_reboot_invalidates_facts(self):
+    cache = device_cache.DeviceFactsCache(self.path)
+    cache.get('serial-1', self.identity, 'sdk_version', lambda: '34')
+    rebooted = device_cache.parse_boot_identity(
+        _identity_output(_OTHER_BOOT_ID)
+    )
+
+    value = cache.get('serial-1', rebooted, 'sdk_version', lambda: '35')
+
+    self.assertEqual(value, '35')
+
+  def test_apex_update_invalidates_facts(self):
+    cache = device_cache.DeviceFactsCache(self.path)
+    cache.get('serial-1', self.identity, 'apex_packages', lambda: 'v1')
+    updated = device_cache.parse_boot_identity(
+        _identity_output(_BOOT_ID, apex_time='1700000100')
+    )
+
+    value = cache.get('serial-1', updated, 'apex_packages', lambda: 'v2')
+
+    self.assertEqual(value, 'v2')
+
+  def test_devices_are_cached_separately(self):
+    cache = device_cache.DeviceFactsCache(self.path)
+    cache.get('serial-1', self.identity, 'sdk_version', lambda: '34')
+
+    value = cache.get('serial-2', self.identity, 'sdk_version', lambda: '33')
+
+    self.assertEqual(value, '33')
+
+  def test_unknown_identity_is_not_cached(self):
+    cache = device_cache.DeviceFactsCache(self.path)
+    fetch = mock.Mock(return_value='34')
+
+    cache.get('serial-1', '', 'sdk_version', fetch)
+    cache.get('serial-1', '', 'sdk_version', fetch)
+
+    self.assertEqual(fetch.call_count, 2)
+    self.assertFalse(os.path.exists(self.path))
+
+  def test_ignores_corrupt_file(self):
+    os.makedirs(os.path.dirname(self.path))
+    with open(self.path, 'w') as f:
+      f.write('{not json')
+
+    value = device_cache.DeviceFactsCache(self.path).get(
+        'serial-1', self.identity, 'sdk_version', lambda: '34'
+    )
+
+    self.assertEqual(value, '34')
+
+  def test_parse_boot_identity_rejects_missing_boot_id(self):
+    self.assertEqual(
+        device_cache.parse_boot_identity(
+            'cat: /proc/sys/kernel/random/boot_id: No such file or directory'
+        ),
+        '',
+    )
+
+  def test_adb_client_reads_facts_once_per_boot(self):
+    adb_client = adb.AdbClient(
+        'serial-1', fact_cache=device_cache.DeviceFactsCache(self.path)
+    )
+    run_shell = self.enter_context(
+        mock.patch.object(adb_client, '_run_shell')
+    )
+    run_shell.side_effect = [
+        (_identity_output(_BOOT_ID).encode('utf-8'), b'', 0),
+        (b'34\n', b'', 0),
+    ]
+
+    self.assertEqual(adb_client.get_sdk_version(), 34)
+    self.assertEqual(adb_client.get_sdk_version(), 34)
+
+    other_client = adb.AdbClient(
+        'serial-1', fact_cache=device_cache.DeviceFactsCache(self.path)
+    )
+    other_run_shell = self.enter_context(
+        mock.patch.object(other_client, '_run_shell')
+    )
+    other_run_shell.return_value = (
+        _identity_output(_BOOT_ID).encode('utf-8'),
+        b'',
+        0,
+    )
+
+    self.assertEqual(other_client.get_sdk_version(), 34)
+    self.assertEqual(run_shell.call_count, 2)
+    other_run_shell.assert_called_once_with(
+        device_cache.BOOT_IDENTITY_COMMAND, timeout=mock.ANY
+    )
+
+  def test_adb_client_does_not_cache_errors(self):
+    adb_client = adb.AdbClient(
+        'serial-1', fact_cache=device_cache.DeviceFactsCache(self.path)
+    )
+    run_shell = self.enter_context(
+        mock.patch.object(adb_client, '_run_shell')
+    )
+    run_shell.side_effect = [
+        (_identity_output(_BOOT_ID).encode('utf-8'), b'', 0),
+        (b'', b'error: device offline\n', 1),
+        (b'userdebug\n', b'', 0),
+    ]
+
+    self.assertFalse(adb_client.is_userdebug())
+    self.assertTrue(adb_client.is_userdebug())
+    self.assertTrue(adb_client.is_userdebug())
+    self.assertEqual(run_shell.call_count, 3)
+
+  def test_adb_client_rereads_boot_identity_when_forgotten(self):
+    adb_client = adb.AdbClient(
+        'serial-1', fact_cache=device_cache.DeviceFactsCache(self.path)
+    )
+    run_shell = self.enter_context(
+        mock.patch.object(adb_client, '_run_shell')
+    )
+    run_shell.side_effect = [
+        (_identity_output(_BOOT_ID).encode('utf-8'), b'', 0),
+        (b'34\n', b'', 0),
+        (_identity_output(_OTHER_BOOT_ID).encode('utf-8'), b'', 0),
+        (b'35\n', b'', 0),
+    ]
+
+    self.assertEqual(adb_client.get_sdk_version(), 34)
+    adb_client.forget_boot_identity()
+
+    self.assertEqual(adb_client.get_sdk_version(), 35)
+
+
+if __name__ == '__main__':
+  absltest.main()
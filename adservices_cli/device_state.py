@@ -0,0 +1,145 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Snapshot of adservices related device state, read in one round trip."""
+
+import re
+
+import adb
+import constants
+import device_cache
+
+_SYNC_DISABLED_MODES = ("none", "persistent", "until_reboot")
+_GETPROP_LINE = re.compile(r"^\[([^\]]+)\]: \[(.*?)\]$", re.MULTILINE | re.DOTALL)
+
+
+def parse_getprop(output: str) -> dict[str, str]:
+  """Parses the output of `getprop` without arguments.
+
+  Args:
+    output: lines formatted as `[key]: [value]`.
+
+  Returns:
+    system property values keyed by name.
+  """
+  return dict(_GETPROP_LINE.findall(output))
+
+
+def parse_device_config_list(output: str, namespace: str) -> dict[str, str]:
+  """Parses the output of `device_config list <namespace>`.
+
+  Args:
+    output: lines formatted as `key=value` or `namespace/key=value`.
+    namespace: namespace that was listed.
+
+  Returns:
+    device config values keyed by name, without the namespace.
+  """
+  values = {}
+  for line in output.splitlines():
+    key, separator, value = line.partition("=")
+    if not separator:
+      continue
+    values[key.removeprefix(f"{namespace}/")] = value
+  return values
+
+
+class DeviceState:
+  """Device properties, adservices flags and process state at one point in time.
+
+  Attributes:
+    props: all system properties keyed by name.
+    device_config: adservices device config values keyed by name.
+    apex_packages: output of `pm list packages --apex-only --show-versioncode`.
+    adservices_pid: pid of the adservices process, or -1 if not running.
+    sync_disabled_mode: device config sync mode, one of `none`, `persistent`
+      or `until_reboot`, or an empty string if unknown.
+  """
+
+  def __init__(
+      self,
+      props: dict[str, str],
+      device_config: dict[str, str],
+      apex_packages: str,
+      adservices_pid: int,
+      sync_disabled_mode: str = "",
+  ):
+    self.props = props
+    self.device_config = device_config
+    self.apex_packages = apex_packages
+    self.adservices_pid = adservices_pid
+    self.sync_disabled_mode = sync_disabled_mode
+
+  @classmethod
+  def read(cls, adb_client: adb.AdbClient) -> "DeviceState":
+    """Reads the device state with a single `adb shell` call.
+
+    APEX packages only change on reboot, so they come from the fact cache of
+    the client if it has one, and cost a second call otherwise.
+
+    Args:
+      adb_client: client for the device to read.
+
+    Returns:
+      the current device state.
+    """
+    props, device_config, pid, sync_disabled_mode, boot_identity = (
+        adb_client.shell_batch([
+            "getprop",
+            f"device_config list {constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE}",
+            f"pidof -s {constants.ADSERVICES_API_PACKAGE}",
+            "device_config get_sync_disabled_for_tests",
+            device_cache.BOOT_IDENTITY_COMMAND,
+        ])
+    )
+    adb_client.set_boot_identity(boot_identity)
+    apex_packages = adb_client.get_apex_packages()
+    return cls(
+        props=parse_getprop(props),
+        device_config=parse_device_config_list(
+            device_config, constants.ADSERVICES_DEVICE_CONFIG_NAMESPACE
+        ),
+        apex_packages=apex_packages,
+        adservices_pid=int(pid) if pid.isdigit() else -1,
+        sync_disabled_mode=(
+            sync_disabled_mode
+            if sync_disabled_mode in _SYNC_DISABLED_MODES
+            else ""
+        ),
+    )
+
+  @property
+  def sdk_version(self) -> int:
+    """Android SDK version, or -1 if unknown."""
+    return _to_int(self.props.get("ro.build.version.sdk", ""))
+
+  @property
+  def ad_services_version(self) -> int:
+    """AdServices extension version, or -1 if unknown."""
+    return _to_int(self.props.get("build.version.extensions.ad_services", ""))
+
+  @property
+  def is_adservices_running(self) -> bool:
+    return self.adservices_pid > -1
+
+  def get_package(self, package: str) -> str:
+    """Returns package info for an installed APEX, or an empty string."""
+    for installed_package_info in self.apex_packages.split("\n"):
+      if package in installed_package_info:
+        return installed_package_info
+    return ""
+
+
+def _to_int(value: str) -> int:
+  return int(value) if value.strip().isdigit() else -1
@@ -0,0 +1,111 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import device_state
+
+_GETPROP_OUTPUT = """[build.version.extensions.ad_services]: [12]
+[debug.adservices.global_kill_switch]: [false]
+[ro.build.version.sdk]: [34]
+[ro.multi.line]: [first
+second]
+[ro.empty]: []"""
+
+_DEVICE_CONFIG_LIST_OUTPUT = """fledge_auction_server_enabled=true
+ppapi_app_allow_list=*
+adservices/global_kill_switch=false
+not a flag"""
+
+_APEX_PACKAGES_OUTPUT = """package:com.android.tzdata versionCode:351010000
+package:com.google.android.adservices versionCode:351111000"""
+_BOOT_IDENTITY_OUTPUT = """0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0
+google/device/device:15/AP3A/123:userdebug/dev-keys
+1700000000"""
+
+
+class DeviceStateTest(absltest.TestCase):
+
+  def test_parse_getprop(self):
+    props = device_state.parse_getprop(_GETPROP_OUTPUT)
+
+    self.assertEqual(
+        props,
+        {
+            'build.version.extensions.ad_services': '12',
+            'debug.adservices.global_kill_switch': 'false',
+            'ro.build.version.sdk': '34',
+            'ro.multi.line': 'first\nsecond',
+            'ro.empty': '',
+        },
+    )
+
+  def test_parse_device_config_list(self):
+    values = device_state.parse_device_config_list(
+        _DEVICE_CONFIG_LIST_OUTPUT, 'adservices'
+    )
+
+    self.assertEqual(
+        values,
+        {
+            'fledge_auction_server_enabled': 'true',
+            'ppapi_app_allow_list': '*',
+            'global_kill_switch': 'false',
+        },
+    )
+
+  def test_read_uses_single_shell_call(self):
+    adb_client = mock.create_autospec(adb.AdbClient)
+    adb_client.shell_batch.return_value = [
+        _GETPROP_OUTPUT,
+        _DEVICE_CONFIG_LIST_OUTPUT,
+        '1234',
+        'until_reboot',
+        _BOOT_IDENTITY_OUTPUT,
+    ]
+    adb_client.get_apex_packages.return_value = _APEX_PACKAGES_OUTPUT
+
+    state = device_state.DeviceState.read(adb_client)
+
+    adb_client.shell_batch.assert_called_once()
+    adb_client.shell.assert_not_called()
+    adb_client.set_boot_identity.assert_called_once_with(_BOOT_IDENTITY_OUTPUT)
+    self.assertEqual(state.sdk_version, 34)
+    self.assertEqual(state.ad_services_version, 12)
+    self.assertEqual(state.adservices_pid, 1234)
+    self.assertTrue(state.is_adservices_running)
+    self.assertEqual(
+        state.get_package('com.google.android.adservices'),
+        'package:com.google.android.adservices versionCode:351111000',
+    )
+    self.assertEqual(state.device_config['ppapi_app_allow_list'], '*')
+
+  def test_read_handles_missing_values(self):
+    adb_client = mock.create_autospec(adb.AdbClient)
+    adb_client.shell_batch.return_value = ['', '', '', '', '']
+    adb_client.get_apex_packages.return_value = ''
+
+    state = device_state.DeviceState.read(adb_client)
+
+    self.assertEqual(state.sdk_version, -1)
+    self.assertEqual(state.ad_services_version, -1)
+    self.assertFalse(state.is_adservices_running)
+    self.assertEqual(state.get_package('com.google.android.adservices'), '')
+
+
+if __name__ == '__main__':
+  absltest.main()
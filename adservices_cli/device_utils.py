@@ -14,6 +14,9 @@
 
 """Utils relating to devices."""
 
+from collections.abc import Callable
+import time
+
 _ANDROID_11_VERSION_CODE = 30
 _ANDROID_12_VERSION_CODE = 31
 _ANDROID_12L_VERSION_CODE = 32
@@ -26,3 +29,33 @@ def is_extservices(version_code: int) -> bool:
       _ANDROID_12_VERSION_CODE,
       _ANDROID_12L_VERSION_CODE,
   ]
+
+
+def wait_until(
+    condition: Callable[[], bool],
+    timeout_sec: float,
+    initial_delay_sec: float = 0.05,
+    max_delay_sec: float = 1.0,
+) -> bool:
+  """Poll a device condition with exponential backoff until it holds.
+
+  Args:
+    condition: checks the device, for example whether a process is running.
+    timeout_sec: time after which to give up.
+    initial_delay_sec: delay before the second check. The delay doubles after
+      every check.
+    max_delay_sec: upper bound of the delay between checks.
+
+  Returns:
+    true if the condition held before the deadline.
+  """
+  deadline = time.monotonic() + timeout_sec
+  delay = initial_delay_sec
+  while True:
+    if condition():
+      return True
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+      return False
+    time.sleep(min(delay, remaining))
+    delay = min(delay * 2, max_delay_sec)
@@ -0,0 +1,63 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+from unittest import mock
+
+from absl.testing import absltest
+
+import device_utils
+
+
+class WaitUntilTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.now = 0.0
+    self.enter_context(
+        mock.patch.object(time, 'monotonic', side_effect=lambda: self.now)
+    )
+    self.sleep = self.enter_context(
+        mock.patch.object(time, 'sleep', side_effect=self._advance)
+    )
+
+  def _advance(self, seconds: float):
+    self.now += seconds
+
+  def test_backs_off_exponentially(self):
+    condition = mock.Mock(side_effect=[False, False, False, False, True])
+
+    self.assertTrue(device_utils.wait_until(condition, timeout_sec=10))
+
+    self.assertEqual(
+        [c.args[0] for c in self.sleep.call_args_list], [0.05, 0.1, 0.2, 0.4]
+    )
+
+  def test_delay_is_capped(self):
+    condition = mock.Mock(side_effect=[False] * 8 + [True])
+
+    device_utils.wait_until(condition, timeout_sec=10, max_delay_sec=0.5)
+
+    self.assertEqual(self.sleep.call_args_list[-1].args[0], 0.5)
+
+  def test_gives_up_at_deadline(self):
+    condition = mock.Mock(return_value=False)
+
+    self.assertFalse(device_utils.wait_until(condition, timeout_sec=1))
+
+    self.assertEqual(self.now, 1)
+
+
+if __name__ == '__main__':
+  absltest.main()
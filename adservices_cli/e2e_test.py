@@ -29,7 +29,16 @@ class AdServicesTest(absltest.TestCase):
     self.adservices = adservices.AdServices(self.adb)
 
     self.adb.get_sdk_version.return_value = 33
+    self.adb.get_apex_packages.return_value = ''
+    # adservices is running until it is killed.
+    self.adb.is_process_running.side_effect = [True, False]
     self.adb.is_root.return_value = True
+    self.adb.shell_batch.side_effect = lambda commands, silent=True: [''] * len(
+        commands
+    )
+
+  def _written_commands(self) -> list[str]:
+    return self.adb.shell_batch.call_args.args[0]
 
   def test_kill_with_root(self):
     self.adservices.kill()
@@ -50,16 +59,20 @@ class AdServicesTest(absltest.TestCase):
   def test_enable(self):
     self.adservices.enable(flag_constants.FEATURE_ALL)
 
-    self.adb.put_device_config.assert_called()
-    self.adb.setprop.assert_called()
-    self.adb.set_sync_disabled_for_tests.assert_called_once_with('until_reboot')
+    written = self._written_commands()
+    self.assertTrue(any(c.startswith('device_config put') for c in written))
+    self.assertTrue(any(c.startswith('setprop') for c in written))
+    self.assertIn(
+        'device_config set_sync_disabled_for_tests until_reboot', written
+    )
 
   def test_enable_disable_flag_push_is_false(self):
     self.adservices.enable(flag_constants.FEATURE_ALL, False)
 
-    self.adb.put_device_config.assert_called()
-    self.adb.setprop.assert_called()
-    self.adb.set_sync_disabled_for_tests.assert_called_once_with('none')
+    written = self._written_commands()
+    self.assertTrue(any(c.startswith('device_config put') for c in written))
+    self.assertTrue(any(c.startswith('setprop') for c in written))
+    self.assertIn('device_config set_sync_disabled_for_tests none', written)
 
   def test_enable_invalid_argument(self):
     try:
@@ -67,8 +80,8 @@ class AdServicesTest(absltest.TestCase):
     except ValueError as unused_error:
       pass
 
-    self.adb.put_device_config.assert_not_called()
-    self.adb.setprop.assert_not_called()
+    # Only the device state was read, nothing was written.
+    self.adb.shell_batch.assert_called_once()
 
   def test_enable_without_root_android_34(self):
     self.adb.is_root.return_value = False
@@ -76,15 +89,17 @@ class AdServicesTest(absltest.TestCase):
 
     self.adservices.enable(flag_constants.FEATURE_ALL)
 
-    self.adb.put_device_config.assert_called()
-    self.adb.setprop.assert_called()
+    written = self._written_commands()
+    self.assertTrue(any(c.startswith('device_config put') for c in written))
+    self.assertTrue(any(c.startswith('setprop') for c in written))
 
   def test_disable(self):
     self.adservices.disable('all')
 
-    self.adb.put_device_config.assert_called()
-    self.adb.setprop.assert_called()
-    self.adb.set_sync_disabled_for_tests.assert_called_once_with('none')
+    written = self._written_commands()
+    self.assertTrue(any(c.startswith('device_config put') for c in written))
+    self.assertTrue(any(c.startswith('setprop') for c in written))
+    self.assertIn('device_config set_sync_disabled_for_tests none', written)
 
   def test_disable_invalid_argument(self):
     try:
@@ -92,14 +107,28 @@ class AdServicesTest(absltest.TestCase):
     except ValueError as unused_error:
       pass
 
-    self.adb.put_device_config.assert_not_called()
-    self.adb.setprop.assert_not_called()
+    self.adb.shell_batch.assert_called_once()
 
   def test_status(self):
+    self.adb.shell_batch.side_effect = None
+    self.adb.shell_batch.return_value = [
+        '[ro.build.version.sdk]: [34]\n'
+        '[debug.adservices.global_kill_switch]: [false]',
+        'fledge_auction_server_enabled=true',
+        '1234',
+        'until_reboot',
+        '',
+    ]
+    self.adb.get_apex_packages.return_value = (
+        'package:com.google.android.adservices versionCode:351111000'
+    )
+
     self.adservices.status()
 
-    self.adb.get_device_config.assert_called()
-    self.adb.getprop.assert_called()
+    self.adb.shell_batch.assert_called_once()
+    self.adb.get_device_config.assert_not_called()
+    self.adb.getprop.assert_not_called()
+    self.adb.shell.assert_not_called()
 
   def test_open_ui(self):
     self.adservices.open_ui()
@@ -14,11 +14,66 @@
 
 """Utilities for testing adservices cli."""
 
+from collections.abc import Iterator
+import os
+import stat
+
 import adb
+import async_adb
 import utilities
 
 _TEST_INSTALLED_OWNER_PACKAGE = 'com.example.test'
 
+# Stand-in for the `adb` binary which runs `adb shell` against the local shell.
+# FAKE_ADB_SPAWN_DELAY_SEC models the cost of adb connecting to the device and
+# FAKE_ADB_SERIALS lists the serials reported by `adb devices` and
+# FAKE_ADB_LOGCAT is a file whose content `adb logcat` prints.
+_FAKE_ADB_EXECUTABLE = """#!/bin/sh
+if [ -n "$FAKE_ADB_SPAWN_DELAY_SEC" ]; then sleep "$FAKE_ADB_SPAWN_DELAY_SEC"; fi
+if [ "$1" = "-s" ]; then shift 2; fi
+case "$1" in
+  shell)
+    shift
+    if [ "$1" = "-T" ]; then shift; fi
+    if [ $# -eq 0 ]; then exec /bin/sh; fi
+    exec /bin/sh -c "$*"
+    ;;
+  root)
+    echo "adbd is already running as root"
+    ;;
+  logcat)
+    cat "$FAKE_ADB_LOGCAT"
+    ;;
+  devices)
+    echo "List of devices attached"
+    for serial in $FAKE_ADB_SERIALS; do printf '%s\tdevice\n' "$serial"; done
+    printf 'offline-serial\toffline\n'
+    ;;
+  *)
+    echo "fake adb: unsupported command: $*" >&2
+    exit 1
+    ;;
+esac
+"""
+
+
+def write_fake_adb_executable(directory: str) -> str:
+  """Writes an executable named `adb` which runs shell commands locally.
+
+  Prepend the directory to PATH to make AdbClient use the fake.
+
+  Args:
+    directory: directory to write the executable into.
+
+  Returns:
+    path of the executable.
+  """
+  path = os.path.join(directory, 'adb')
+  with open(path, 'w') as f:
+    f.write(_FAKE_ADB_EXECUTABLE)
+  os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+  return path
+
 
 class FakeAdb(adb.AdbClient):
   """Fake ADB client for testing.
@@ -32,7 +87,8 @@ class FakeAdb(adb.AdbClient):
 
   def __init__(self):
     """Initializes the fake ADB client."""
-    self._shell_outputs = ''
+    super().__init__()
+    self._shell_outputs = []
     self.shell_calls = []
 
   def set_shell_output(self, output: str) -> None:
@@ -51,10 +107,40 @@ class FakeAdb(adb.AdbClient):
   def shell_called(self) -> bool:
     return self.shell_calls
 
-  def shell(self, command: str, silent: bool = False) -> str:
+  def shell(
+      self, command: str, silent: bool = False, timeout: float = 5
+  ) -> str:
     output = self._shell_outputs.pop(0)
     self.shell_calls.append(utilities.split_adb_command(command))
     return output
 
+  def shell_stream(self, command: str, silent: bool = False) -> Iterator[bytes]:
+    yield self.shell(command, silent).encode('utf-8')
+
   def is_package_installed(self, package: str) -> bool:
     return package == _TEST_INSTALLED_OWNER_PACKAGE
+
+
+class FakeAsyncAdb(async_adb.AsyncAdbClient):
+  """Fake asyncio ADB client for testing.
+
+  Behaves like FakeAdb: outputs are returned in the order they were set, and
+  shell calls are recorded split into their base parts.
+
+  Not thread-safe.
+  """
+
+  def __init__(self):
+    """Initializes the fake ADB client."""
+    super().__init__()
+    self._shell_outputs = []
+    self.shell_calls = []
+
+  def set_shell_outputs(self, outputs: list[str]) -> None:
+    """Sets the shell output."""
+    self._shell_outputs = outputs
+
+  async def shell(self, command: str, silent: bool = False) -> str:
+    output = self._shell_outputs.pop(0)
+    self.shell_calls.append(utilities.split_adb_command(command))
+    return output
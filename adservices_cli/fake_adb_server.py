@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local stand-in for the adb server, for testing adb_server.AdbServerClient.
+
+Implements `host:version`, `host:transport:<serial>`, `host:transport-any`,
+`shell,v2,raw:<command>` and `root:`. Shell commands run against the local
+shell.
+"""
+
+import socketserver
+import struct
+import subprocess
+import threading
+
+import adb_server
+
+_ADB_SERVER_VERSION = "0029"
+
+
+class FakeAdbServer:
+  """Fake adb server listening on an ephemeral localhost port.
+
+  Attributes:
+    port: port the server is listening on.
+    connections: number of connections accepted so far.
+    commands: shell commands received so far, in order.
+  """
+
+  def __init__(self, serials: tuple[str, ...] = ("emulator-5554",)):
+    """Starts the server on a background thread.
+
+    Args:
+      serials: serials of the fake attached devices.
+    """
+    self._serials = serials
+    self.connections = 0
+    self.commands = []
+    self._lock = threading.Lock()
+    fake = self
+
+    class _Handler(socketserver.BaseRequestHandler):
+
+      def handle(self):
+        with fake._lock:
+          fake.connections += 1
+        try:
+          fake._handle(self.request)
+        except adb_server.AdbProtocolError:
+          pass  # Client went away, for example an unused pooled connection.
+
+    self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Handler)
+    self._server.daemon_threads = True
+    self.port = self._server.server_address[1]
+    threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+  def close(self):
+    self._server.shutdown()
+    self._server.server_close()
+
+  def _handle(self, sock):
+    while True:
+      length = int(adb_server.recv_exactly(sock, 4), 16)
+      request = adb_server.recv_exactly(sock, length).decode("utf-8")
+      if request == "host:version":
+        _okay(sock, _ADB_SERVER_VERSION)
+        return
+      if request == "host:transport-any":
+        if len(self._serials) != 1:
+          _fail(sock, "more than one device/emulator")
+          return
+        sock.sendall(b"OKAY")
+      elif request.startswith("host:transport:"):
+        serial = request[len("host:transport:") :]
+        if serial not in self._serials:
+          _fail(sock, f"device '{serial}' not found")
+          return
+        sock.sendall(b"OKAY")
+      elif request.startswith("shell,v2,raw:"):
+        sock.sendall(b"OKAY")
+        self._shell(sock, request[len("shell,v2,raw:") :])
+        return
+      elif request == "root:":
+        sock.sendall(b"OKAY")
+        sock.sendall(b"adbd is already running as root\n")
+        return
+      else:
+        _fail(sock, f"unknown request {request}")
+        return
+
+  def _shell(self, sock, command: str):
+    with self._lock:
+      self.commands.append(command)
+    result = subprocess.run(
+        ["/bin/sh", "-c", command],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        check=False,
+    )
+    if result.stdout:
+      _send_shell_packet(sock, adb_server._SHELL_V2_STDOUT, result.stdout)
+    if result.stderr:
+      _send_shell_packet(sock, adb_server._SHELL_V2_STDERR, result.stderr)
+    _send_shell_packet(
+        sock, adb_server._SHELL_V2_EXIT, bytes([result.returncode & 0xFF])
+    )
+
+
+def _okay(sock, message: str):
+  sock.sendall(b"OKAY" + adb_server.encode_request(message))
+
+
+def _fail(sock, message: str):
+  sock.sendall(b"FAIL" + adb_server.encode_request(message))
+
+
+def _send_shell_packet(sock, packet_id: int, data: bytes):
+  sock.sendall(struct.pack("<BI", packet_id, len(data)) + data)
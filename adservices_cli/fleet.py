@@ -0,0 +1,353 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run CLI commands on several devices in parallel."""
+
+from collections.abc import Callable
+import concurrent.futures
+import functools
+import inspect
+import io
+import json
+import os
+import re
+import sys
+import threading
+from typing import Any
+
+import adservices
+import device_state
+import flag_constants
+
+OUTPUT_FORMAT_TABLE = "table"
+OUTPUT_FORMAT_JSON = "json"
+_OUTPUT_FORMATS = (OUTPUT_FORMAT_TABLE, OUTPUT_FORMAT_JSON)
+_DEFAULT_MAX_WORKERS = 8
+# Parameter naming the file a command writes, such as `export --output`.
+_OUTPUT_PARAMETER = "output"
+_STDOUT = "-"
+
+
+class DeviceResult:
+  """Outcome of running a command on one device.
+
+  Attributes:
+    serial: serial of the device.
+    value: return value of the command, or None if it failed.
+    output: everything the command printed.
+    error: description of the exception raised by the command, if any.
+  """
+
+  def __init__(self, serial: str, value: Any, output: str, error: str = ""):
+    self.serial = serial
+    self.value = value
+    self.output = output
+    self.error = error
+
+  def to_dict(self) -> dict[str, Any]:
+    return {"result": self.value, "output": self.output, "error": self.error}
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+  """Stdout replacement which sends each worker thread's output to a buffer."""
+
+  def __init__(self, default):
+    super().__init__()
+    self._default = default
+    self._local = threading.local()
+
+  def capture(self, buffer: io.StringIO | None):
+    self._local.buffer = buffer
+
+  def write(self, text: str) -> int:
+    buffer = getattr(self._local, "buffer", None)
+    return (buffer or self._default).write(text)
+
+  def flush(self):
+    self._default.flush()
+
+
+class Fleet:
+  """Privacy Sandbox for Android CLI, running each command on many devices.
+
+  Commands run on a bounded pool of worker threads, one device per task, and
+  their results are aggregated into a single table or JSON document.
+  """
+
+  def __init__(
+      self,
+      serials: list[str],
+      create_adservices: Callable[[str], adservices.AdServices],
+      max_workers: int = _DEFAULT_MAX_WORKERS,
+      output_format: str = OUTPUT_FORMAT_TABLE,
+  ):
+    """Initializes the fleet.
+
+    Args:
+      serials: serials of the devices to run commands on.
+      create_adservices: creates the commands for the device with a serial.
+      max_workers: maximum number of devices to run a command on at once.
+      output_format: `table` or `json`.
+    """
+    if output_format not in _OUTPUT_FORMATS:
+      raise ValueError(
+          f"Expected one of {_OUTPUT_FORMATS} as output format, was"
+          f" {output_format}."
+      )
+    self._devices = {serial: create_adservices(serial) for serial in serials}
+    self._max_workers = max(1, min(max_workers, len(serials)))
+    self._output_format = output_format
+
+  @functools.cached_property
+  def ad_selection(self) -> "_FleetCommandGroup":
+    """Ad selection commands, run on every device."""
+    return _FleetCommandGroup(self, "ad_selection", self._template)
+
+  @functools.cached_property
+  def custom_audience(self) -> "_FleetCommandGroup":
+    """Custom audience commands, run on every device."""
+    return _FleetCommandGroup(self, "custom_audience", self._template)
+
+  @property
+  def _template(self) -> adservices.AdServices:
+    return next(iter(self._devices.values()))
+
+  def status(self) -> str:
+    """Show adservices status of every device, side by side.
+
+    Returns:
+      the aggregated status of all devices.
+    """
+    results = self.run(
+        lambda device: device.status_report(
+            device_state.DeviceState.read(device.adb)
+        )
+    )
+    if self._output_format == OUTPUT_FORMAT_JSON:
+      return _to_json(results)
+    return _status_table(results)
+
+  def enable(
+      self,
+      feature_name: str = flag_constants.FEATURE_ALL,
+      disable_flag_push: bool = True,
+  ) -> str:
+    """Enable adservices features on every device.
+
+    Args:
+      feature_name: enables a specific feature or all features.
+      disable_flag_push: Disable remote feature flag pushes from Google.
+
+    Returns:
+      the aggregated output of all devices.
+    """
+    return self._render(
+        self.run(lambda device: device.enable(feature_name, disable_flag_push))
+    )
+
+  def disable(self, feature_name: str = flag_constants.FEATURE_ALL) -> str:
+    """Disable adservices features on every device.
+
+    Args:
+      feature_name: disables a specific feature or all features.
+
+    Returns:
+      the aggregated output of all devices.
+    """
+    return self._render(self.run(lambda device: device.disable(feature_name)))
+
+  def kill(self) -> str:
+    """Kill the core adservices process on every device.
+
+    Returns:
+      the aggregated output of all devices.
+    """
+    return self._render(self.run(lambda device: device.kill()))
+
+  def restart(
+      self,
+      wait_ready: bool = False,
+      timeout_sec: float = adservices.RESTART_TIMEOUT_SEC,
+  ) -> str:
+    """Restart the core adservices process on every device.
+
+    Args:
+      wait_ready: if true, wait until the new process is running.
+      timeout_sec: maximum time to wait for the process to exit, and again for
+        the new process to start.
+
+    Returns:
+      the restart latencies of all devices.
+    """
+    return self._render(
+        self.run(lambda device: device.restart(wait_ready, timeout_sec))
+    )
+
+  def run(
+      self, command: Callable[[adservices.AdServices], Any]
+  ) -> list[DeviceResult]:
+    """Run a command on every device in parallel.
+
+    Args:
+      command: called with the commands of each device.
+
+    Returns:
+      the result for each device, in the order the serials were given.
+    """
+    return self._run_with_serial(
+        lambda unused_serial, device: command(device)
+    )
+
+  def _run_with_serial(
+      self, command: Callable[[str, adservices.AdServices], Any]
+  ) -> list[DeviceResult]:
+    """Like `run`, but also passes the serial of each device to the command."""
+    stdout = _ThreadLocalStdout(sys.stdout)
+
+    def run_on_device(serial: str) -> DeviceResult:
+      buffer = io.StringIO()
+      stdout.capture(buffer)
+      try:
+        value = command(serial, self._devices[serial])
+        return DeviceResult(serial, value, buffer.getvalue())
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        return DeviceResult(
+            serial, None, buffer.getvalue(), f"{type(e).__name__}: {e}"
+        )
+      finally:
+        stdout.capture(None)
+
+    original_stdout, sys.stdout = sys.stdout, stdout
+    try:
+      with concurrent.futures.ThreadPoolExecutor(self._max_workers) as pool:
+        return list(pool.map(run_on_device, self._devices))
+    finally:
+      sys.stdout = original_stdout
+
+  def _render(self, results: list[DeviceResult]) -> str:
+    if self._output_format == OUTPUT_FORMAT_JSON:
+      return _to_json(results)
+    sections = []
+    for result in results:
+      lines = [f"=== {result.serial} ==="]
+      if result.output:
+        lines.append(result.output.rstrip("\n"))
+      if result.value is not None:
+        lines.append(str(result.value))
+      if result.error:
+        lines.append(f"Error: {result.error}")
+      sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+class _FleetCommandGroup:
+  """Command group, such as `ad-selection`, fanned out over a fleet.
+
+  Mirrors the public methods of the group on a single device, so Fire shows
+  the same commands and arguments. Commands which write an `--output` file
+  write one file per device, with the serial added to the file name.
+  """
+
+  def __init__(self, fleet: Fleet, group_name: str, template):
+    group = getattr(template, group_name)
+    for name, method in inspect.getmembers(group, inspect.ismethod):
+      if name.startswith("_"):
+        continue
+      setattr(self, name, self._fan_out(fleet, group_name, name, method))
+
+  @staticmethod
+  def _fan_out(fleet: Fleet, group_name: str, name: str, method):
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def fan_out(*args, **kwargs) -> str:
+      def run_on_device(serial: str, device: adservices.AdServices) -> Any:
+        arguments = signature.bind(*args, **kwargs)
+        output = arguments.arguments.get(_OUTPUT_PARAMETER)
+        if output and output != _STDOUT:
+          # Devices would overwrite each other's file.
+          arguments.arguments[_OUTPUT_PARAMETER] = _device_output_path(
+              str(output), serial
+          )
+        return getattr(getattr(device, group_name), name)(
+            *arguments.args, **arguments.kwargs
+        )
+
+      return fleet._render(fleet._run_with_serial(run_on_device))
+
+    return fan_out
+
+
+def _device_output_path(path: str, serial: str) -> str:
+  """Add a device serial to the name of an output file.
+
+  Args:
+    path: output file of a command, such as `audiences.ndjson.gz`.
+    serial: serial of the device the command runs on.
+
+  Returns:
+    the path with the serial before the extensions, such as
+    `audiences.emulator-5554.ndjson.gz`.
+  """
+  directory, file_name = os.path.split(path)
+  stem, dot, extensions = file_name.partition(".")
+  # Serials of network devices contain `:`.
+  serial = re.sub(r"[^\w.-]", "_", serial)
+  return os.path.join(directory, f"{stem}.{serial}{dot}{extensions}")
+
+
+def _to_json(results: list[DeviceResult]) -> str:
+  return json.dumps(
+      {result.serial: result.to_dict() for result in results},
+      indent=2,
+      default=str,
+  )
+
+
+def _status_table(results: list[DeviceResult]) -> str:
+  """Renders status reports as rows of values with one column per device."""
+  rows = {}
+  for result in results:
+    for values in (result.value or {}).values():
+      for key, value in values.items():
+        rows.setdefault(key, {})[result.serial] = value
+    if result.error:
+      rows.setdefault("Error", {})[result.serial] = result.error
+
+  serials = [result.serial for result in results]
+  key_width = max([len(key) for key in rows] + [0])
+  widths = [
+      max(
+          [len(serial)]
+          + [len(str(row.get(serial, ""))) for row in rows.values()]
+      )
+      for serial in serials
+  ]
+  lines = [
+      " ".join(
+          [" " * key_width]
+          + [serial.ljust(width) for serial, width in zip(serials, widths)]
+      ).rstrip()
+  ]
+  for key, row in rows.items():
+    lines.append(
+        " ".join(
+            [key.ljust(key_width)]
+            + [
+                str(row.get(serial, "")).ljust(width)
+                for serial, width in zip(serials, widths)
+            ]
+        ).rstrip()
+    )
+  return "\n".join(lines)
@@ -0,0 +1,179 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import adservices
+import fake_adb
+import fleet
+
+_SERIALS = ['serial-1', 'serial-2']
+
+
+def _state_outputs(sdk_version: str) -> list[str]:
+  return [
+      f'[ro.build.version.sdk]: [{sdk_version}]',
+      '',
+      '',
+      'none',
+      '',
+  ]
+
+
+class FleetTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb_clients = {}
+    for serial in _SERIALS:
+      adb_client = mock.create_autospec(adb.AdbClient, instance=True)
+      adb_client.serial = serial
+      adb_client.get_apex_packages.return_value = (
+          'package:com.google.android.adservices versionCode:1'
+      )
+      self.adb_clients[serial] = adb_client
+
+  def _fleet(self, output_format=fleet.OUTPUT_FORMAT_TABLE) -> fleet.Fleet:
+    return fleet.Fleet(
+        _SERIALS,
+        lambda serial: adservices.AdServices(self.adb_clients[serial]),
+        output_format=output_format,
+    )
+
+  def test_status_table_has_column_per_device(self):
+    self.adb_clients['serial-1'].shell_batch.return_value = _state_outputs('33')
+    self.adb_clients['serial-2'].shell_batch.return_value = _state_outputs('34')
+
+    output = self._fleet().status()
+
+    lines = output.splitlines()
+    self.assertEqual(lines[0].split(), _SERIALS)
+    self.assertEqual(lines[1].split()[-2:], ['33', '34'])
+
+  def test_status_json(self):
+    self.adb_clients['serial-1'].shell_batch.return_value = _state_outputs('33')
+    self.adb_clients['serial-2'].shell_batch.side_effect = ValueError('offline')
+
+    output = json.loads(self._fleet(fleet.OUTPUT_FORMAT_JSON).status())
+
+    self.assertEqual(
+        output['serial-1']['result']['DEVICE INFORMATION'][
+            'Android SDK Version'
+        ],
+        '33',
+    )
+    self.assertIsNone(output['serial-2']['result'])
+    self.assertEqual(output['serial-2']['error'], 'ValueError: offline')
+
+  def test_run_captures_output_per_device(self):
+    def command(device):
+      print(f'hello from {device.adb.serial}')
+      return device.adb.serial
+
+    results = self._fleet().run(command)
+
+    self.assertEqual([r.serial for r in results], _SERIALS)
+    self.assertEqual([r.value for r in results], _SERIALS)
+    self.assertEqual(
+        [r.output for r in results],
+        [f'hello from {serial}\n' for serial in _SERIALS],
+    )
+
+  def test_run_is_parallel(self):
+    barrier = threading.Barrier(len(_SERIALS), timeout=5)
+
+    results = self._fleet().run(lambda unused_device: barrier.wait())
+
+    self.assertEqual([r.error for r in results], ['', ''])
+
+  def test_command_group_fans_out(self):
+    adb_clients = {serial: fake_adb.FakeAdb() for serial in _SERIALS}
+    for serial, adb_client in adb_clients.items():
+      adb_client.set_shell_output(json.dumps({'serial': serial}))
+    devices = fleet.Fleet(
+        _SERIALS,
+        lambda serial: adservices.AdServices(adb_clients[serial]),
+        output_format=fleet.OUTPUT_FORMAT_JSON,
+    )
+
+    output = json.loads(
+        devices.custom_audience.list(
+            owner_app_package='com.example.test', buyer='buyer.com'
+        )
+    )
+
+    for serial in _SERIALS:
+      self.assertIsNone(output[serial]['result'])
+      self.assertEqual(json.loads(output[serial]['output']), {'serial': serial})
+
+  def test_export_writes_a_file_per_device(self):
+    for serial, adb_client in self.adb_clients.items():
+      adb_client.shell_stream.return_value = iter([
+          json.dumps({'custom_audiences': [{'name': serial}]}).encode('utf-8')
+      ])
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+
+    with contextlib.redirect_stderr(io.StringIO()):
+      self._fleet().custom_audience.export(
+          'com.example.test',
+          'buyer.com',
+          output=os.path.join(directory, 'audiences.ndjson.gz'),
+      )
+
+    for serial in _SERIALS:
+      with gzip.open(
+          os.path.join(directory, f'audiences.{serial}.ndjson.gz'), 'rt'
+      ) as f:
+        self.assertEqual(json.loads(f.read()), {'name': serial})
+
+  def test_view_auction_results_writes_a_file_per_device(self):
+    for serial, adb_client in self.adb_clients.items():
+      adb_client.shell_batch.return_value = [f'Error: no result on {serial}']
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+
+    with contextlib.redirect_stderr(io.StringIO()):
+      self._fleet().ad_selection.view_auction_results(
+          '1', output=os.path.join(directory, 'results.ndjson'), cache=False
+      )
+
+    for serial in _SERIALS:
+      with open(os.path.join(directory, f'results.{serial}.ndjson')) as f:
+        self.assertEqual(
+            json.loads(f.read())['error'], f'Error: no result on {serial}'
+        )
+
+  def test_device_output_path(self):
+    self.assertEqual(
+        fleet._device_output_path('out/audiences.ndjson.gz', '10.0.0.2:5555'),
+        os.path.join('out', 'audiences.10.0.0.2_5555.ndjson.gz'),
+    )
+    self.assertEqual(fleet._device_output_path('results', 's'), 'results.s')
+
+  def test_invalid_output_format_raises(self):
+    with self.assertRaises(ValueError):
+      self._fleet(output_format='xml')
+
+
+if __name__ == '__main__':
+  absltest.main()
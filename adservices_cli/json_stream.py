@@ -0,0 +1,180 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parses a JSON object as its bytes arrive, one member at a time.
+
+Arrays under chosen keys are not parsed as a whole, but item by item, so only
+one item has to be held in memory. This keeps memory flat for device output
+such as a list of thousands of custom audiences.
+"""
+
+import codecs
+from collections.abc import Collection, Iterable, Iterator
+import json
+import re
+from typing import Any
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class _Reader:
+  """Text of a JSON document, decoded from chunks of UTF-8 as needed."""
+
+  def __init__(self, chunks: Iterable[bytes]):
+    self._chunks = iter(chunks)
+    self._decoder = codecs.getincrementaldecoder("utf-8")()
+    self._text = ""
+    self._position = 0
+    self._done = False
+
+  def peek(self) -> str:
+    """Skip whitespace, then return the next character, or "" at the end."""
+    while True:
+      self._position = _WHITESPACE.match(self._text, self._position).end()
+      if self._position < len(self._text):
+        return self._text[self._position]
+      if not self._read(1):
+        return ""
+
+  def take(self, expected: str) -> str:
+    """Consume the next character, which must be one of `expected`.
+
+    Raises:
+      JSONDecodeError: if the next character is not expected.
+    """
+    char = self.peek()
+    if not char or char not in expected:
+      raise self.error(f"Expecting one of {expected!r}")
+    self._position += 1
+    return char
+
+  def value(self) -> Any:
+    """Consume the next complete JSON value.
+
+    Raises:
+      JSONDecodeError: if the value is not valid JSON.
+    """
+    self.peek()
+    while True:
+      try:
+        value, end = _DECODER.raw_decode(self._text, self._position)
+      except json.JSONDecodeError:
+        # Most likely the value is not complete yet. Read at least as much
+        # again before retrying, so a large value is not decoded over and
+        # over.
+        if not self._read(2 * (len(self._text) - self._position)):
+          raise
+        continue
+      # Numbers and literals could go on in the next chunk.
+      if end < len(self._text) or not self._read(1):
+        self._position = end
+        return value
+
+  def error(self, message: str) -> json.JSONDecodeError:
+    """Return an error at the current position."""
+    return json.JSONDecodeError(message, self._text, self._position)
+
+  def remainder(self) -> str:
+    """Return the text which was not consumed, reading the rest of it."""
+    while self._read(1):
+      pass
+    return self._text[self._position :]
+
+  def _read(self, size: int) -> bool:
+    """Read until at least `size` characters are unconsumed.
+
+    Returns:
+      whether any text was read.
+    """
+    if self._done:
+      return False
+    # Only keep what is not consumed yet.
+    parts = [self._text[self._position :]]
+    self._position = 0
+    available = len(parts[0])
+    for chunk in self._chunks:
+      text = self._decoder.decode(chunk)
+      parts.append(text)
+      available += len(text)
+      if available >= size and text:
+        break
+    else:
+      parts.append(self._decoder.decode(b"", final=True))
+      self._done = True
+    text = "".join(parts)
+    read = len(text) > len(parts[0])
+    self._text = text
+    return read
+
+
+class ObjectStream:
+  """Members of a JSON object, parsed as its text arrives.
+
+  Iterating yields `(key, value)` pairs in document order. Arrays under one of
+  `array_keys` are yielded as an iterator over their items, which are parsed
+  as it advances. Such an iterator must be used before the next member, and
+  is skipped otherwise.
+
+  Parse errors are raised as `json.JSONDecodeError` while iterating. Members
+  yielded until then were valid.
+  """
+
+  def __init__(self, chunks: Iterable[bytes], array_keys: Collection[str] = ()):
+    """Initializes the stream.
+
+    Args:
+      chunks: UTF-8 text of the object, in chunks of any size.
+      array_keys: keys of the arrays to parse item by item.
+    """
+    self._reader = _Reader(chunks)
+    self._array_keys = array_keys
+
+  def __iter__(self) -> Iterator[tuple[str, Any]]:
+    reader = self._reader
+    reader.take("{")
+    if reader.peek() != "}":
+      while True:
+        if reader.peek() != '"':
+          raise reader.error("Expecting property name")
+        key = reader.value()
+        reader.take(":")
+        if key in self._array_keys and reader.peek() == "[":
+          items = self._items()
+          yield key, items
+          for _ in items:
+            pass
+        else:
+          yield key, reader.value()
+        if reader.take(",}") == "}":
+          break
+    else:
+      reader.take("}")
+    if reader.peek():
+      raise reader.error("Extra data")
+
+  def remainder(self) -> str:
+    """Return the text which was not parsed, such as an error message."""
+    return self._reader.remainder()
+
+  def _items(self) -> Iterator[Any]:
+    reader = self._reader
+    reader.take("[")
+    if reader.peek() == "]":
+      reader.take("]")
+      return
+    while True:
+      yield reader.value()
+      if reader.take(",]") == "]":
+        return
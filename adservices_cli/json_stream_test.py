@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Iterator
+import json
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import json_stream
+
+_DOCUMENT = {
+    'count': 12345,
+    'custom_audiences': [
+        {'name': f'café-{index}', 'bid': index / 3, 'ads': [None, True]}
+        for index in range(5)
+    ],
+    'empty': [],
+    'emoji': '\U0001f45f',
+    'done': False,
+}
+
+
+def _chunks(data: bytes, size: int) -> Iterator[bytes]:
+  return (data[start : start + size] for start in range(0, len(data), size))
+
+
+def _parse(stream: json_stream.ObjectStream) -> dict[str, object]:
+  return {
+      key: list(value) if isinstance(value, Iterator) else value
+      for key, value in stream
+  }
+
+
+class ObjectStreamTest(parameterized.TestCase):
+
+  @parameterized.parameters(1, 2, 7, 64, 1 << 20)
+  def test_same_as_json_loads_in_any_chunks(self, size):
+    data = json.dumps(_DOCUMENT, ensure_ascii=False, indent=2).encode('utf-8')
+
+    stream = json_stream.ObjectStream(
+        _chunks(data, size), ('custom_audiences', 'empty')
+    )
+
+    self.assertEqual(_parse(stream), _DOCUMENT)
+
+  def test_arrays_under_keys_are_yielded_item_by_item(self):
+    data = json.dumps(_DOCUMENT).encode('utf-8')
+    read = []
+
+    def chunks():
+      for chunk in _chunks(data, 16):
+        read.append(chunk)
+        yield chunk
+
+    for key, value in json_stream.ObjectStream(chunks(), ('custom_audiences',)):
+      if key == 'custom_audiences':
+        self.assertIsInstance(value, Iterator)
+        next(value)
+        break
+    self.assertLess(len(read), len(data) // 16)
+
+  def test_unused_items_are_skipped(self):
+    data = json.dumps(_DOCUMENT).encode('utf-8')
+
+    keys = [
+        key
+        for key, _ in json_stream.ObjectStream(
+            _chunks(data, 5), ('custom_audiences',)
+        )
+    ]
+
+    self.assertEqual(keys, list(_DOCUMENT))
+
+  @parameterized.parameters(
+      b'Error: unknown buyer',
+      b'{"custom_audiences": [{"name": "a"}',
+      b'{"custom_audiences": [1 2]}',
+      b'{"count": 1} trailing',
+      b'',
+  )
+  def test_invalid_json_raises(self, data):
+    stream = json_stream.ObjectStream(_chunks(data, 3), ('custom_audiences',))
+
+    with self.assertRaises(json.JSONDecodeError):
+      _parse(stream)
+
+  def test_remainder_includes_unread_chunks(self):
+    data = b'Error: unknown buyer'
+    stream = json_stream.ObjectStream(_chunks(data, 3))
+
+    with self.assertRaises(json.JSONDecodeError):
+      _parse(stream)
+
+    self.assertEqual(stream.remainder(), 'Error: unknown buyer')
+
+
+if __name__ == '__main__':
+  absltest.main()
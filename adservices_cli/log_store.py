@@ -0,0 +1,239 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""SQLite store for captured logcat records, with a full-text index.
+
+Records are inserted in batches inside one transaction each, and the message
+text is indexed with FTS5 where SQLite supports it, so long captures can be
+queried by tag, level, pid, time range and text without scanning them.
+"""
+
+from collections.abc import Iterable, Iterator
+import sqlite3
+import time
+
+import logcat
+
+_DEFAULT_BATCH_SIZE = 2000
+_DEFAULT_FLUSH_INTERVAL_SEC = 1.0
+_DEFAULT_QUERY_LIMIT = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+  id INTEGER PRIMARY KEY,
+  timestamp TEXT NOT NULL,
+  pid INTEGER NOT NULL,
+  tid INTEGER NOT NULL,
+  level TEXT NOT NULL,
+  tag TEXT NOT NULL,
+  message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_timestamp ON logs (timestamp);
+CREATE INDEX IF NOT EXISTS logs_tag ON logs (tag, timestamp);
+CREATE INDEX IF NOT EXISTS logs_pid ON logs (pid);
+"""
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+  message, content='logs', content_rowid='id'
+);
+"""
+_INSERT = (
+    "INSERT INTO logs (timestamp, pid, tid, level, tag, message)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+# Indexing a whole batch with one statement is about twice as fast as
+# indexing every row from a trigger.
+_INDEX_SINCE = (
+    "INSERT INTO logs_fts (rowid, message)"
+    " SELECT id, message FROM logs WHERE id > ?"
+)
+
+
+class LogStore:
+  """Captured logcat records in a SQLite database."""
+
+  def __init__(self, path: str):
+    """Opens the database, creating it if needed.
+
+    Args:
+      path: location of the database file.
+    """
+    self._connection = sqlite3.connect(path)
+    # Captures are append-only and can be re-recorded, so trade durability on
+    # power loss for insert throughput.
+    self._connection.execute("PRAGMA journal_mode = WAL")
+    self._connection.execute("PRAGMA synchronous = NORMAL")
+    with self._connection:
+      self._connection.executescript(_SCHEMA)
+    try:
+      with self._connection:
+        self._connection.executescript(_FTS_SCHEMA)
+      self.has_full_text_index = True
+    except sqlite3.OperationalError:
+      # SQLite was built without FTS5, so text queries fall back to LIKE.
+      self.has_full_text_index = False
+
+  def close(self):
+    self._connection.close()
+
+  def __enter__(self) -> "LogStore":
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def ingest(
+      self,
+      records: Iterable[logcat.LogRecord],
+      batch_size: int = _DEFAULT_BATCH_SIZE,
+      flush_interval_sec: float = _DEFAULT_FLUSH_INTERVAL_SEC,
+  ) -> int:
+    """Insert records until the iterable ends.
+
+    Records are written in batches, and at least every `flush_interval_sec`
+    while records keep arriving, so a live capture can be queried while it
+    runs.
+
+    Args:
+      records: records to insert, for example a live logcat stream.
+      batch_size: maximum number of records per transaction.
+      flush_interval_sec: maximum time a received record waits to be written.
+
+    Returns:
+      number of records inserted.
+    """
+    count = 0
+    batch = []
+    last_flush = time.monotonic()
+    try:
+      for record in records:
+        batch.append((
+            record.timestamp,
+            record.pid,
+            record.tid,
+            record.level,
+            record.tag,
+            record.message,
+        ))
+        if (
+            len(batch) >= batch_size
+            or time.monotonic() - last_flush >= flush_interval_sec
+        ):
+          count += self._insert(batch)
+          batch = []
+          last_flush = time.monotonic()
+    finally:
+      # Keep what was received when the capture is interrupted.
+      count += self._insert(batch)
+    return count
+
+  def iterate(
+      self,
+      tags: Iterable[str] = (),
+      min_level: str = "V",
+      pid: int = 0,
+      since: str = "",
+      until: str = "",
+      text: str = "",
+      limit: int = _DEFAULT_QUERY_LIMIT,
+  ) -> Iterator[logcat.LogRecord]:
+    """Find captured records, reading them from the database as needed.
+
+    Args:
+      tags: tags to include. Includes all tags if empty.
+      min_level: lowest level to include.
+      pid: if positive, only include records of this process.
+      since: earliest timestamp to include, as `MM-DD HH:MM:SS.mmm` or a
+        prefix of it.
+      until: latest timestamp to include, in the same format as `since`.
+      text: full-text query on the message, such as `auction AND failed`.
+        Text which is not a valid query, such as `com.example.app`, is
+        searched as a phrase.
+      limit: maximum number of records to return. Unlimited if not positive.
+
+    Yields:
+      matching records in the order they were logged.
+    """
+    conditions = []
+    params = []
+    tags = list(tags)
+    if tags:
+      conditions.append(f"tag IN ({', '.join('?' * len(tags))})")
+      params.extend(tags)
+    levels = logcat.levels_from(min_level)
+    if levels != logcat.LEVELS:
+      conditions.append(f"level IN ({', '.join('?' * len(levels))})")
+      params.extend(levels)
+    if pid > 0:
+      conditions.append("pid = ?")
+      params.append(pid)
+    if since:
+      conditions.append("timestamp >= ?")
+      params.append(since)
+    if until:
+      # Timestamps sort as text, so a prefix includes everything it covers.
+      conditions.append("timestamp <= ?")
+      params.append(until + "\uffff")
+    match_index = None
+    if text and self.has_full_text_index:
+      conditions.append(
+          "id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)"
+      )
+      match_index = len(params)
+      params.append(text)
+    elif text:
+      conditions.append("message LIKE ?")
+      params.append(f"%{text}%")
+
+    sql = "SELECT timestamp, pid, tid, level, tag, message FROM logs"
+    if conditions:
+      sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY id"
+    if limit > 0:
+      sql += " LIMIT ?"
+      params.append(limit)
+    try:
+      rows = self._connection.execute(sql, params)
+    except sqlite3.OperationalError:
+      if match_index is None:
+        raise
+      # Plain text such as `com.example.app` or `fetch-js` is not a valid
+      # query, so search for its words as a phrase.
+      params[match_index] = '"' + text.replace('"', '""') + '"'
+      rows = self._connection.execute(sql, params)
+    for row in rows:
+      yield logcat.LogRecord(*row)
+
+  def query(self, **kwargs) -> list[logcat.LogRecord]:
+    """Find captured records.
+
+    Args:
+      **kwargs: filters, as for `iterate`.
+
+    Returns:
+      matching records in the order they were logged.
+    """
+    return list(self.iterate(**kwargs))
+
+  def _insert(self, batch: list[tuple[str, int, int, str, str, str]]) -> int:
+    if not batch:
+      return 0
+    with self._connection:
+      (last_id,) = self._connection.execute(
+          "SELECT coalesce(max(id), 0) FROM logs"
+      ).fetchone()
+      self._connection.executemany(_INSERT, batch)
+      if self.has_full_text_index:
+        self._connection.execute(_INDEX_SINCE, (last_id,))
+    return len(batch)
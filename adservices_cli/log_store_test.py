@@ -0,0 +1,142 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import log_store
+import logcat
+
+_RECORDS = [
+    logcat.LogRecord(
+        '01-02 03:04:05.000', 100, 101, 'D', 'adservices.fledge', 'Auction 1'
+    ),
+    logcat.LogRecord(
+        '01-02 03:04:06.000', 100, 102, 'E', 'adservices', 'Auction failed'
+    ),
+    logcat.LogRecord(
+        '01-02 03:05:00.000', 200, 201, 'I', 'adservices.topics', 'Epoch done'
+    ),
+    logcat.LogRecord(
+        '01-02 03:06:00.000', 100, 101, 'V', 'adservices.fledge', 'Bid 0.5'
+    ),
+]
+
+
+class LogStoreTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'logs.db'
+    )
+    self.store = self.enter_context(log_store.LogStore(self.path))
+    self.store.ingest(_RECORDS, batch_size=3)
+
+  def _messages(self, **kwargs) -> list[str]:
+    return [record.message for record in self.store.query(**kwargs)]
+
+  def test_ingest_in_batches(self):
+    self.assertEqual(
+        self._messages(),
+        ['Auction 1', 'Auction failed', 'Epoch done', 'Bid 0.5'],
+    )
+
+  def test_query_by_tag_and_level(self):
+    self.assertEqual(
+        self._messages(tags=['adservices.fledge'], min_level='D'), ['Auction 1']
+    )
+
+  def test_query_by_pid(self):
+    self.assertEqual(self._messages(pid=200), ['Epoch done'])
+
+  def test_query_by_time_range(self):
+    self.assertEqual(
+        self._messages(since='01-02 03:04:06', until='01-02 03:05'),
+        ['Auction failed', 'Epoch done'],
+    )
+
+  def test_query_by_text(self):
+    self.assertTrue(self.store.has_full_text_index)
+
+    self.assertEqual(
+        self._messages(text='auction AND failed'), ['Auction failed']
+    )
+
+  def test_query_by_plain_text_which_is_not_a_valid_query(self):
+    message = 'fetch-js timed out for com.example.app at https://buyer.com/x'
+    self.store.ingest([
+        logcat.LogRecord(
+            '01-02 03:07:00.000', 100, 101, 'W', 'adservices', message
+        ),
+    ])
+
+    for text in ('com.example.app', 'fetch-js', 'https://buyer.com/x'):
+      with self.subTest(text=text):
+        self.assertEqual(self._messages(text=text), [message])
+
+  def test_query_by_text_with_unbalanced_quote(self):
+    self.assertEqual(self._messages(text='"auction failed'), ['Auction failed'])
+
+  def test_query_limit(self):
+    self.assertEqual(self._messages(limit=1), ['Auction 1'])
+
+  def test_records_persist(self):
+    with log_store.LogStore(self.path) as reopened:
+      self.assertLen(reopened.query(limit=0), 4)
+
+  def test_ingest_keeps_records_received_before_interrupt(self):
+    def interrupted():
+      yield _RECORDS[0]
+      raise KeyboardInterrupt()
+
+    with self.assertRaises(KeyboardInterrupt):
+      self.store.ingest(interrupted())
+
+    self.assertLen(self.store.query(limit=0), 5)
+
+
+class LogsCaptureTest(absltest.TestCase):
+
+  def test_capture_then_query(self):
+    path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'logs.db'
+    )
+    adb_client = mock.create_autospec(adb.AdbClient)
+    lines = [
+        '01-02 03:04:05.678  1234  5678 D adservices.fledge: Running auction',
+        '01-02 03:04:05.679  1234  5679 I ActivityManager: Start proc 4321',
+    ]
+    adb_client.logcat.return_value = (line for line in lines)
+    logs = logcat.Logs(adb_client)
+    output = io.StringIO()
+
+    with contextlib.redirect_stdout(output):
+      logs.capture(database=path, dump=True)
+      logs.query(database=path, text='auction', output_format='ndjson')
+
+    lines = output.getvalue().splitlines()
+    self.assertEqual(lines[0], f'Captured 1 logs into {path}.')
+    self.assertIn('"message":"Running auction"', lines[1])
+    self.assertIn('-d', adb_client.logcat.call_args.args[0])
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,345 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Streaming, structured view of adservices logcat output.
+
+Logcat lines flow through a pipeline of generators, from the `adb logcat`
+process to the formatted output, so memory use does not grow with the length
+of the session.
+"""
+
+from collections.abc import Callable, Collection, Iterable, Iterator
+import itertools
+import json
+import re
+
+import adb
+import flag_constants
+
+OUTPUT_FORMAT_PRETTY = "pretty"
+OUTPUT_FORMAT_NDJSON = "ndjson"
+_OUTPUT_FORMATS = (OUTPUT_FORMAT_PRETTY, OUTPUT_FORMAT_NDJSON)
+DEFAULT_DATABASE = "adservices_logs.db"
+LEVELS = "VDIWEF"
+# `MM-DD HH:MM:SS.mmm  PID  TID L TAG     : message`
+_THREADTIME_LINE = re.compile(
+    r"^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEF])\s"
+    r"(.*?)\s*: ?(.*)$"
+)
+
+
+class LogRecord:
+  """A single parsed logcat line.
+
+  Attributes:
+    timestamp: time of the log, as `MM-DD HH:MM:SS.mmm` in device time.
+    pid: id of the process which logged.
+    tid: id of the thread which logged.
+    level: one of `V`, `D`, `I`, `W`, `E` or `F`.
+    tag: log tag.
+    message: log message.
+  """
+
+  __slots__ = ("timestamp", "pid", "tid", "level", "tag", "message")
+
+  def __init__(
+      self,
+      timestamp: str,
+      pid: int,
+      tid: int,
+      level: str,
+      tag: str,
+      message: str,
+  ):
+    self.timestamp = timestamp
+    self.pid = pid
+    self.tid = tid
+    self.level = level
+    self.tag = tag
+    self.message = message
+
+  def to_dict(self) -> dict[str, str | int]:
+    return {name: getattr(self, name) for name in self.__slots__}
+
+
+def parse_threadtime(lines: Iterable[str]) -> Iterator[LogRecord]:
+  """Parses logcat output in `threadtime` format.
+
+  Args:
+    lines: lines of `adb logcat -v threadtime` output.
+
+  Yields:
+    a record for every log line. Other lines, such as buffer separators, are
+    skipped.
+  """
+  for line in lines:
+    match = _THREADTIME_LINE.match(line)
+    if not match:
+      continue
+    timestamp, pid, tid, level, tag, message = match.groups()
+    yield LogRecord(timestamp, int(pid), int(tid), level, tag, message)
+
+
+def filter_records(
+    records: Iterable[LogRecord],
+    tags: Collection[str],
+    min_level: str = "V",
+) -> Iterator[LogRecord]:
+  """Keeps records with one of the given tags and at least the given level.
+
+  Args:
+    records: records to filter.
+    tags: tags to keep.
+    min_level: lowest level to keep, one of `V`, `D`, `I`, `W`, `E` or `F`.
+
+  Yields:
+    the matching records.
+  """
+  tags = frozenset(tags)
+  levels = levels_from(min_level)
+  for record in records:
+    if record.tag in tags and record.level in levels:
+      yield record
+
+
+def format_pretty(record: LogRecord) -> str:
+  return (
+      f"{record.timestamp} {record.pid:>5} {record.tid:>5} {record.level}"
+      f" {record.tag}: {record.message}"
+  )
+
+
+def format_ndjson(record: LogRecord) -> str:
+  return json.dumps(record.to_dict(), separators=(",", ":"))
+
+
+class Logs:
+  """View adservices logs.
+
+  Overview:
+    Logs are read with `adb logcat` and filtered to the adservices log tags
+    enabled by `enable`.
+  """
+
+  def __init__(self, adb_client: adb.AdbClient):
+    self._adb = adb_client
+
+  def stream(
+      self,
+      output_format: str = OUTPUT_FORMAT_PRETTY,
+      min_level: str = "V",
+      tags: str = "",
+      dump: bool = False,
+      limit: int = 0,
+  ):
+    """Stream adservices logs until interrupted.
+
+    Args:
+      output_format: `pretty` for human readable lines, or `ndjson` for one
+        JSON object per line with timestamp, pid, tid, level, tag and message.
+      min_level: lowest level to show, one of `V`, `D`, `I`, `W`, `E` or `F`.
+      tags: comma separated log tags to show. Defaults to the adservices tags.
+      dump: if true, print the logs already on the device and exit.
+      limit: if positive, exit after printing this many logs.
+    """
+    formatter = _formatter(output_format)
+    lines = self._logcat(min_level, tags, dump)
+    records = filter_records(
+        parse_threadtime(lines), _tags_or_default(tags), min_level
+    )
+    if limit > 0:
+      records = itertools.islice(records, limit)
+    try:
+      for record in records:
+        print(formatter(record), flush=True)
+    except KeyboardInterrupt:
+      pass
+    finally:
+      lines.close()
+
+  def capture(
+      self,
+      database: str = DEFAULT_DATABASE,
+      min_level: str = "V",
+      tags: str = "",
+      dump: bool = False,
+      limit: int = 0,
+  ):
+    """Record adservices logs into a database until interrupted.
+
+    The database can be searched with `logs query`, also while the capture is
+    running.
+
+    Args:
+      database: SQLite database to add the logs to. Created if needed.
+      min_level: lowest level to record, one of `V`, `D`, `I`, `W`, `E` or
+        `F`.
+      tags: comma separated log tags to record. Defaults to the adservices
+        tags.
+      dump: if true, record the logs already on the device and exit.
+      limit: if positive, exit after recording this many logs.
+    """
+    import log_store  # pylint: disable=g-import-not-at-top
+
+    lines = self._logcat(min_level, tags, dump)
+    records = filter_records(
+        parse_threadtime(lines), _tags_or_default(tags), min_level
+    )
+    if limit > 0:
+      records = itertools.islice(records, limit)
+    count = 0
+    with log_store.LogStore(database) as store:
+      try:
+        count = store.ingest(records)
+      except KeyboardInterrupt:
+        pass
+      finally:
+        lines.close()
+    print(f"Captured {count} logs into {database}.")
+
+  def query(
+      self,
+      database: str = DEFAULT_DATABASE,
+      tags: str = "",
+      min_level: str = "V",
+      pid: int = 0,
+      since: str = "",
+      until: str = "",
+      text: str = "",
+      limit: int = 100,
+      output_format: str = OUTPUT_FORMAT_PRETTY,
+  ):
+    """Search logs recorded by `logs capture`.
+
+    Args:
+      database: SQLite database written by `logs capture`.
+      tags: comma separated log tags to show. Shows all recorded tags if
+        empty.
+      min_level: lowest level to show, one of `V`, `D`, `I`, `W`, `E` or `F`.
+      pid: if set, only show logs of this process.
+      since: earliest time to show, as `MM-DD HH:MM:SS.mmm` or a prefix of it
+        such as `01-02 03:04`.
+      until: latest time to show, in the same format as `since`.
+      text: full-text search on the message, such as `auction AND failed`.
+      limit: maximum number of logs to show. Unlimited if 0.
+      output_format: `pretty` or `ndjson`.
+    """
+    import log_store  # pylint: disable=g-import-not-at-top
+
+    formatter = _formatter(output_format)
+    with log_store.LogStore(database) as store:
+      records = store.query(
+          tags=_parse_tags(tags),
+          min_level=min_level,
+          pid=pid,
+          since=str(since),
+          until=str(until),
+          text=str(text),
+          limit=limit,
+      )
+    for record in records:
+      print(formatter(record))
+
+  def auctions(
+      self,
+      database: str = "",
+      phases: str = "",
+      output_format: str = "table",
+  ):
+    """Report per-phase latency of the on-device auctions in the logs.
+
+    Requires verbose logging, see `enable`. Auctions are read from the logs on
+    the device, or from a database written by `logs capture`, and the p50, p90
+    and p99 latency of bidding logic fetch, trusted signals fetch,
+    generateBid, scoreAd and reporting is printed.
+
+    Args:
+      database: SQLite database written by `logs capture`. Reads the logs on
+        the device if empty.
+      phases: JSON file with log patterns which start and end each phase, to
+        override the built-in ones.
+      output_format: `table`, or `json` for a machine readable summary.
+    """
+    import auction_phases  # pylint: disable=g-import-not-at-top
+    import log_store  # pylint: disable=g-import-not-at-top
+
+    if output_format not in ("table", "json"):
+      raise ValueError(
+          f"Expected one of ('table', 'json') as output format, was"
+          f" {output_format}."
+      )
+    phase_patterns = (
+        auction_phases.load_phases(phases)
+        if phases
+        else auction_phases.DEFAULT_PHASES
+    )
+    if database:
+      with log_store.LogStore(database) as store:
+        count, summary = auction_phases.summarize(
+            auction_phases.timelines(
+                store.iterate(tags=[auction_phases.FLEDGE_TAG], limit=0),
+                phase_patterns,
+            )
+        )
+    else:
+      lines = self._logcat("V", auction_phases.FLEDGE_TAG, dump=True)
+      try:
+        count, summary = auction_phases.summarize(
+            auction_phases.timelines(parse_threadtime(lines), phase_patterns)
+        )
+      finally:
+        lines.close()
+    if output_format == "json":
+      print(json.dumps({"auctions": count, "phases": summary}, indent=2))
+    else:
+      print(auction_phases.format_table(count, summary, phase_patterns))
+
+  def _logcat(self, min_level: str, tags: str, dump: bool) -> Iterator[str]:
+    levels = levels_from(min_level)
+    # Filter on the device too, so unrelated logs never cross adb.
+    args = ["-v", "threadtime"] + (["-d"] if dump else [])
+    args += ["-s"] + [f"{tag}:{levels[0]}" for tag in _tags_or_default(tags)]
+    return self._adb.logcat(args)
+
+
+def levels_from(min_level: str) -> str:
+  """Return the levels at or above a given level, such as `WEF` for `W`."""
+  index = LEVELS.find(str(min_level).upper())
+  if len(str(min_level)) != 1 or index < 0:
+    raise ValueError(
+        f"Expected one of {list(LEVELS)} as level, was {min_level}."
+    )
+  return LEVELS[index:]
+
+
+def _formatter(output_format: str) -> Callable[[LogRecord], str]:
+  if output_format not in _OUTPUT_FORMATS:
+    raise ValueError(
+        f"Expected one of {_OUTPUT_FORMATS} as output format, was"
+        f" {output_format}."
+    )
+  if output_format == OUTPUT_FORMAT_NDJSON:
+    return format_ndjson
+  return format_pretty
+
+
+def _tags_or_default(tags) -> list[str]:
+  return _parse_tags(tags) or flag_constants.LOG_TAGS_FOR_VERBOSE_LOGGING
+
+
+def _parse_tags(tags) -> list[str]:
+  # Fire parses `--tags=a,b` as a tuple.
+  if isinstance(tags, (tuple, list)):
+    return [str(tag) for tag in tags]
+  return [tag for tag in str(tags).split(",") if tag]
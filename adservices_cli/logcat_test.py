@@ -0,0 +1,126 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import fake_adb
+import logcat
+
+_LOGCAT_OUTPUT = """--------- beginning of main
+01-02 03:04:05.678  1234  5678 D adservices.fledge: Running auction: 1
+01-02 03:04:05.679  1234  5679 I ActivityManager: Start proc 4321
+01-02 03:04:05.680  1234  5678 E adservices: Failed: reason
+01-02 03:04:05.681  1234  5678 V adservices.fledge: 
+"""
+
+
+class LogcatTest(absltest.TestCase):
+
+  def test_parse_threadtime(self):
+    records = list(logcat.parse_threadtime(_LOGCAT_OUTPUT.splitlines()))
+
+    self.assertLen(records, 4)
+    self.assertEqual(
+        records[0].to_dict(),
+        {
+            'timestamp': '01-02 03:04:05.678',
+            'pid': 1234,
+            'tid': 5678,
+            'level': 'D',
+            'tag': 'adservices.fledge',
+            'message': 'Running auction: 1',
+        },
+    )
+    self.assertEqual(records[3].message, '')
+
+  def test_filter_records(self):
+    records = logcat.parse_threadtime(_LOGCAT_OUTPUT.splitlines())
+
+    filtered = list(
+        logcat.filter_records(
+            records, ['adservices', 'adservices.fledge'], min_level='D'
+        )
+    )
+
+    self.assertEqual(
+        [record.tag for record in filtered], ['adservices.fledge', 'adservices']
+    )
+
+  def test_stream_ndjson(self):
+    closed = []
+
+    def lines():
+      try:
+        yield from _LOGCAT_OUTPUT.splitlines()
+      finally:
+        closed.append(True)
+
+    adb_client = mock.create_autospec(adb.AdbClient)
+    adb_client.logcat.return_value = lines()
+    output = io.StringIO()
+
+    with contextlib.redirect_stdout(output):
+      logcat.Logs(adb_client).stream(output_format='ndjson', min_level='I')
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    self.assertEqual([record['tag'] for record in records], ['adservices'])
+    args = adb_client.logcat.call_args.args[0]
+    self.assertEqual(args[:2], ['-v', 'threadtime'])
+    self.assertIn('adservices.fledge:I', args)
+    self.assertEqual(closed, [True])
+
+  def test_stream_rejects_unknown_level(self):
+    with self.assertRaises(ValueError):
+      logcat.Logs(mock.create_autospec(adb.AdbClient)).stream(min_level='X')
+
+  def test_stream_from_adb_stops_at_limit(self):
+    fake_adb_dir = self.enter_context(tempfile.TemporaryDirectory())
+    fake_adb.write_fake_adb_executable(fake_adb_dir)
+    logcat_file = os.path.join(fake_adb_dir, 'logcat.txt')
+    with open(logcat_file, 'w') as f:
+      f.write(_LOGCAT_OUTPUT)
+    self.enter_context(
+        mock.patch.dict(
+            os.environ,
+            {
+                'PATH': fake_adb_dir + os.pathsep + os.environ['PATH'],
+                'FAKE_ADB_LOGCAT': logcat_file,
+            },
+        )
+    )
+    output = io.StringIO()
+
+    with contextlib.redirect_stdout(output):
+      logcat.Logs(adb.AdbClient()).stream(limit=2)
+
+    self.assertEqual(
+        output.getvalue().splitlines(),
+        [
+            '01-02 03:04:05.678  1234  5678 D adservices.fledge: Running'
+            ' auction: 1',
+            '01-02 03:04:05.680  1234  5678 E adservices: Failed: reason',
+        ],
+    )
+
+
+if __name__ == '__main__':
+  absltest.main()
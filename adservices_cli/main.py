@@ -14,10 +14,135 @@
 
 """Privacy Sandbox for Android CLI (http://g.co/privacysandbox)."""
 
+import atexit
+import sys
+
 import fire
 import adb
+import adb_server
 import adservices
+import device_cache
+import fleet
+import profiler
+import repl
+
+_TRANSPORT_SUBPROCESS = "subprocess"
+_TRANSPORT_SESSION = "session"
+_TRANSPORT_SERVER = "server"
+_TRANSPORTS = (_TRANSPORT_SUBPROCESS, _TRANSPORT_SESSION, _TRANSPORT_SERVER)
+_ALL_DEVICES = "all"
+
+
+def _create_adb_client(
+    transport: str,
+    serial: str = "",
+    fact_cache: device_cache.DeviceFactsCache | None = None,
+) -> adb.AdbClient:
+  if transport not in _TRANSPORTS:
+    raise ValueError(
+        f"Expected one of {_TRANSPORTS} as transport, was {transport}."
+    )
+  if transport == _TRANSPORT_SERVER:
+    return adb_server.AdbServerClient(serial, fact_cache=fact_cache)
+  return adb.AdbClient(
+      serial,
+      persistent_session=transport == _TRANSPORT_SESSION,
+      fact_cache=fact_cache,
+  )
+
+
+def _parse_serials(serial) -> list[str]:
+  # Fire parses `--serial=a,b` as a tuple and numeric serials as ints.
+  if isinstance(serial, (tuple, list)):
+    serials = [str(s) for s in serial]
+  else:
+    serials = [s for s in str(serial).split(",") if s]
+  if serials == [_ALL_DEVICES]:
+    serials = adb.list_devices()
+    if not serials:
+      raise ValueError("No devices attached.")
+  return serials
+
+
+def _finish_profile(report: bool, trace_file: str):
+  recorded = profiler.stop()
+  if not recorded:
+    return
+  if report:
+    # Keep stdout clean for commands whose output is piped, such as JSON.
+    print(recorded.report(), file=sys.stderr)
+  if trace_file:
+    recorded.write_chrome_trace(trace_file)
+    print(f"Wrote trace to {trace_file}", file=sys.stderr)
+
+
+def main(
+    *,
+    transport: str = _TRANSPORT_SUBPROCESS,
+    serial: str = "",
+    max_workers: int = 8,
+    output_format: str = fleet.OUTPUT_FORMAT_TABLE,
+    cache: bool = True,
+    interactive: bool = False,
+    profile: bool = False,
+    trace_file: str = "",
+) -> adservices.AdServices | fleet.Fleet | None:
+  """Privacy Sandbox for Android CLI (http://g.co/privacysandbox).
+
+  Args:
+    transport: how to reach the device. `subprocess` spawns `adb shell` for
+      every command, `session` reuses a single `adb shell` process and
+      `server` talks to the adb server over TCP without spawning `adb`.
+    serial: serial of the device to use. Use `all` or a comma separated list
+      of serials to run the command on several devices in parallel.
+    max_workers: maximum number of devices to run a command on at once.
+    output_format: `table` or `json`, for commands run on several devices.
+    cache: if true, remember facts such as the SDK version and installed
+      APEX packages until the device reboots.
+    interactive: if true, start a shell which runs commands one per line,
+      keeping the device connection and caches warm between commands.
+    profile: if true, print the time spent in adb and local processing, a
+      latency histogram and the slowest adb calls when the command ends.
+    trace_file: if set, write every adb call and processing step to this
+      file as Chrome trace-event JSON, which opens in https://ui.perfetto.dev.
+
+  Returns:
+    the CLI commands, bound to the selected transport and devices, or None
+    after an interactive shell exits.
+  """
+  if profile or trace_file:
+    profiler.start()
+    # Fire runs the command after main returns, so report when Python exits.
+    atexit.register(_finish_profile, profile, trace_file)
+  serials = _parse_serials(serial)
+  fact_cache = device_cache.DeviceFactsCache() if cache else None
+  adb_clients = []
+
+  def create_adservices(device_serial: str) -> adservices.AdServices:
+    adb_client = _create_adb_client(transport, device_serial, fact_cache)
+    adb_clients.append(adb_client)
+    return adservices.AdServices(adb_client)
+
+  if len(serials) <= 1 and str(serial) != _ALL_DEVICES:
+    component = create_adservices(serials[0] if serials else "")
+  else:
+    component = fleet.Fleet(
+        serials,
+        create_adservices,
+        max_workers=max_workers,
+        output_format=output_format,
+    )
+  if not interactive:
+    return component
+
+  def forget_boot_identities():
+    # Devices may reboot or update an APEX between commands of the shell.
+    for adb_client in adb_clients:
+      adb_client.forget_boot_identity()
+
+  repl.run(component, before_command=forget_boot_identities)
+  return None
 
 
 if __name__ == "__main__":
-  fire.Fire(adservices.AdServices(adb.AdbClient()))
+  fire.Fire(main)
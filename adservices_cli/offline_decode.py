@@ -0,0 +1,223 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Decodes captured ad selection payloads without a device.
+
+A payload is either the JSON output of an ad selection shell command, a bare
+base64 `output_proto`, or the raw bytes of the proto. Every file holds one
+payload. On stdin, every line holds one JSON or base64 payload.
+
+Payloads are decoded in a pool of processes, a bounded number of chunks at a
+time, so memory stays flat however many payloads are read. Every payload
+becomes one line of NDJSON, in input order:
+
+  {"source": "payloads/1.json", "decoded": {...}}
+  {"error": "Error parsing message", "source": "payloads/2.json"}
+"""
+
+import base64
+import binascii
+import collections
+from collections.abc import Iterable, Iterator
+import concurrent.futures
+import functools
+import itertools
+import json
+import os
+import sys
+import zlib
+
+from google.protobuf.message import DecodeError
+
+import ad_selection
+
+# `get-ad-selection-data` without a buyer.
+KIND_SELLER = "seller"
+# `get-ad-selection-data` for a buyer.
+KIND_BUYER = "buyer"
+# `view-auction-result`.
+KIND_AUCTION_RESULT = "auction_result"
+KINDS = (KIND_SELLER, KIND_BUYER, KIND_AUCTION_RESULT)
+
+STDIN = "-"
+_ERROR_PREFIX = '{"error": '
+# Payloads are sent to the workers in chunks, to amortize pickling overhead.
+_CHUNK_SIZE = 32
+# Chunks in flight per worker, which bounds memory use.
+_CHUNKS_PER_WORKER = 4
+
+_DECODERS = {
+    # Payloads are decoded in parallel already, so do not start more
+    # processes per payload.
+    KIND_SELLER: functools.partial(
+        ad_selection.decode_select_ad_request, max_workers=1
+    ),
+    KIND_BUYER: functools.partial(
+        ad_selection.decode_get_bids_request, indent=None
+    ),
+    KIND_AUCTION_RESULT: functools.partial(
+        ad_selection.decode_auction_result, indent=None
+    ),
+}
+
+
+def read_payloads(paths: Iterable[str]) -> Iterator[tuple[str, bytes]]:
+  """Read payloads lazily.
+
+  Args:
+    paths: files, directories to read every file of recursively, or `-` for
+      stdin.
+
+  Yields:
+    the source and content of every payload, in order. Files in directories
+    are read in name order.
+  """
+  for path in paths:
+    if path == STDIN:
+      for line_number, line in enumerate(sys.stdin.buffer, 1):
+        if line.strip():
+          yield f"<stdin>:{line_number}", line
+    elif os.path.isdir(path):
+      for root, directories, files in os.walk(path):
+        directories.sort()
+        for name in sorted(files):
+          file_path = os.path.join(root, name)
+          yield file_path, _read(file_path)
+    else:
+      yield path, _read(path)
+
+
+def payload_proto(content: bytes) -> bytes:
+  """Extract the serialized proto of a payload.
+
+  Args:
+    content: JSON shell command output, base64 or raw proto bytes.
+
+  Raises:
+    ValueError: if the content looks like JSON without an `output_proto`.
+
+  Returns:
+    the serialized proto.
+  """
+  text = content.strip()
+  if text.startswith(b"{"):
+    return ad_selection.output_proto(text.decode("utf-8"))
+  try:
+    return base64.b64decode(b"".join(text.split()), validate=True)
+  except binascii.Error:
+    # Protos are rarely valid base64, so these are raw bytes.
+    return content
+
+
+def decode_payload(kind: str, source: str, content: bytes) -> str:
+  """Decode a payload into a line of NDJSON, without the newline."""
+  try:
+    decoded = _DECODERS[kind](payload_proto(content))
+  except (DecodeError, ValueError, OSError, EOFError, zlib.error) as e:
+    # Corrupt gzipped buyer inputs raise OSError for a bad header, EOFError
+    # for a truncated stream and zlib.error for a bad body.
+    return json.dumps({"error": str(e), "source": source})
+  # Decoded payloads are already JSON, so splice them in rather than decoding
+  # and encoding them again.
+  return f'{{"source": {json.dumps(source)}, "decoded": {decoded}}}'
+
+
+def is_error(line: str) -> bool:
+  """Whether a line from `decode_payload` is an error."""
+  return line.startswith(_ERROR_PREFIX)
+
+
+def decode(
+    payloads: Iterable[tuple[str, bytes]],
+    kind: str = KIND_SELLER,
+    max_workers: int = 0,
+) -> Iterator[str]:
+  """Decode payloads in a pool of processes.
+
+  Args:
+    payloads: source and content of every payload, read lazily.
+    kind: `seller`, `buyer` or `auction_result`.
+    max_workers: maximum number of processes. Defaults to the number of CPUs.
+
+  Raises:
+    ValueError: if the kind is unknown.
+
+  Returns:
+    a line of NDJSON for every payload, in input order, decoded as
+    the payloads are read.
+  """
+  if kind not in KINDS:
+    raise ValueError(f"Expected one of {KINDS} as kind, was {kind}.")
+  return _decode(payloads, kind, max_workers or os.cpu_count() or 1)
+
+
+def _read(path: str) -> bytes:
+  with open(path, "rb") as f:
+    return f.read()
+
+
+def _decode(
+    payloads: Iterable[tuple[str, bytes]], kind: str, workers: int
+) -> Iterator[str]:
+  """Decode payloads a bounded number of chunks at a time."""
+  chunks = _chunks(payloads, _CHUNK_SIZE)
+  pool = None
+  if workers > 1:
+    try:
+      pool = concurrent.futures.ProcessPoolExecutor(workers)
+    except OSError:
+      # Some sandboxes do not allow starting processes.
+      pass
+  if pool is None:
+    for chunk in chunks:
+      yield from _decode_chunk(kind, chunk)
+    return
+  with pool:
+    pending = collections.deque()
+    for chunk in chunks:
+      try:
+        future = pool.submit(_decode_chunk, kind, chunk)
+      except concurrent.futures.BrokenExecutor:
+        future = None
+      pending.append((chunk, future))
+      if len(pending) >= workers * _CHUNKS_PER_WORKER:
+        yield from _result(kind, *pending.popleft())
+    while pending:
+      yield from _result(kind, *pending.popleft())
+
+
+def _chunks(
+    payloads: Iterable[tuple[str, bytes]], size: int
+) -> Iterator[list[tuple[str, bytes]]]:
+  iterator = iter(payloads)
+  while chunk := list(itertools.islice(iterator, size)):
+    yield chunk
+
+
+def _decode_chunk(kind: str, chunk: list[tuple[str, bytes]]) -> list[str]:
+  return [decode_payload(kind, source, content) for source, content in chunk]
+
+
+def _result(
+    kind: str,
+    chunk: list[tuple[str, bytes]],
+    future: concurrent.futures.Future[list[str]] | None,
+) -> list[str]:
+  if future is not None:
+    try:
+      return future.result()
+    except concurrent.futures.BrokenExecutor:
+      pass
+  # A worker died, so decode what is left in this process.
+  return _decode_chunk(kind, chunk)
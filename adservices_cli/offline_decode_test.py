@@ -0,0 +1,198 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import ad_selection
+import adb
+import bidding_auction_servers_pb2
+import offline_decode
+
+
+def _auction_result(index: int) -> bytes:
+  return bidding_auction_servers_pb2.AuctionResult(
+      ad_render_url=f'https://example.com/ad/{index}', bid=index
+  ).SerializeToString()
+
+
+def _command_output(proto: bytes) -> bytes:
+  return json.dumps(
+      {'output_proto': base64.b64encode(proto).decode('utf-8')}
+  ).encode('utf-8')
+
+
+class OfflineDecodeTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.directory = self.enter_context(tempfile.TemporaryDirectory())
+
+  def _write(self, name: str, content: bytes) -> str:
+    path = os.path.join(self.directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+      f.write(content)
+    return path
+
+  def test_payload_proto_formats(self):
+    proto = _auction_result(1)
+    encoded = base64.encodebytes(proto)
+
+    self.assertEqual(
+        offline_decode.payload_proto(_command_output(proto)), proto
+    )
+    self.assertEqual(offline_decode.payload_proto(encoded), proto)
+    self.assertEqual(offline_decode.payload_proto(proto), proto)
+
+  def test_decode_directory_in_name_order(self):
+    self._write('b/2.json', _command_output(_auction_result(2)))
+    self._write('a/1.b64', base64.b64encode(_auction_result(1)))
+    self._write('a/3.bin', _auction_result(3))
+
+    lines = list(
+        offline_decode.decode(
+            offline_decode.read_payloads([self.directory]),
+            offline_decode.KIND_AUCTION_RESULT,
+            max_workers=1,
+        )
+    )
+
+    records = [json.loads(line) for line in lines]
+    self.assertEqual(
+        [
+            os.path.relpath(record['source'], self.directory)
+            for record in records
+        ],
+        ['a/1.b64', 'a/3.bin', 'b/2.json'],
+    )
+    self.assertEqual(
+        records[0]['decoded'],
+        json.loads(ad_selection.decode_auction_result(_auction_result(1))),
+    )
+
+  def test_decode_seller_matches_device_output(self):
+    buyer_input = bidding_auction_servers_pb2.BuyerInput()
+    buyer_input.interest_groups.add(name='shoes', bidding_signals_keys=['key'])
+    auction_input = bidding_auction_servers_pb2.ProtectedAuctionInput(
+        publisher_name='com.example.publisher'
+    )
+    auction_input.buyer_input['buyer.com'] = gzip.compress(
+        buyer_input.SerializeToString()
+    )
+    command_output = _command_output(auction_input.SerializeToString())
+
+    (line,) = offline_decode.decode(
+        [('payload.json', command_output)], max_workers=1
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+      expected = ad_selection._decode_ad_selection_data(
+          command_output.decode('utf-8'), ''
+      )
+    self.assertEqual(json.loads(line)['decoded'], json.loads(expected))
+
+  def test_decode_reports_errors_and_continues(self):
+    lines = list(
+        offline_decode.decode(
+            [
+                ('invalid.json', b'{"no_proto": 1}'),
+                ('valid.bin', _auction_result(1)),
+            ],
+            offline_decode.KIND_AUCTION_RESULT,
+            max_workers=1,
+        )
+    )
+
+    self.assertTrue(offline_decode.is_error(lines[0]))
+    self.assertEqual(json.loads(lines[0])['source'], 'invalid.json')
+    self.assertFalse(offline_decode.is_error(lines[1]))
+
+  def test_decode_reports_corrupt_buyer_input_and_continues(self):
+    payloads = []
+    for name, buyer_input in (
+        # A valid gzip header followed by an invalid deflate block.
+        ('corrupt.json', gzip.compress(b'')[:10] + b'\xff' * 20),
+        ('valid.json', gzip.compress(b'')),
+    ):
+      auction_input = bidding_auction_servers_pb2.ProtectedAuctionInput()
+      auction_input.buyer_input['buyer.com'] = buyer_input
+      payloads.append(
+          (name, _command_output(auction_input.SerializeToString()))
+      )
+
+    lines = list(offline_decode.decode(payloads, max_workers=1))
+
+    self.assertTrue(offline_decode.is_error(lines[0]))
+    self.assertIn('invalid block type', json.loads(lines[0])['error'])
+    self.assertFalse(offline_decode.is_error(lines[1]))
+
+  def test_decode_in_parallel_keeps_order(self):
+    payloads = [(str(index), _auction_result(index)) for index in range(300)]
+
+    parallel = list(
+        offline_decode.decode(
+            payloads, offline_decode.KIND_AUCTION_RESULT, max_workers=2
+        )
+    )
+
+    self.assertEqual(
+        parallel,
+        list(
+            offline_decode.decode(
+                payloads, offline_decode.KIND_AUCTION_RESULT, max_workers=1
+            )
+        ),
+    )
+
+  def test_decode_rejects_unknown_kind(self):
+    with self.assertRaises(ValueError):
+      offline_decode.decode([], 'bidder')
+
+  def test_read_payloads_from_stdin(self):
+    stdin = io.TextIOWrapper(
+        io.BytesIO(base64.b64encode(_auction_result(1)) + b'\n\n{}\n')
+    )
+    self.enter_context(mock.patch('sys.stdin', stdin))
+
+    self.assertEqual(
+        [source for source, _ in offline_decode.read_payloads(['-'])],
+        ['<stdin>:1', '<stdin>:3'],
+    )
+
+  def test_ad_selection_decode_writes_ndjson(self):
+    path = self._write('result.json', _command_output(_auction_result(1)))
+    output = os.path.join(self.directory, 'decoded.ndjson')
+    stderr = io.StringIO()
+
+    with contextlib.redirect_stderr(stderr):
+      ad_selection.AdSelection(mock.create_autospec(adb.AdbClient)).decode(
+          path, kind='auction_result', output=output, max_workers=1
+      )
+
+    with open(output) as f:
+      self.assertLen(f.readlines(), 1)
+    self.assertIn('Decoded 1 payloads, 0 failed.', stderr.getvalue())
+
+
+if __name__ == '__main__':
+  absltest.main()
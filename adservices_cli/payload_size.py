@@ -0,0 +1,203 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Where the bytes of a ProtectedAuctionInput go.
+
+Every buyer input is gzipped on its own in the payload, so buyer sizes are
+exact. Interest groups and fields are compressed together with the rest of
+their buyer input, so their compressed sizes are estimates: the size of the
+same bytes compressed on their own with raw deflate. Buyer inputs which cannot
+be decompressed or decoded are reported separately and left out of the totals.
+"""
+
+import gzip
+import heapq
+from typing import Any
+import zlib
+
+from google.protobuf import message as message_lib
+from google.protobuf.message import DecodeError
+
+import bidding_auction_servers_pb2
+
+# Interest group fields reported individually.
+FIELDS = (
+    "bidding_signals_keys",
+    "ad_render_ids",
+    "component_ads",
+    "user_bidding_signals",
+)
+
+
+def breakdown(
+    auction_input: bidding_auction_servers_pb2.ProtectedAuctionInput,
+    top: int = 10,
+) -> dict[str, Any]:
+  """Measure where the bytes of a payload go.
+
+  Args:
+    auction_input: decoded seller payload, as from `get-ad-selection-data`
+      without a buyer.
+    top: number of largest interest groups to report.
+
+  Returns:
+    total sizes, and compressed size, uncompressed size and share of the
+    total of every buyer, of the `top` largest interest groups and of every
+    interest group field, and the buyers whose input could not be read.
+  """
+  total = auction_input.ByteSize()
+  buyers = []
+  # Smallest of the largest interest groups first.
+  largest = []
+  field_bytes = {field: 0 for field in FIELDS}
+  field_compressed = {field: 0 for field in FIELDS}
+  compressed_total = 0
+  uncompressed_total = 0
+  unreadable_buyers = []
+  for buyer, compressed_buyer_input in auction_input.buyer_input.items():
+    try:
+      serialized = gzip.decompress(compressed_buyer_input)
+      buyer_input = bidding_auction_servers_pb2.BuyerInput.FromString(
+          serialized
+      )
+    except (DecodeError, OSError, EOFError, zlib.error) as e:
+      # Corrupt gzipped buyer inputs raise OSError for a bad header, EOFError
+      # for a truncated stream and zlib.error for a bad body.
+      unreadable_buyers.append({
+          "buyer": buyer,
+          "compressed_bytes": len(compressed_buyer_input),
+          "error": str(e),
+      })
+      continue
+    compressed_total += len(compressed_buyer_input)
+    uncompressed_total += len(serialized)
+    buyers.append({
+        "buyer": buyer,
+        "interest_groups": len(buyer_input.interest_groups),
+        "compressed_bytes": len(compressed_buyer_input),
+        "uncompressed_bytes": len(serialized),
+    })
+    buyer_fields = {field: [] for field in FIELDS}
+    for interest_group in buyer_input.interest_groups:
+      serialized_group = interest_group.SerializeToString()
+      entry = (len(serialized_group), buyer, interest_group.name)
+      if len(largest) < top:
+        heapq.heappush(largest, entry + (serialized_group,))
+      elif entry > largest[0][:3]:
+        heapq.heapreplace(largest, entry + (serialized_group,))
+      for field, data in _field_bytes(interest_group).items():
+        buyer_fields[field].append(data)
+    for field, chunks in buyer_fields.items():
+      data = b"".join(chunks)
+      field_bytes[field] += len(data)
+      field_compressed[field] += _deflated_size(data) if data else 0
+
+  interest_groups = [
+      {
+          "buyer": buyer,
+          "name": name,
+          "compressed_bytes": _deflated_size(serialized_group),
+          "uncompressed_bytes": size,
+      }
+      for size, buyer, name, serialized_group in sorted(largest, reverse=True)
+  ]
+  fields = [
+      {
+          "field": field,
+          "compressed_bytes": field_compressed[field],
+          "uncompressed_bytes": field_bytes[field],
+      }
+      for field in FIELDS
+  ]
+  for entry in buyers + interest_groups + fields:
+    entry["compressed_share"] = _share(
+        entry["compressed_bytes"], compressed_total
+    )
+    entry["uncompressed_share"] = _share(
+        entry["uncompressed_bytes"], uncompressed_total
+    )
+  buyers.sort(key=lambda entry: entry["compressed_bytes"], reverse=True)
+  return {
+      "payload_bytes": total,
+      "compressed_bytes": compressed_total,
+      "uncompressed_bytes": uncompressed_total,
+      "buyers": buyers,
+      "interest_groups": interest_groups,
+      "fields": fields,
+      "unreadable_buyers": unreadable_buyers,
+  }
+
+
+def format_table(report: dict[str, Any]) -> str:
+  """Format a breakdown for reading in a terminal."""
+  lines = [
+      f"Payload: {report['payload_bytes']} bytes, buyer inputs"
+      f" {report['compressed_bytes']} bytes compressed,"
+      f" {report['uncompressed_bytes']} bytes uncompressed",
+  ]
+  for entry in report["unreadable_buyers"]:
+    lines.append(
+        f"Unreadable buyer input of {entry['buyer']}"
+        f" ({entry['compressed_bytes']} bytes): {entry['error']}"
+    )
+  sections = (
+      ("buyer", "buyers", lambda entry: entry["buyer"]),
+      (
+          "interest group",
+          "interest_groups",
+          lambda entry: f"{entry['buyer']}/{entry['name']}",
+      ),
+      ("field", "fields", lambda entry: entry["field"]),
+  )
+  for title, section, name in sections:
+    lines += [
+        "",
+        f"{title:<40}{'compressed':>12}{'share':>8}{'uncompressed':>14}"
+        f"{'share':>8}",
+    ]
+    for entry in report[section]:
+      lines.append(
+          f"{_truncate(name(entry), 39):<40}{entry['compressed_bytes']:>12}"
+          f"{entry['compressed_share']:>8.1%}"
+          f"{entry['uncompressed_bytes']:>14}"
+          f"{entry['uncompressed_share']:>8.1%}"
+      )
+  return "\n".join(lines)
+
+
+def _field_bytes(interest_group: message_lib.Message) -> dict[str, bytes]:
+  """Serialize each reported field of an interest group on its own."""
+  fields = {}
+  for field in FIELDS:
+    only_field = type(interest_group)()
+    value = getattr(interest_group, field)
+    if isinstance(value, str):
+      setattr(only_field, field, value)
+    else:
+      getattr(only_field, field).extend(value)
+    fields[field] = only_field.SerializeToString()
+  return fields
+
+
+def _deflated_size(data: bytes) -> int:
+  compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+  return len(compressor.compress(data) + compressor.flush())
+
+
+def _share(part: int, total: int) -> float:
+  return part / total if total else 0.0
+
+
+def _truncate(text: str, width: int) -> str:
+  return text if len(text) <= width else text[: width - 3] + "..."
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+
+from absl.testing import absltest
+
+import bidding_auction_servers_pb2
+import payload_size
+
+
+def _auction_input() -> bidding_auction_servers_pb2.ProtectedAuctionInput:
+  auction_input = bidding_auction_servers_pb2.ProtectedAuctionInput(
+      publisher_name='com.example.publisher'
+  )
+  for buyer, interest_groups in (('small.com', 1), ('large.com', 20)):
+    buyer_input = bidding_auction_servers_pb2.BuyerInput()
+    for index in range(interest_groups):
+      buyer_input.interest_groups.add(
+          name=f'ca-{index}',
+          bidding_signals_keys=['key'] * index,
+          ad_render_ids=[str(index)],
+          user_bidding_signals='{"signal": 1}',
+      )
+    auction_input.buyer_input[buyer] = gzip.compress(
+        buyer_input.SerializeToString()
+    )
+  return auction_input
+
+
+class PayloadSizeTest(absltest.TestCase):
+
+  def test_buyers(self):
+    auction_input = _auction_input()
+
+    report = payload_size.breakdown(auction_input)
+
+    self.assertEqual(report['payload_bytes'], auction_input.ByteSize())
+    self.assertEqual(
+        [buyer['buyer'] for buyer in report['buyers']],
+        ['large.com', 'small.com'],
+    )
+    large = report['buyers'][0]
+    self.assertEqual(large['interest_groups'], 20)
+    self.assertEqual(
+        large['compressed_bytes'], len(auction_input.buyer_input['large.com'])
+    )
+    self.assertAlmostEqual(
+        sum(buyer['uncompressed_share'] for buyer in report['buyers']), 1
+    )
+
+  def test_largest_interest_groups(self):
+    report = payload_size.breakdown(_auction_input(), top=2)
+
+    self.assertEqual(
+        [group['name'] for group in report['interest_groups']],
+        ['ca-19', 'ca-18'],
+    )
+
+  def test_fields(self):
+    report = payload_size.breakdown(_auction_input())
+
+    fields = {field['field']: field for field in report['fields']}
+    self.assertEqual(list(fields), list(payload_size.FIELDS))
+    self.assertEqual(fields['component_ads']['uncompressed_bytes'], 0)
+    # 21 `user_bidding_signals` fields of a 1 byte tag, 1 byte length and 13
+    # bytes of value.
+    self.assertEqual(
+        fields['user_bidding_signals']['uncompressed_bytes'], 21 * 15
+    )
+    self.assertGreater(
+        fields['bidding_signals_keys']['uncompressed_bytes'],
+        fields['bidding_signals_keys']['compressed_bytes'],
+    )
+
+  def test_unreadable_buyer_inputs(self):
+    auction_input = _auction_input()
+    good = gzip.compress(b'')
+    for buyer, compressed_buyer_input in (
+        ('bad-header.com', b'not gzip'),
+        ('truncated.com', auction_input.buyer_input['large.com'][:-30]),
+        ('bad-body.com', good[:10] + b'\xff' * 20),
+    ):
+      auction_input.buyer_input[buyer] = compressed_buyer_input
+
+    report = payload_size.breakdown(auction_input)
+
+    self.assertCountEqual(
+        [buyer['buyer'] for buyer in report['unreadable_buyers']],
+        ['bad-header.com', 'truncated.com', 'bad-body.com'],
+    )
+    self.assertEqual(
+        [buyer['buyer'] for buyer in report['buyers']],
+        ['large.com', 'small.com'],
+    )
+    self.assertIn(
+        'Unreadable buyer input of bad-body.com',
+        payload_size.format_table(report),
+    )
+
+  def test_format_table(self):
+    table = payload_size.format_table(payload_size.breakdown(_auction_input()))
+
+    self.assertIn('large.com/ca-19', table)
+    self.assertIn('user_bidding_signals', table)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,254 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Capture and analyze Perfetto traces of adservices."""
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+import adb
+import device_utils
+
+DEFAULT_CONFIG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "fledge",
+    "trace_config.textproto",
+)
+DEFAULT_OUTPUT = "adservices.perfetto-trace"
+_REMOTE_CONFIG = "/data/local/tmp/adservices_cli_trace_config.pbtxt"
+# perfetto can only write traces to this directory on user builds.
+_REMOTE_TRACE = "/data/misc/perfetto-traces/adservices_cli.perfetto-trace"
+# traced runs by default from Android 11.
+_TRACED_DEFAULT_SDK = 30
+# perfetto stops itself this long after the requested duration, in case the
+# CLI is killed before it can stop the trace.
+_DURATION_GRACE_MS = 10_000
+_STOP_TIMEOUT_SEC = 30
+# Short traces still give the workload as long as any other adb command.
+_MIN_WORKLOAD_TIMEOUT_SEC = 5
+
+# `size_kb` of top level buffers, but not `buffer_size_kb` of ftrace.
+_BUFFER_SIZE = re.compile(r"^(\s*)size_kb:\s*\d+", re.MULTILINE)
+_ATRACE_CATEGORY = re.compile(
+    r"^(\s*)atrace_categories:\s*\"[^\"]*\"\n", re.MULTILINE
+)
+_DURATION = re.compile(r"^duration_ms:\s*\d+\n", re.MULTILINE)
+
+
+def apply_overrides(
+    config: str,
+    duration_ms: int = 0,
+    buffer_sizes_kb: tuple[int, ...] = (),
+    atrace_categories: tuple[str, ...] = (),
+) -> str:
+  """Override settings of a text format TraceConfig.
+
+  Args:
+    config: TraceConfig in text format.
+    duration_ms: if positive, the duration of the trace.
+    buffer_sizes_kb: size of each buffer, in the order they are defined. A
+      single size applies to all buffers.
+    atrace_categories: if not empty, replaces the atrace categories.
+
+  Returns:
+    the updated config.
+
+  Raises:
+    ValueError: if more buffer sizes are given than the config has buffers.
+  """
+  if buffer_sizes_kb:
+    buffer_count = len(_BUFFER_SIZE.findall(config))
+    if len(buffer_sizes_kb) == 1:
+      buffer_sizes_kb *= buffer_count
+    if len(buffer_sizes_kb) > buffer_count:
+      raise ValueError(
+          f"Expected at most {buffer_count} buffer sizes, got"
+          f" {len(buffer_sizes_kb)}."
+      )
+    sizes = iter(buffer_sizes_kb)
+
+    def replace_size(match: re.Match[str]) -> str:
+      size = next(sizes, None)
+      if size is None:
+        return match.group(0)
+      return f"{match.group(1)}size_kb: {int(size)}"
+
+    config = _BUFFER_SIZE.sub(replace_size, config)
+  if atrace_categories:
+    match = _ATRACE_CATEGORY.search(config)
+    if match is None:
+      raise ValueError("Expected atrace_categories in the trace config.")
+    categories = "".join(
+        f'{match.group(1)}atrace_categories: "{category}"\n'
+        for category in atrace_categories
+    )
+    config = (
+        config[: match.start()]
+        + categories
+        + _ATRACE_CATEGORY.sub("", config[match.start() :])
+    )
+  if duration_ms > 0:
+    config = _DURATION.sub("", config) + f"duration_ms: {duration_ms}\n"
+  return config
+
+
+class Trace:
+  """Capture and analyze Perfetto traces.
+
+  Overview:
+    Traces are recorded with the config in `fledge/trace_config.textproto`,
+    which covers memory, scheduling, binder and WebView activity of
+    adservices, and can be opened in https://ui.perfetto.dev.
+  """
+
+  def __init__(self, adb_client: adb.AdbClient):
+    self._adb = adb_client
+
+  def capture(
+      self,
+      duration: float = 10,
+      output: str = DEFAULT_OUTPUT,
+      workload: str = "",
+      buffer_size_kb=(),
+      atrace_categories=(),
+      config: str = DEFAULT_CONFIG,
+  ):
+    """Record a Perfetto trace and copy it to this machine.
+
+    Tracing runs on-device in the background, so it keeps all events of a
+    workload even while adb is busy. Stop early with Ctrl-C; the trace
+    recorded so far is kept.
+
+    Args:
+      duration: length of the trace, in seconds.
+      output: file to write the trace to.
+      workload: shell command to run on-device once tracing started, such as
+        `am start` of a test app which runs an auction. It should finish
+        within `duration`, or its output is lost, but the trace is kept.
+      buffer_size_kb: size of the trace buffers in KB, either one size for all
+        buffers or comma separated sizes in the order of the config.
+      atrace_categories: comma separated atrace categories to record instead
+        of the ones in the config, such as `aidl,binder_driver`.
+      config: TraceConfig in text format.
+    """
+    with open(config) as f:
+      trace_config = apply_overrides(
+          f.read(),
+          duration_ms=int(duration * 1000) + _DURATION_GRACE_MS,
+          buffer_sizes_kb=_as_tuple(buffer_size_kb),
+          atrace_categories=_as_tuple(atrace_categories),
+      )
+    self._push_config(trace_config)
+    if self._adb.get_sdk_version() < _TRACED_DEFAULT_SDK:
+      self._adb.setprop("persist.traced.enable", "1")
+
+    pid = self._start()
+    start = time.monotonic()
+    print(f"Tracing for {duration}s, press Ctrl-C to stop early.")
+    try:
+      if workload:
+        self._run_workload(workload, duration)
+      remaining = duration - (time.monotonic() - start)
+      if remaining > 0:
+        time.sleep(remaining)
+    except KeyboardInterrupt:
+      pass
+    finally:
+      self._stop(pid)
+
+    self._adb.pull(_REMOTE_TRACE, output)
+    self._adb.shell(f"rm -f {_REMOTE_TRACE} {_REMOTE_CONFIG}", silent=True)
+    print(f"Wrote {os.path.getsize(output)} bytes of trace to {output}.")
+
+  def analyze(self, file: str, top: int = 10, output_format: str = "table"):
+    """Profile adservices in a trace, such as one written by `trace capture`.
+
+    Reports peak and average RSS, time on CPU, low memory kills and the
+    slowest aidl, adservices and WebView sandbox slices. The trace is read
+    one packet at a time, so large traces do not need to fit in memory.
+
+    Args:
+      file: Perfetto trace to read.
+      top: number of slowest slices to show.
+      output_format: `table`, or `json` for a machine readable profile.
+    """
+    import trace_analysis  # pylint: disable=g-import-not-at-top
+
+    if output_format not in ("table", "json"):
+      raise ValueError(
+          "Expected one of ('table', 'json') as output format, was"
+          f" {output_format}."
+      )
+    profile = trace_analysis.analyze(file, top)
+    if output_format == "json":
+      print(json.dumps(profile, indent=2))
+    else:
+      print(trace_analysis.format_profile(profile))
+
+  def _run_workload(self, workload: str, duration: float):
+    timeout = max(duration, _MIN_WORKLOAD_TIMEOUT_SEC)
+    try:
+      print(self._adb.shell(workload, timeout=timeout))
+    except subprocess.TimeoutExpired:
+      print(f"Workload did not finish within {timeout}s, stopping the trace.")
+
+  def _push_config(self, trace_config: str):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "trace_config.pbtxt")
+      with open(path, "w") as f:
+        f.write(trace_config)
+      self._adb.push(path, _REMOTE_CONFIG)
+
+  def _start(self) -> int:
+    # Piping the config works around SELinux denying perfetto access to files
+    # in /data/local/tmp on older releases.
+    output = self._adb.shell(
+        f"cat {_REMOTE_CONFIG} | perfetto --background --txt -c -"
+        f" -o {_REMOTE_TRACE} 2>&1",
+        silent=True,
+    )
+    # With --background, perfetto prints the pid of the tracing process.
+    pids = [line for line in output.splitlines() if line.strip().isdigit()]
+    if not pids:
+      raise RuntimeError(f"Could not start perfetto: {output}")
+    return int(pids[-1])
+
+  def _stop(self, pid: int):
+    # SIGTERM makes perfetto flush its buffers and finish the trace file.
+    self._adb.shell(f"kill -TERM {pid}", silent=True)
+    if not device_utils.wait_until(
+        lambda: not self._is_running(pid), _STOP_TIMEOUT_SEC
+    ):
+      raise TimeoutError(
+          f"perfetto {pid} did not stop within {_STOP_TIMEOUT_SEC}s."
+      )
+
+  def _is_running(self, pid: int) -> bool:
+    return (
+        self._adb.shell(f"test -d /proc/{pid} && echo 1", silent=True) == "1"
+    )
+
+
+def _as_tuple(values) -> tuple[str | int, ...]:
+  # Fire parses `--flag=a,b` as a tuple and `--flag=a` as a single value.
+  if isinstance(values, (tuple, list)):
+    return tuple(values)
+  if values in ("", None):
+    return ()
+  return tuple(value for value in str(values).split(",") if value)
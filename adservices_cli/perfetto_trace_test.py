@@ -0,0 +1,188 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import perfetto_trace
+
+_CONFIG = """buffers {
+  size_kb: 32768
+}
+buffers {
+  size_kb: 8192
+}
+data_sources {
+  config {
+    ftrace_config {
+      buffer_size_kb: 16384
+      atrace_categories: "aidl"
+      atrace_categories: "sched"
+    }
+  }
+}
+"""
+
+
+class ApplyOverridesTest(absltest.TestCase):
+
+  def test_default_config_is_unchanged_without_overrides(self):
+    with open(perfetto_trace.DEFAULT_CONFIG) as f:
+      config = f.read()
+
+    self.assertEqual(perfetto_trace.apply_overrides(config), config)
+
+  def test_one_buffer_size_applies_to_all_buffers(self):
+    config = perfetto_trace.apply_overrides(_CONFIG, buffer_sizes_kb=(4096,))
+
+    self.assertEqual(config.count('size_kb: 4096'), 2)
+    self.assertIn('buffer_size_kb: 16384', config)
+
+  def test_buffer_sizes_in_order(self):
+    config = perfetto_trace.apply_overrides(
+        _CONFIG, buffer_sizes_kb=('1024', '2048')
+    )
+
+    self.assertLess(
+        config.index('size_kb: 1024'), config.index('size_kb: 2048')
+    )
+
+  def test_too_many_buffer_sizes(self):
+    with self.assertRaises(ValueError):
+      perfetto_trace.apply_overrides(_CONFIG, buffer_sizes_kb=(1, 2, 3))
+
+  def test_atrace_categories(self):
+    config = perfetto_trace.apply_overrides(
+        _CONFIG, atrace_categories=('binder_driver',)
+    )
+
+    self.assertIn('      atrace_categories: "binder_driver"\n', config)
+    self.assertNotIn('"aidl"', config)
+    self.assertNotIn('"sched"', config)
+
+  def test_duration(self):
+    config = perfetto_trace.apply_overrides(
+        _CONFIG + 'duration_ms: 1\n', duration_ms=5000
+    )
+
+    self.assertNotIn('duration_ms: 1\n', config)
+    self.assertTrue(config.endswith('duration_ms: 5000\n'))
+
+
+class TraceCaptureTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.adb_client = mock.create_autospec(adb.AdbClient)
+    self.adb_client.get_sdk_version.return_value = 34
+    self.running = True
+
+    def shell(command, silent=False, timeout=5):
+      del silent  # Unused.
+      if command == 'sleep 60':
+        raise subprocess.TimeoutExpired(command, timeout)
+      if 'perfetto --background' in command:
+        return 'Connected to the Perfetto traced service\n4321'
+      if command == 'kill -TERM 4321':
+        self.running = False
+      if command.startswith('test -d /proc/4321'):
+        return '1' if self.running else ''
+      return ''
+
+    self.adb_client.shell.side_effect = shell
+    self.pushed_config = ''
+
+    def push(local, remote):
+      del remote  # Unused.
+      with open(local) as f:
+        self.pushed_config = f.read()
+
+    self.adb_client.push.side_effect = push
+    self.adb_client.pull.side_effect = lambda remote, local: open(
+        local, 'wb'
+    ).close()
+    self.output = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'trace'
+    )
+
+  def test_capture(self):
+    with contextlib.redirect_stdout(io.StringIO()):
+      perfetto_trace.Trace(self.adb_client).capture(
+          duration=0,
+          output=self.output,
+          workload='am start -n com.example/.Auction',
+          buffer_size_kb=65536,
+          atrace_categories=('aidl', 'binder_driver'),
+      )
+
+    commands = [c.args[0] for c in self.adb_client.shell.call_args_list]
+    self.assertIn('am start -n com.example/.Auction', commands)
+    self.assertIn('kill -TERM 4321', commands)
+    self.assertLess(
+        commands.index('am start -n com.example/.Auction'),
+        commands.index('kill -TERM 4321'),
+    )
+    self.assertIn('size_kb: 65536', self.pushed_config)
+    self.assertIn('atrace_categories: "binder_driver"', self.pushed_config)
+    self.assertIn('duration_ms: 10000', self.pushed_config)
+    self.adb_client.setprop.assert_not_called()
+    self.assertTrue(os.path.exists(self.output))
+
+  def test_keeps_trace_of_workload_which_does_not_finish(self):
+    self.enter_context(mock.patch.object(perfetto_trace.time, 'sleep'))
+    stdout = io.StringIO()
+
+    with contextlib.redirect_stdout(stdout):
+      perfetto_trace.Trace(self.adb_client).capture(
+          duration=20, output=self.output, workload='sleep 60'
+      )
+
+    self.adb_client.shell.assert_any_call('sleep 60', timeout=20)
+    self.assertIn('did not finish within 20s', stdout.getvalue())
+    self.adb_client.pull.assert_called_once()
+    commands = [c.args[0] for c in self.adb_client.shell.call_args_list]
+    self.assertTrue(commands[-1].startswith('rm -f '))
+    self.assertTrue(os.path.exists(self.output))
+
+  def test_enables_traced_before_android_11(self):
+    self.adb_client.get_sdk_version.return_value = 29
+
+    with contextlib.redirect_stdout(io.StringIO()):
+      perfetto_trace.Trace(self.adb_client).capture(
+          duration=0, output=self.output
+      )
+
+    self.adb_client.setprop.assert_called_once_with(
+        'persist.traced.enable', '1'
+    )
+
+  def test_perfetto_fails_to_start(self):
+    self.adb_client.shell.side_effect = None
+    self.adb_client.shell.return_value = 'perfetto: not found'
+
+    with self.assertRaisesRegex(RuntimeError, 'not found'):
+      perfetto_trace.Trace(self.adb_client).capture(
+          duration=0, output=self.output
+      )
+
+
+if __name__ == '__main__':
+  absltest.main()
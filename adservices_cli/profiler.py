@@ -0,0 +1,373 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Records every adb round trip and local processing step of a CLI command.
+
+Profiling is off unless `start()` was called, in which case all adb clients
+and instrumented functions record into the active profiler. The recording can
+be summarized as text, or exported as Chrome trace-event JSON which opens in
+https://ui.perfetto.dev.
+"""
+
+import bisect
+from collections.abc import Callable, Iterator
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, TypeVar
+
+CATEGORY_ADB = "adb"
+CATEGORY_CLI = "cli"
+CATEGORY_LOCAL = "local"
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+_HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+_HISTOGRAM_WIDTH = 40
+_DEFAULT_TOP_CALLS = 10
+
+_T = TypeVar("_T")
+
+_active = None
+_active_lock = threading.Lock()
+
+
+class Call:
+  """One recorded adb round trip or local processing step.
+
+  Attributes:
+    name: shell command, or name of the local step.
+    category: `adb`, `local` or `cli`.
+    start: time.perf_counter() at the start of the call, in seconds.
+    duration: duration of the call, in seconds.
+    thread_id: identifier of the thread which made the call.
+    bytes_in: bytes sent to the device.
+    bytes_out: bytes of stdout and stderr received from the device.
+    returncode: exit status of the shell command, or None if unknown.
+  """
+
+  def __init__(
+      self,
+      name: str,
+      category: str,
+      start: float,
+      duration: float,
+      bytes_in: int = 0,
+      bytes_out: int = 0,
+      returncode: int | None = None,
+  ):
+    self.name = name
+    self.category = category
+    self.start = start
+    self.duration = duration
+    self.thread_id = threading.get_ident()
+    self.bytes_in = bytes_in
+    self.bytes_out = bytes_out
+    self.returncode = returncode
+
+
+class Profiler:
+  """Collects calls from every thread of the CLI."""
+
+  def __init__(self):
+    self.start_time = time.perf_counter()
+    self.end_time = None
+    self._calls = []
+    self._lock = threading.Lock()
+
+  @property
+  def calls(self) -> list[Call]:
+    with self._lock:
+      return list(self._calls)
+
+  def add(self, call: Call):
+    with self._lock:
+      self._calls.append(call)
+
+  def finish(self):
+    """Record the end of the profiled command."""
+    if self.end_time is None:
+      self.end_time = time.perf_counter()
+
+  def report(self, top: int = _DEFAULT_TOP_CALLS) -> str:
+    """Summarize the recorded calls.
+
+    Args:
+      top: number of slowest adb calls to list.
+
+    Returns:
+      time spent per category, a latency histogram of adb calls and the
+      slowest adb calls.
+    """
+    calls = self.calls
+    adb_calls = [call for call in calls if call.category == CATEGORY_ADB]
+    local_calls = [call for call in calls if call.category == CATEGORY_LOCAL]
+    total = (self.end_time or time.perf_counter()) - self.start_time
+    adb_time = sum(call.duration for call in adb_calls)
+    local_time = sum(call.duration for call in local_calls)
+
+    lines = [
+        f"Total: {total * 1000:.1f} ms",
+        f"  adb: {adb_time * 1000:.1f} ms in {len(adb_calls)} calls,"
+        f" {sum(call.bytes_in for call in adb_calls)} bytes sent,"
+        f" {sum(call.bytes_out for call in adb_calls)} bytes received",
+    ]
+    local_steps = {}
+    for call in local_calls:
+      count, duration = local_steps.get(call.name, (0, 0.0))
+      local_steps[call.name] = (count + 1, duration + call.duration)
+    for name, (count, duration) in sorted(
+        local_steps.items(), key=lambda item: -item[1][1]
+    ):
+      lines.append(f"  {name}: {duration * 1000:.1f} ms in {count} calls")
+    # With parallel devices, adb calls overlap and may exceed the total.
+    other = max(0.0, total - adb_time - local_time)
+    lines.append(f"  other: {other * 1000:.1f} ms")
+
+    if adb_calls:
+      lines.append("")
+      lines.append("adb call latency:")
+      lines.extend(_histogram([call.duration for call in adb_calls]))
+      lines.append("")
+      lines.append("Slowest adb calls:")
+      for call in sorted(adb_calls, key=lambda call: -call.duration)[:top]:
+        lines.append(
+            f"  {call.duration * 1000:8.1f} ms  exit {call.returncode}"
+            f"  {call.bytes_out:>8} B  {_truncate(call.name)}"
+        )
+    return "\n".join(lines)
+
+  def chrome_trace(self) -> dict[str, Any]:
+    """Return the recorded calls as Chrome trace-event JSON.
+
+    Returns:
+      trace with one complete event per call, on the track of its thread.
+    """
+    pid = os.getpid()
+    events = []
+    if self.end_time is not None:
+      events.append(
+          _trace_event(
+              " ".join(["main.py"] + sys.argv[1:]),
+              CATEGORY_CLI,
+              0,
+              self.end_time - self.start_time,
+              pid,
+              threading.main_thread().ident,
+              {},
+          )
+      )
+    for call in self.calls:
+      args = {}
+      if call.category == CATEGORY_ADB:
+        args = {
+            "bytes_in": call.bytes_in,
+            "bytes_out": call.bytes_out,
+            "returncode": call.returncode,
+        }
+      events.append(
+          _trace_event(
+              call.name,
+              call.category,
+              call.start - self.start_time,
+              call.duration,
+              pid,
+              call.thread_id,
+              args,
+          )
+      )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+  def write_chrome_trace(self, path: str):
+    """Write the recorded calls to a Chrome trace-event JSON file.
+
+    Args:
+      path: location of the trace file.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+      json.dump(self.chrome_trace(), f)
+
+
+def start() -> Profiler:
+  """Start recording calls into a new active profiler.
+
+  Returns:
+    the active profiler.
+  """
+  global _active
+  with _active_lock:
+    _active = Profiler()
+    return _active
+
+
+def stop() -> Profiler | None:
+  """Stop recording calls.
+
+  Returns:
+    the profiler which was active, if any.
+  """
+  global _active
+  with _active_lock:
+    profiler, _active = _active, None
+  if profiler:
+    profiler.finish()
+  return profiler
+
+
+def active() -> Profiler | None:
+  """Return the active profiler, or None if profiling is off."""
+  return _active
+
+
+def record_shell(
+    command: str, run_shell: Callable[[str], tuple[bytes, bytes, int]]
+) -> tuple[bytes, bytes, int]:
+  """Run a shell command, recording it if profiling is on.
+
+  Args:
+    command: shell command to execute on-device.
+    run_shell: runs the command and returns (stdout, stderr, exit code).
+
+  Returns:
+    the result of `run_shell`.
+  """
+  if _active is None:
+    return run_shell(command)
+  start_time = time.perf_counter()
+  returncode = None
+  bytes_out = 0
+  try:
+    stdout, stderr, returncode = run_shell(command)
+    bytes_out = len(stdout) + len(stderr)
+    return stdout, stderr, returncode
+  finally:
+    record_adb_call(command, start_time, bytes_out, returncode)
+
+
+def record_adb_call(
+    command: str, start_time: float, bytes_out: int, returncode: int | None
+):
+  """Record an adb round trip which ends now, if profiling is on.
+
+  Args:
+    command: shell command which was executed on-device.
+    start_time: time.perf_counter() when the command was sent.
+    bytes_out: bytes of stdout and stderr received.
+    returncode: exit status of the command, or None if it failed to run.
+  """
+  profiler = _active
+  if profiler is None:
+    return
+  profiler.add(
+      Call(
+          command,
+          CATEGORY_ADB,
+          start_time,
+          time.perf_counter() - start_time,
+          bytes_in=len(command.encode("utf-8")),
+          bytes_out=bytes_out,
+          returncode=returncode,
+      )
+  )
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = CATEGORY_LOCAL) -> Iterator[None]:
+  """Record the time spent in a block, if profiling is on.
+
+  Args:
+    name: name of the step, such as `jsondiff`.
+    category: category of the step.
+
+  Yields:
+    nothing.
+  """
+  profiler = _active
+  if profiler is None:
+    yield
+    return
+  start_time = time.perf_counter()
+  try:
+    yield
+  finally:
+    profiler.add(
+        Call(name, category, start_time, time.perf_counter() - start_time)
+    )
+
+
+def traced(name: str) -> Callable[[Callable[..., _T]], Callable[..., _T]]:
+  """Decorator which records every call of a function as a local step.
+
+  Args:
+    name: name of the step in reports and traces.
+
+  Returns:
+    the decorator.
+  """
+
+  def decorator(function: Callable[..., _T]) -> Callable[..., _T]:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs) -> _T:
+      with span(name):
+        return function(*args, **kwargs)
+
+    return wrapper
+
+  return decorator
+
+
+def _trace_event(
+    name: str,
+    category: str,
+    start: float,
+    duration: float,
+    pid: int,
+    tid: int,
+    args: dict[str, Any],
+) -> dict[str, Any]:
+  return {
+      "name": name,
+      "cat": category,
+      "ph": "X",
+      "ts": round(start * 1e6, 3),
+      "dur": round(duration * 1e6, 3),
+      "pid": pid,
+      "tid": tid,
+      "args": args,
+  }
+
+
+def _histogram(durations: list[float]) -> list[str]:
+  counts = [0] * (len(_HISTOGRAM_BUCKETS_MS) + 1)
+  for duration in durations:
+    counts[bisect.bisect_left(_HISTOGRAM_BUCKETS_MS, duration * 1000)] += 1
+  largest = max(counts)
+  lines = []
+  for index, count in enumerate(counts):
+    if not count:
+      continue
+    if index < len(_HISTOGRAM_BUCKETS_MS):
+      label = f"<= {_HISTOGRAM_BUCKETS_MS[index]} ms"
+    else:
+      label = f"> {_HISTOGRAM_BUCKETS_MS[-1]} ms"
+    bar = "#" * max(1, round(count / largest * _HISTOGRAM_WIDTH))
+    lines.append(f"  {label:>12} {count:>5} {bar}")
+  return lines
+
+
+def _truncate(text: str, width: int = 80) -> str:
+  return text if len(text) <= width else text[: width - 3] + "..."
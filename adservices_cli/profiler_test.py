@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import profiler
+
+
+class ProfilerTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.addCleanup(profiler.stop)
+
+  def test_records_nothing_when_inactive(self):
+    run_shell = mock.Mock(return_value=(b'out', b'', 0))
+
+    result = profiler.record_shell('echo out', run_shell)
+
+    self.assertEqual(result, (b'out', b'', 0))
+    self.assertIsNone(profiler.active())
+
+  def test_adb_client_records_shell_calls(self):
+    adb_client = adb.AdbClient()
+    self.enter_context(
+        mock.patch.object(
+            adb_client, '_run_shell', return_value=(b'34\n', b'', 0)
+        )
+    )
+    recording = profiler.start()
+
+    adb_client.getprop('ro.build.version.sdk')
+
+    (call,) = recording.calls
+    self.assertEqual(call.name, 'getprop ro.build.version.sdk')
+    self.assertEqual(call.category, profiler.CATEGORY_ADB)
+    self.assertEqual(call.bytes_in, len('getprop ro.build.version.sdk'))
+    self.assertEqual(call.bytes_out, 3)
+    self.assertEqual(call.returncode, 0)
+
+  def test_records_failed_calls(self):
+    recording = profiler.start()
+
+    with self.assertRaises(TimeoutError):
+      profiler.record_shell('sleep 10', mock.Mock(side_effect=TimeoutError))
+
+    (call,) = recording.calls
+    self.assertIsNone(call.returncode)
+
+  def test_traced_records_local_steps(self):
+    @profiler.traced('parse')
+    def parse(text):
+      return text.upper()
+
+    recording = profiler.start()
+
+    self.assertEqual(parse('a'), 'A')
+    (call,) = recording.calls
+    self.assertEqual(call.name, 'parse')
+    self.assertEqual(call.category, profiler.CATEGORY_LOCAL)
+
+  def test_report(self):
+    recording = profiler.start()
+    profiler.record_shell('fast', lambda _: (b'', b'', 0))
+    profiler.record_shell('failing', lambda _: (b'', b'oops', 1))
+    with profiler.span('jsondiff'):
+      pass
+    profiler.stop()
+
+    report = recording.report()
+
+    self.assertIn('adb: ', report)
+    self.assertIn('in 2 calls', report)
+    self.assertIn('jsondiff: ', report)
+    self.assertIn('<= 1 ms', report)
+    self.assertIn('exit 1', report)
+
+  def test_write_chrome_trace(self):
+    recording = profiler.start()
+    profiler.record_shell('true', lambda _: (b'', b'', 0))
+    with profiler.span('jsondiff'):
+      pass
+    profiler.stop()
+    path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'trace.json'
+    )
+
+    recording.write_chrome_trace(path)
+
+    with open(path) as f:
+      events = json.load(f)['traceEvents']
+    self.assertEqual(
+        [event['cat'] for event in events],
+        [
+            profiler.CATEGORY_CLI,
+            profiler.CATEGORY_ADB,
+            profiler.CATEGORY_LOCAL,
+        ],
+    )
+    self.assertTrue(all(event['ph'] == 'X' for event in events))
+    self.assertEqual(events[1]['args']['returncode'], 0)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,240 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Encodes B&A protos as JSON, the same as `MessageToJson` but faster.
+
+`MessageToJson` builds a dict of every message through reflection, then
+`json.dumps` walks it again. This encoder writes JSON straight from
+`ListFields()`, with the key and value encoder of every field worked out once
+per field. The output is identical to `MessageToJson` with its default options
+for the messages in `bidding_auction_servers.proto`, which use no well-known
+types or extensions.
+"""
+
+import base64
+from collections.abc import Callable
+import json
+import math
+from typing import Any, TextIO
+
+from google.protobuf import descriptor
+from google.protobuf import message as message_lib
+from google.protobuf.internal import type_checkers
+
+_Write = Callable[[str], Any]
+_Field = descriptor.FieldDescriptor
+_INT64_TYPES = (
+    _Field.CPPTYPE_INT64,
+    _Field.CPPTYPE_UINT64,
+)
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def to_json(message: message_lib.Message, indent: int | None = 2) -> str:
+  """Encode a message as JSON.
+
+  Args:
+    message: the message to encode.
+    indent: JSON indent, or None for a single line.
+
+  Returns:
+    the same JSON as `MessageToJson(message, indent=indent)`.
+  """
+  parts = []
+  _Encoder(indent).message(message, parts.append, 0)
+  return "".join(parts)
+
+
+def dump(
+    message: message_lib.Message, f: TextIO, indent: int | None = 2
+) -> None:
+  """Encode a message as JSON into a file, without building the string."""
+  _Encoder(indent).message(message, f.write, 0)
+
+
+class _Encoder:
+  """Writes JSON for one indent setting."""
+
+  def __init__(self, indent: int | None):
+    self._indent = indent
+    self._separators = []
+
+  def message(
+      self, message: message_lib.Message, write: _Write, level: int
+  ) -> None:
+    fields = message.ListFields()
+    if not fields:
+      write("{}")
+      return
+    separator, between, close = self.separators(level)
+    separator = "{" + separator
+    for field, value in fields:
+      key, to_json_value, encode = _PLANS[field]
+      if to_json_value is not None:
+        write(separator + key + to_json_value(value))
+      else:
+        write(separator + key)
+        encode(self, value, write, level + 1)
+      separator = between
+    write(close + "}")
+
+  def separators(self, level: int) -> tuple[str, str, str]:
+    """What goes before the first, between and after the items of a level."""
+    while len(self._separators) <= level:
+      if self._indent is None:
+        self._separators.append(("", ", ", ""))
+        continue
+      close = "\n" + " " * (self._indent * len(self._separators))
+      first = close + " " * self._indent
+      self._separators.append((first, "," + first, close))
+    return self._separators[level]
+
+
+_Encode = Callable[[_Encoder, Any, _Write, int], None]
+_ToJsonValue = Callable[[Any], str]
+
+
+class _Plans(dict):
+  """Key and value encoder of every field, worked out on first use.
+
+  Single scalar values are converted by the second item, other values are
+  written by the third.
+  """
+
+  def __missing__(
+      self, field: _Field
+  ) -> tuple[str, _ToJsonValue | None, _Encode | None]:
+    key = _encode_string(field.json_name) + ": "
+    to_json_value = _scalar_to_json(field)
+    if to_json_value is not None and not field.is_repeated:
+      plan = (key, to_json_value, None)
+    else:
+      plan = (key, None, _field_encoder(field))
+    self[field] = plan
+    return plan
+
+
+_PLANS = _Plans()
+
+
+def _field_encoder(field: _Field) -> _Encode:
+  """Build the encoder of a message, repeated or map field."""
+  if (
+      field.type == _Field.TYPE_MESSAGE
+      and field.message_type.GetOptions().map_entry
+  ):
+    return _map_encoder(
+        _value_encoder(field.message_type.fields_by_name["value"])
+    )
+  if field.is_repeated:
+    to_json_value = _scalar_to_json(field)
+    if to_json_value is None:
+      return _list_encoder(_Encoder.message)
+    return _scalar_list_encoder(to_json_value)
+  return _Encoder.message
+
+
+def _map_encoder(encode_value: _Encode) -> _Encode:
+  def encode(encoder: _Encoder, values, write: _Write, level: int) -> None:
+    separator, between, close = encoder.separators(level)
+    separator = "{" + separator
+    for key in values:
+      if isinstance(key, bool):
+        name = "true" if key else "false"
+      else:
+        name = str(key)
+      write(separator + _encode_string(name) + ": ")
+      encode_value(encoder, values[key], write, level + 1)
+      separator = between
+    # ListFields() leaves out empty maps, so there was at least one entry.
+    write(close + "}")
+
+  return encode
+
+
+def _list_encoder(encode_value: _Encode) -> _Encode:
+  def encode(encoder: _Encoder, values, write: _Write, level: int) -> None:
+    separator, between, close = encoder.separators(level)
+    separator = "[" + separator
+    for value in values:
+      write(separator)
+      encode_value(encoder, value, write, level + 1)
+      separator = between
+    # ListFields() leaves out empty repeated fields, so there was at least
+    # one value.
+    write(close + "]")
+
+  return encode
+
+
+def _scalar_list_encoder(to_json_value: _ToJsonValue) -> _Encode:
+  def encode(encoder: _Encoder, values, write: _Write, level: int) -> None:
+    separator, between, close = encoder.separators(level)
+    write(
+        "[" + separator + between.join(map(to_json_value, values)) + close + "]"
+    )
+
+  return encode
+
+
+def _value_encoder(field: _Field) -> _Encode:
+  """Build the encoder of a single value of a field."""
+  to_json_value = _scalar_to_json(field)
+  if to_json_value is None:
+    return _Encoder.message
+
+  def encode(encoder: _Encoder, value, write: _Write, level: int) -> None:
+    del encoder, level  # Unused.
+    write(to_json_value(value))
+
+  return encode
+
+
+def _scalar_to_json(field: _Field) -> _ToJsonValue | None:
+  """The JSON of a scalar value of a field, or None for messages."""
+  if field.cpp_type == _Field.CPPTYPE_MESSAGE:
+    return None
+  if field.cpp_type == _Field.CPPTYPE_ENUM:
+    return lambda value: _enum(field.enum_type, value)
+  if field.type == _Field.TYPE_BYTES:
+    return lambda value: '"' + base64.b64encode(value).decode("utf-8") + '"'
+  if field.cpp_type == _Field.CPPTYPE_STRING:
+    return _encode_string
+  if field.cpp_type == _Field.CPPTYPE_BOOL:
+    return lambda value: "true" if value else "false"
+  if field.cpp_type in _INT64_TYPES:
+    return lambda value: f'"{value}"'
+  if field.cpp_type == _Field.CPPTYPE_FLOAT:
+    return lambda value: _special_float(value) or repr(
+        type_checkers.ToShortestFloat(value)
+    )
+  if field.cpp_type == _Field.CPPTYPE_DOUBLE:
+    return lambda value: _special_float(value) or repr(value)
+  return repr
+
+
+def _enum(enum_type: descriptor.EnumDescriptor, value: int) -> str:
+  enum_value = enum_type.values_by_number.get(value)
+  if enum_value is None:
+    # Open enums keep values they do not know.
+    return repr(value)
+  return _encode_string(enum_value.name)
+
+
+def _special_float(value: float) -> str:
+  if math.isinf(value):
+    return '"-Infinity"' if value < 0 else '"Infinity"'
+  if math.isnan(value):
+    return '"NaN"'
+  return ""
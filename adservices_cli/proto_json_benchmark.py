@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares `MessageToJson` with the direct encoder on large B&A messages.
+
+Builds synthetic messages, so no device is needed:
+
+  python3 proto_json_benchmark.py --interest_groups=5000
+"""
+
+import functools
+import json
+import statistics
+import time
+
+from absl import app
+from absl import flags
+from google.protobuf.json_format import MessageToJson
+
+import bidding_auction_servers_pb2
+import proto_json
+
+_INTEREST_GROUPS = flags.DEFINE_integer(
+    "interest_groups",
+    5000,
+    "Interest groups of the GetBidsRawRequest, and bidding groups of the"
+    " AuctionResult.",
+)
+_RUNS = flags.DEFINE_integer("runs", 5, "Encodes per encoder.")
+
+
+def synthetic_messages(interest_groups: int) -> dict[str, object]:
+  """Build a `GetBidsRawRequest` and `AuctionResult` shaped like real ones."""
+  request = bidding_auction_servers_pb2.GetBidsRequest.GetBidsRawRequest(
+      auction_signals="{}",
+      buyer_signals="{}",
+      seller="seller.example.com",
+      publisher_name="com.example.publisher",
+      client_type=bidding_auction_servers_pb2.CLIENT_TYPE_ANDROID,
+  )
+  for index in range(interest_groups):
+    request.buyer_input.interest_groups.add(
+        name=f"interest-group-{index}",
+        origin="com.example.app",
+        bidding_signals_keys=[f"key-{key}" for key in range(5)],
+        ad_render_ids=[f"ad-{ad}" for ad in range(10)],
+        user_bidding_signals=json.dumps({"index": index}),
+    )
+  result = bidding_auction_servers_pb2.AuctionResult(
+      ad_render_url="https://buyer.example.com/ad",
+      interest_group_name="interest-group-0",
+      interest_group_owner="buyer.example.com",
+      score=0.5,
+      bid=1.25,
+  )
+  for index in range(interest_groups):
+    result.bidding_groups[f"buyer-{index}.example.com"].index.extend(range(5))
+  return {"GetBidsRawRequest": request, "AuctionResult": result}
+
+
+def _measure(encode) -> tuple[list[float], str]:
+  latencies = []
+  for _ in range(_RUNS.value):
+    start = time.perf_counter()
+    encoded = encode()
+    latencies.append(time.perf_counter() - start)
+  return latencies, encoded
+
+
+def main(argv):
+  del argv  # Unused.
+  for name, message in synthetic_messages(_INTEREST_GROUPS.value).items():
+    print(f"{name}, {message.ByteSize() / 1024:.0f} KiB serialized")
+    reflection, expected = _measure(functools.partial(MessageToJson, message))
+    direct, encoded = _measure(functools.partial(proto_json.to_json, message))
+    if encoded != expected:
+      print("FAIL: the direct encoder differs from MessageToJson")
+      return 1
+    for encoder, latencies in (
+        ("MessageToJson", reflection),
+        ("proto_json", direct),
+    ):
+      print(
+          f"  {encoder:<14}median"
+          f" {statistics.median(latencies) * 1000:8.1f} ms"
+          f"  min {min(latencies) * 1000:8.1f} ms"
+      )
+  return 0
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from google.protobuf.json_format import MessageToJson
+
+import bidding_auction_servers_pb2
+import proto_json
+
+
+def _get_bids_raw_request() -> (
+    bidding_auction_servers_pb2.GetBidsRequest.GetBidsRawRequest
+):
+  request = bidding_auction_servers_pb2.GetBidsRequest.GetBidsRawRequest(
+      auction_signals='{"floor": 1.5, "name": "café"}',
+      buyer_signals='{}',
+      seller='seller.com',
+      publisher_name='com.example.publisher',
+      enable_debug_reporting=True,
+      client_type=bidding_auction_servers_pb2.CLIENT_TYPE_ANDROID,
+      # Explicit presence, so zero is listed.
+      buyer_kv_experiment_group_id=0,
+  )
+  request.log_context.generation_id = 'generation'
+  request.consented_debug_config.SetInParent()
+  for index in range(3):
+    request.buyer_input.interest_groups.add(
+        name=f'shoes-{index}\n"quoted"',
+        origin='buyer.com',
+        bidding_signals_keys=['key1', 'key2'],
+        ad_render_ids=[str(ad) for ad in range(index)],
+        user_bidding_signals='{"emoji": "\U0001f45f"}',
+    )
+  request.buyer_input.interest_groups[0].android_signals.SetInParent()
+  request.buyer_input.protected_app_signals.app_install_signals = b'\x00\xff'
+  request.buyer_input.protected_app_signals.encoding_version = 2
+  return request
+
+
+def _auction_result() -> bidding_auction_servers_pb2.AuctionResult:
+  result = bidding_auction_servers_pb2.AuctionResult(
+      ad_render_url='https://buyer.com/ad',
+      ad_component_render_urls=['https://buyer.com/component'],
+      interest_group_owner='buyer.com',
+      # Not exact as a float, so printed with the fewest digits.
+      score=0.1,
+      bid=float('inf'),
+      is_chaff=False,
+      # Unknown enum values are kept as numbers.
+      ad_type=7,
+  )
+  result.win_reporting_urls.buyer_reporting_urls.reporting_url = 'https://r'
+  reporting_urls = (
+      result.win_reporting_urls.buyer_reporting_urls.interaction_reporting_urls
+  )
+  reporting_urls['click'] = 'https://click'
+  reporting_urls['view'] = 'https://view'
+  result.bidding_groups['buyer.com'].index.extend([0, 2])
+  result.bidding_groups['other.com'].SetInParent()
+  result.error.SetInParent()
+  return result
+
+
+class ProtoJsonTest(parameterized.TestCase):
+
+  @parameterized.product(
+      message=(
+          _get_bids_raw_request(),
+          _auction_result(),
+          bidding_auction_servers_pb2.AuctionResult(
+              ad_type=bidding_auction_servers_pb2.AuctionResult.APP_INSTALL_AD,
+              score=float('nan'),
+              bid=float('-inf'),
+          ),
+          bidding_auction_servers_pb2.AuctionResult(),
+      ),
+      indent=(2, 0, None),
+  )
+  def test_same_as_message_to_json(self, message, indent):
+    self.assertEqual(
+        proto_json.to_json(message, indent),
+        MessageToJson(message, indent=indent),
+    )
+
+  def test_dump(self):
+    f = io.StringIO()
+
+    proto_json.dump(_auction_result(), f)
+
+    self.assertEqual(f.getvalue(), MessageToJson(_auction_result()))
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,161 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Interactive shell which runs CLI commands without restarting Python.
+
+The CLI component, its adb transport and caches stay warm between commands, so
+each command only pays for its own device round trips.
+"""
+
+import cmd
+from collections.abc import Callable
+import os
+import shlex
+from typing import Any
+
+import fire
+
+import device_cache
+
+_PROMPT = "adservices> "
+_HISTORY_FILE_NAME = "history"
+_HISTORY_LENGTH = 1000
+_EXIT_COMMANDS = ("exit", "quit")
+
+
+def default_history_path() -> str:
+  """Return the default location of the command history file."""
+  return os.path.join(
+      os.path.dirname(device_cache.default_path()), _HISTORY_FILE_NAME
+  )
+
+
+class Repl(cmd.Cmd):
+  """Reads CLI commands line by line and runs them against one component.
+
+  Each line is parsed exactly like the arguments of `main.py`, for example
+  `custom-audience list --owner-app-package=com.example`.
+  """
+
+  intro = (
+      "Privacy Sandbox for Android CLI. Type a command such as `status`,"
+      " `--help` for the list of commands, or `exit` to quit."
+  )
+  prompt = _PROMPT
+
+  def __init__(
+      self,
+      component: Any,
+      name: str = "main.py",
+      before_command: Callable[[], None] | None = None,
+      **kwargs,
+  ):
+    """Initializes the shell.
+
+    Args:
+      component: CLI component to run commands against, as passed to Fire.
+      name: name of the CLI shown in help output.
+      before_command: if set, called before every command, for example to
+        forget state which may be stale by now.
+      **kwargs: passed to cmd.Cmd, for example `stdin` and `stdout`.
+    """
+    super().__init__(**kwargs)
+    self._component = component
+    self._name = name
+    self._before_command = before_command
+
+  def emptyline(self) -> bool:
+    # cmd.Cmd repeats the previous command by default.
+    return False
+
+  def default(self, line: str) -> bool:
+    if line.strip() in _EXIT_COMMANDS:
+      return True
+    if line.strip() == "EOF":
+      self.stdout.write("\n")
+      return True
+    try:
+      args = shlex.split(line)
+    except ValueError as e:
+      self.stdout.write(f"Error: {e}\n")
+      return False
+    try:
+      if self._before_command:
+        self._before_command()
+      fire.Fire(self._component, command=args, name=self._name)
+    except SystemExit:
+      # Fire exits after printing help or a usage error.
+      pass
+    except KeyboardInterrupt:
+      self.stdout.write("\nInterrupted.\n")
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      self.stdout.write(f"Error: {type(e).__name__}: {e}\n")
+    return False
+
+  def parseline(self, line: str) -> tuple[str, str, str]:
+    # Route every line to default(), as commands are resolved by Fire.
+    return "", line, line
+
+  def completenames(self, text: str, *ignored) -> list[str]:
+    names = [
+        name.replace("_", "-")
+        for name in dir(self._component)
+        if not name.startswith("_")
+    ]
+    return [name for name in names if name.startswith(text)]
+
+
+def run(
+    component: Any,
+    history_path: str = "",
+    before_command: Callable[[], None] | None = None,
+):
+  """Run an interactive shell until the user exits.
+
+  Commands are kept in a history file when readline is available.
+
+  Args:
+    component: CLI component to run commands against.
+    history_path: location of the history file. Defaults to
+      `default_history_path()`.
+    before_command: if set, called before every command.
+  """
+  history_path = history_path or default_history_path()
+  try:
+    import readline  # pylint: disable=g-import-not-at-top
+  except ImportError:
+    readline = None
+  if readline:
+    try:
+      readline.read_history_file(history_path)
+    except OSError:
+      pass
+    readline.set_history_length(_HISTORY_LENGTH)
+  intro = None
+  try:
+    while True:
+      try:
+        Repl(component, before_command=before_command).cmdloop(intro)
+        return
+      except KeyboardInterrupt:
+        # Ctrl+C discards the current line rather than leaving the shell.
+        print("^C")
+        intro = ""
+  finally:
+    if readline:
+      try:
+        os.makedirs(os.path.dirname(history_path), exist_ok=True)
+        readline.write_history_file(history_path)
+      except OSError:
+        pass
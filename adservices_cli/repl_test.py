@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+
+from absl.testing import absltest
+
+import repl
+
+
+class _Counter:
+
+  def __init__(self):
+    self.count = 0
+
+  def increment(self, step: int = 1) -> int:
+    self.count += step
+    return self.count
+
+  def fail(self):
+    raise ValueError('no device')
+
+
+class ReplTest(absltest.TestCase):
+
+  def _run(self, component, lines: list[str], before_command=None) -> str:
+    output = io.StringIO()
+    shell = repl.Repl(
+        component,
+        before_command=before_command,
+        stdin=io.StringIO('\n'.join(lines) + '\n'),
+        stdout=output,
+    )
+    shell.use_rawinput = False
+    with contextlib.redirect_stdout(output):
+      shell.cmdloop(intro='')
+    return output.getvalue()
+
+  def test_component_is_reused_between_commands(self):
+    counter = _Counter()
+
+    output = self._run(counter, ['increment', 'increment --step=2', 'exit'])
+
+    self.assertEqual(counter.count, 3)
+    self.assertIn('1', output)
+    self.assertIn('3', output)
+
+  def test_errors_do_not_end_the_shell(self):
+    counter = _Counter()
+
+    output = self._run(
+        counter, ['fail', 'unknown-command', "'unbalanced", 'increment']
+    )
+
+    self.assertIn('Error: ValueError: no device', output)
+    self.assertIn('Error: No closing quotation', output)
+    self.assertEqual(counter.count, 1)
+
+  def test_empty_line_does_not_repeat_command(self):
+    counter = _Counter()
+
+    self._run(counter, ['increment', '', 'quit'])
+
+    self.assertEqual(counter.count, 1)
+
+  def test_before_command_runs_before_every_command(self):
+    counter = _Counter()
+    counts = []
+
+    self._run(
+        counter,
+        ['increment', 'increment', 'exit'],
+        before_command=lambda: counts.append(counter.count),
+    )
+
+    self.assertEqual(counts, [0, 1])
+
+  def test_completes_command_names(self):
+    shell = repl.Repl(_Counter())
+
+    self.assertEqual(shell.completenames('inc'), ['increment'])
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,188 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Long-lived `adb shell` session shared by many commands.
+
+Spawning `adb shell <command>` for every query costs a process spawn plus a
+round trip to the device before the command even starts. A ShellSession keeps
+one `adb shell` process open and writes each command to its stdin, framed by a
+unique sentinel so that stdout, stderr and the exit code of every command can
+be told apart.
+"""
+
+import queue
+import subprocess
+import threading
+import uuid
+
+_SENTINEL_PREFIX = "__ADSERVICES_CLI_"
+
+
+class ShellSession:
+  """A persistent shell process which runs commands one at a time.
+
+  Each command is wrapped as:
+
+    { <command>
+    } </dev/null; printf '\\n%s %d\\n' <sentinel> $?; printf '\\n%s\\n' \
+        <sentinel> >&2
+
+  The sentinel is unique per command, so output from a previous command which
+  timed out can never be mistaken for the output of the current one.
+
+  Thread-safe: concurrent callers are serialized.
+  """
+
+  def __init__(self, args: list[str]):
+    """Initializes the session. The process is started on first use.
+
+    Args:
+      args: command line that starts an interactive shell reading commands
+        from stdin, for example `["adb", "shell", "-T"]`.
+    """
+    self._args = args
+    self._lock = threading.Lock()
+    self._process = None
+    self._stdout_lines = None
+    self._stderr_lines = None
+
+  def __enter__(self) -> "ShellSession":
+    return self
+
+  def __exit__(self, *unused_exc_info):
+    self.close()
+
+  @property
+  def is_alive(self) -> bool:
+    return self._process is not None and self._process.poll() is None
+
+  def run(self, command: str, timeout: float) -> tuple[bytes, bytes, int]:
+    """Runs a command in the session.
+
+    Args:
+      command: shell command to execute on-device.
+      timeout: seconds to wait for the command to complete.
+
+    Raises:
+      TimeoutExpired: if the command did not complete in time. The session is
+        closed and will be restarted by the next call.
+      OSError: if the shell process exited unexpectedly.
+
+    Returns:
+      tuple of (stdout, stderr, exit code) of the command.
+    """
+    with self._lock:
+      self._ensure_started()
+      sentinel = f"{_SENTINEL_PREFIX}{uuid.uuid4().hex}__"
+      framed = (
+          f"{{ {command}\n}} </dev/null; "
+          f"printf '\\n%s %d\\n' {sentinel} $?; "
+          f"printf '\\n%s\\n' {sentinel} >&2\n"
+      )
+      try:
+        self._process.stdin.write(framed.encode("utf-8"))
+        self._process.stdin.flush()
+        stdout, exit_line = self._read_until(
+            self._stdout_lines, sentinel, command, timeout
+        )
+        stderr, _ = self._read_until(
+            self._stderr_lines, sentinel, command, timeout
+        )
+      except (OSError, subprocess.TimeoutExpired):
+        self._terminate()
+        raise
+      returncode = int(exit_line[len(sentinel) :].strip() or -1)
+      return _strip_frame(stdout), _strip_frame(stderr), returncode
+
+  def close(self):
+    """Stops the shell process if it is running."""
+    with self._lock:
+      if self._process is None:
+        return
+      try:
+        self._process.stdin.write(b"exit\n")
+        self._process.stdin.close()
+        self._process.wait(timeout=1)
+      except (OSError, subprocess.TimeoutExpired):
+        pass
+      self._terminate()
+
+  def _ensure_started(self):
+    if self.is_alive:
+      return
+    self._terminate()
+    self._process = subprocess.Popen(
+        self._args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    self._stdout_lines = _start_line_reader(self._process.stdout)
+    self._stderr_lines = _start_line_reader(self._process.stderr)
+
+  def _terminate(self):
+    if self._process is None:
+      return
+    if self._process.poll() is None:
+      self._process.kill()
+      self._process.wait()
+    self._process = None
+    self._stdout_lines = None
+    self._stderr_lines = None
+
+  def _read_until(
+      self,
+      lines: queue.Queue,
+      sentinel: str,
+      command: str,
+      timeout: float,
+  ) -> tuple[bytes, str]:
+    """Collects lines until one starting with the sentinel is read."""
+    marker = sentinel.encode("utf-8")
+    output = []
+    while True:
+      try:
+        line = lines.get(timeout=timeout)
+      except queue.Empty as e:
+        raise subprocess.TimeoutExpired(command, timeout) from e
+      if line is None:
+        raise OSError(f"Shell exited while running: {command}")
+      if line.startswith(marker):
+        return b"".join(output), line.decode("utf-8")
+      output.append(line)
+
+
+def _start_line_reader(stream) -> queue.Queue:
+  """Reads lines from a stream on a daemon thread.
+
+  Args:
+    stream: binary stream to read from.
+
+  Returns:
+    queue which receives each line, followed by None at end of stream.
+  """
+  lines = queue.Queue()
+
+  def _read():
+    for line in iter(stream.readline, b""):
+      lines.put(line)
+    lines.put(None)
+
+  threading.Thread(target=_read, daemon=True).start()
+  return lines
+
+
+def _strip_frame(output: bytes) -> bytes:
+  # The newline printed before each sentinel ends any unterminated last line.
+  return output[:-1] if output.endswith(b"\n") else output
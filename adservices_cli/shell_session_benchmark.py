@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares per-call latency of the subprocess and session shell transports.
+
+Runs against the fake `adb` executable, so no device is needed:
+
+  python3 shell_session_benchmark.py --calls=200 --spawn_delay_sec=0.01
+"""
+
+import os
+import statistics
+import tempfile
+import time
+
+from absl import app
+from absl import flags
+
+import adb
+import fake_adb
+
+_CALLS = flags.DEFINE_integer("calls", 100, "Shell calls per transport.")
+_SPAWN_DELAY_SEC = flags.DEFINE_float(
+    "spawn_delay_sec",
+    0.0,
+    "Simulated cost of every `adb` invocation connecting to the device.",
+)
+
+
+def _measure(adb_client: adb.AdbClient, calls: int) -> list[float]:
+  latencies = []
+  for _ in range(calls):
+    start = time.perf_counter()
+    adb_client.getprop("ro.build.version.sdk")
+    latencies.append(time.perf_counter() - start)
+  return latencies
+
+
+def main(argv):
+  del argv  # Unused.
+  with tempfile.TemporaryDirectory() as fake_adb_dir:
+    fake_adb.write_fake_adb_executable(fake_adb_dir)
+    os.environ["PATH"] = fake_adb_dir + os.pathsep + os.environ["PATH"]
+    os.environ["FAKE_ADB_SPAWN_DELAY_SEC"] = str(_SPAWN_DELAY_SEC.value)
+
+    session_adb = adb.AdbClient(persistent_session=True)
+    results = {
+        "subprocess": _measure(adb.AdbClient(), _CALLS.value),
+        "session": _measure(session_adb, _CALLS.value),
+    }
+    session_adb.close()
+
+  print(f"{'transport':<12}{'mean ms':>10}{'median ms':>12}{'max ms':>10}")
+  for transport, latencies in results.items():
+    print(
+        f"{transport:<12}"
+        f"{statistics.mean(latencies) * 1000:>10.3f}"
+        f"{statistics.median(latencies) * 1000:>12.3f}"
+        f"{max(latencies) * 1000:>10.3f}"
+    )
+  speedup = statistics.mean(results["subprocess"]) / statistics.mean(
+      results["session"]
+  )
+  print(f"session is {speedup:.1f}x faster per call")
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import adb
+import fake_adb
+import shell_session
+
+
+class ShellSessionTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.session = shell_session.ShellSession(['/bin/sh'])
+
+  def tearDown(self):
+    super().tearDown()
+    self.session.close()
+
+  def test_run_separates_stdout_stderr_and_exit_code(self):
+    stdout, stderr, returncode = self.session.run(
+        'echo out; echo err >&2; false', timeout=5
+    )
+
+    self.assertEqual(stdout, b'out\n')
+    self.assertEqual(stderr, b'err\n')
+    self.assertEqual(returncode, 1)
+
+  def test_run_output_without_trailing_newline(self):
+    stdout, stderr, returncode = self.session.run('printf abc', timeout=5)
+
+    self.assertEqual(stdout, b'abc')
+    self.assertEqual(stderr, b'')
+    self.assertEqual(returncode, 0)
+
+  def test_run_reuses_shell_process(self):
+    first_pid, _, _ = self.session.run('echo $$', timeout=5)
+    second_pid, _, _ = self.session.run('echo $$', timeout=5)
+
+    self.assertEqual(first_pid, second_pid)
+
+  def test_run_does_not_consume_following_commands(self):
+    self.session.run('cat', timeout=5)
+
+    stdout, _, _ = self.session.run('echo next', timeout=5)
+
+    self.assertEqual(stdout, b'next\n')
+
+  def test_run_timeout_restarts_session(self):
+    with self.assertRaises(subprocess.TimeoutExpired):
+      self.session.run('sleep 5', timeout=0.1)
+
+    stdout, _, returncode = self.session.run('echo recovered', timeout=5)
+
+    self.assertEqual(stdout, b'recovered\n')
+    self.assertEqual(returncode, 0)
+
+  def test_run_shell_exit_raises(self):
+    with self.assertRaises(OSError):
+      self.session.run('exit 3', timeout=5)
+
+
+class AdbClientSessionTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    fake_adb_dir = self.enter_context(tempfile.TemporaryDirectory())
+    fake_adb.write_fake_adb_executable(fake_adb_dir)
+    self.enter_context(
+        mock.patch.dict(
+            os.environ,
+            {'PATH': fake_adb_dir + os.pathsep + os.environ['PATH']},
+        )
+    )
+    self.adb = adb.AdbClient(persistent_session=True)
+
+  def tearDown(self):
+    super().tearDown()
+    self.adb.close()
+
+  def test_shell_matches_subprocess_client(self):
+    subprocess_adb = adb.AdbClient()
+
+    for command in ('echo hello', 'echo error >&2', 'printf a\\nb\\n\\n'):
+      self.assertEqual(
+          self.adb.shell(command, silent=True),
+          subprocess_adb.shell(command, silent=True),
+      )
+
+  def test_shell_reuses_session(self):
+    self.adb.shell('FAKE_PROP=value', silent=True)
+
+    self.assertEqual(self.adb.shell('echo $FAKE_PROP', silent=True), 'value')
+
+
+if __name__ == '__main__':
+  absltest.main()
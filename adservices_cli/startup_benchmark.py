@@ -0,0 +1,141 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the startup cost of each CLI subcommand and enforces a budget.
+
+Every measurement runs in a fresh interpreter, which imports `main` and
+resolves the subcommand the way Fire does, without talking to a device:
+
+  python3 startup_benchmark.py --runs=10 --budget_ms=200 --group_budget_ms=400
+
+Exits with a non-zero status if the median cost of a subcommand exceeds its
+budget, or if a subcommand loads a module reserved for other subcommands.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from absl import app
+from absl import flags
+
+_RUNS = flags.DEFINE_integer("runs", 5, "Fresh interpreters per subcommand.")
+_BUDGET_MS = flags.DEFINE_float(
+    "budget_ms",
+    200.0,
+    "Maximum median startup cost of top level commands, such as `status`.",
+)
+_GROUP_BUDGET_MS = flags.DEFINE_float(
+    "group_budget_ms",
+    400.0,
+    "Maximum median startup cost of command groups, such as `ad-selection`.",
+)
+
+# Top level commands, resolved as attributes of the CLI component.
+COMMANDS = ("status", "enable", "disable", "kill", "view_logs_cmd")
+# Command groups and the heavy modules only they may load.
+COMMAND_GROUPS = {
+    "ad_selection": ("google.protobuf", "bidding_auction_servers_pb2"),
+    "custom_audience": ("jsondiff",),
+    "app_signals": (),
+    "dev_session": (),
+    "logs": (),
+    "trace": (),
+}
+HEAVY_MODULES = (
+    "bidding_auction_servers_pb2",
+    "google.protobuf",
+    "jsondiff",
+    "webbrowser",
+)
+
+_CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+getattr(main.main(cache=False), sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = json.loads(sys.argv[2])
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "modules": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+
+def measure_startup(subcommand: str) -> tuple[float, list[str]]:
+  """Measure the startup cost of a subcommand in a fresh interpreter.
+
+  Args:
+    subcommand: attribute of the CLI component, such as `status`.
+
+  Returns:
+    tuple of (milliseconds spent importing and resolving the subcommand,
+    heavy modules loaded while doing so).
+  """
+  result = subprocess.run(
+      [
+          sys.executable,
+          "-c",
+          _CHILD_SCRIPT,
+          subcommand,
+          json.dumps(HEAVY_MODULES),
+      ],
+      capture_output=True,
+      check=True,
+      cwd=os.path.dirname(os.path.abspath(__file__)),
+  )
+  measurement = json.loads(result.stdout.decode("utf-8").splitlines()[-1])
+  return measurement["ms"], measurement["modules"]
+
+
+def unexpected_modules(subcommand: str, modules: list[str]) -> list[str]:
+  """Return heavy modules which a subcommand should not have loaded."""
+  allowed = COMMAND_GROUPS.get(subcommand, ())
+  return [module for module in modules if module not in allowed]
+
+
+def main(argv):
+  del argv  # Unused.
+  failures = []
+  print(f"{'subcommand':<18}{'median ms':>10}{'max ms':>10}{'budget':>8}")
+  for subcommand in COMMANDS + tuple(COMMAND_GROUPS):
+    budget = (
+        _GROUP_BUDGET_MS.value
+        if subcommand in COMMAND_GROUPS
+        else _BUDGET_MS.value
+    )
+    latencies = []
+    for _ in range(_RUNS.value):
+      latency, modules = measure_startup(subcommand)
+      latencies.append(latency)
+    median = statistics.median(latencies)
+    print(
+        f"{subcommand:<18}{median:>10.1f}{max(latencies):>10.1f}{budget:>8.0f}"
+    )
+    if median > budget:
+      failures.append(f"{subcommand} took {median:.1f} ms, budget {budget} ms")
+    unexpected = unexpected_modules(subcommand, modules)
+    if unexpected:
+      failures.append(f"{subcommand} loaded {', '.join(unexpected)}")
+
+  for failure in failures:
+    print(f"FAIL: {failure}")
+  return 1 if failures else 0
+
+
+if __name__ == "__main__":
+  app.run(main)
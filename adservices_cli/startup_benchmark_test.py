@@ -0,0 +1,38 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import startup_benchmark
+
+
+class StartupBudgetTest(parameterized.TestCase):
+
+  @parameterized.parameters(
+      *startup_benchmark.COMMANDS, *startup_benchmark.COMMAND_GROUPS
+  )
+  def test_subcommand_loads_only_its_modules(self, subcommand):
+    _, modules = startup_benchmark.measure_startup(subcommand)
+
+    self.assertEmpty(startup_benchmark.unexpected_modules(subcommand, modules))
+
+  def test_command_groups_load_their_modules(self):
+    _, modules = startup_benchmark.measure_startup('custom_audience')
+
+    self.assertIn('jsondiff', modules)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,373 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline analysis of Perfetto traces of an auction.
+
+Traces are read one packet at a time, so memory use does not depend on the
+size of the trace. A first pass finds the adservices and WebView sandbox
+processes in the process tree, which the ring buffers of
+`fledge/trace_config.textproto` may have written anywhere in the file. A
+second pass then collects memory, scheduling and slice events of those
+processes.
+"""
+
+from collections.abc import Iterator
+import heapq
+from typing import Any, BinaryIO
+
+import constants
+import trace_packet_pb2
+
+_PACKET_FIELD = 1
+_PROCESS_TREE_FIELD = 2
+_WIRE_TYPE_VARINT = 0
+_WIRE_TYPE_FIXED64 = 1
+_WIRE_TYPE_LENGTH_DELIMITED = 2
+_WIRE_TYPE_FIXED32 = 5
+
+# rss_stat members which count towards RSS: file, anonymous and shared memory.
+_RSS_MEMBERS = (0, 1, 3)
+# lmkd reports every kill as an atrace counter, with the killed pid as value.
+_LMK_COUNTER = "kill_one_process"
+_WEBVIEW_SANDBOX = ("webview", "sandboxed_process")
+_AIDL_SLICE_PREFIX = "AIDL::"
+
+CATEGORY_AIDL = "aidl"
+CATEGORY_WEBVIEW = "webview"
+CATEGORY_ADSERVICES = "adservices"
+
+
+def read_packets(f: BinaryIO) -> Iterator[bytes]:
+  """Read the serialized packets of a trace.
+
+  Args:
+    f: trace file, opened in binary mode.
+
+  Yields:
+    each serialized `TracePacket`, in file order.
+
+  Raises:
+    ValueError: if the file is not a trace or ends within a packet.
+  """
+  while True:
+    tag = _read_varint(f)
+    if tag is None:
+      return
+    if tag & 7 != _WIRE_TYPE_LENGTH_DELIMITED:
+      raise ValueError(f"Expected a Perfetto trace, got field tag {tag}.")
+    size = _read_varint(f)
+    payload = f.read(size) if size is not None else b""
+    if size is None or len(payload) < size:
+      raise ValueError("Trace ends within a packet.")
+    if tag >> 3 == _PACKET_FIELD:
+      yield payload
+
+
+def has_field(message: bytes, field_number: int) -> bool:
+  """Return true if a serialized message has a top level field.
+
+  This only walks the field headers, which is much cheaper than parsing
+  messages with large nested fields.
+  """
+  position = 0
+  while position < len(message):
+    tag, position = _decode_varint(message, position)
+    if tag >> 3 == field_number:
+      return True
+    wire_type = tag & 7
+    if wire_type == _WIRE_TYPE_VARINT:
+      _, position = _decode_varint(message, position)
+    elif wire_type == _WIRE_TYPE_FIXED64:
+      position += 8
+    elif wire_type == _WIRE_TYPE_LENGTH_DELIMITED:
+      size, position = _decode_varint(message, position)
+      position += size
+    elif wire_type == _WIRE_TYPE_FIXED32:
+      position += 4
+    else:
+      raise ValueError(f"Unexpected wire type {wire_type}.")
+  return False
+
+
+class Processes:
+  """Processes of interest in a trace.
+
+  Attributes:
+    adservices: pids of the adservices process. There can be several if
+      adservices restarted during the trace.
+    webview: pids of WebView sandbox processes, which run auction JavaScript.
+    tgids: process id of every known thread of those processes.
+  """
+
+  def __init__(self):
+    self.adservices: set[int] = set()
+    self.webview: set[int] = set()
+    self.tgids: dict[int, int] = {}
+
+  def add_tree(self, tree: trace_packet_pb2.ProcessTree):
+    for process in tree.processes:
+      name = process.cmdline[0] if process.cmdline else ""
+      if name.startswith(constants.ADSERVICES_API_PACKAGE):
+        self.adservices.add(process.pid)
+      elif all(part in name for part in _WEBVIEW_SANDBOX):
+        self.webview.add(process.pid)
+      else:
+        continue
+      self.tgids[process.pid] = process.pid
+    for thread in tree.threads:
+      if thread.tgid in self.adservices or thread.tgid in self.webview:
+        self.tgids[thread.tid] = thread.tgid
+
+  def category(self, pid: int) -> str | None:
+    if pid in self.adservices:
+      return CATEGORY_ADSERVICES
+    if pid in self.webview:
+      return CATEGORY_WEBVIEW
+    return None
+
+
+def find_processes(path: str) -> Processes:
+  """Find the adservices and WebView sandbox processes of a trace."""
+  processes = Processes()
+  with open(path, "rb") as f:
+    for payload in read_packets(f):
+      if has_field(payload, _PROCESS_TREE_FIELD):
+        processes.add_tree(
+            trace_packet_pb2.TracePacket.FromString(payload).process_tree
+        )
+  return processes
+
+
+class _Analysis:
+  """State of the second pass over a trace."""
+
+  def __init__(self, processes: Processes, top: int):
+    self.processes = processes
+    self.top = top
+    self.first_timestamp = None
+    self.last_timestamp = 0
+    # Thread running on each cpu, and since when.
+    self.running: dict[int, tuple[int, int]] = {}
+    self.cpu_ns: dict[int, int] = {}
+    # Open atrace slices of each thread.
+    self.stacks: dict[int, list[tuple[int, str, int]]] = {}
+    # Smallest of the slowest slices first, as (duration, start, name, pid).
+    self.slowest: list[tuple[int, int, str, int]] = []
+    self.polled_rss_kb: list[int] = []
+    self.peak_rss_kb = 0
+    self.rss_members: dict[int, dict[int, int]] = {}
+    self.lmk_kills = 0
+    self.killed: list[int] = []
+
+  def add_packet(self, packet: trace_packet_pb2.TracePacket):
+    if packet.HasField("ftrace_events"):
+      self._add_ftrace(packet.ftrace_events)
+    if packet.HasField("process_stats"):
+      self._see(packet.timestamp)
+      for process in packet.process_stats.processes:
+        if process.pid in self.processes.adservices and process.vm_rss_kb:
+          self.polled_rss_kb.append(process.vm_rss_kb)
+          self.peak_rss_kb = max(self.peak_rss_kb, process.vm_rss_kb)
+
+  def _add_ftrace(self, bundle: trace_packet_pb2.FtraceEventBundle):
+    cpu = bundle.cpu
+    for event in bundle.event:
+      timestamp = event.timestamp
+      self._see(timestamp)
+      kind = event.WhichOneof("event")
+      if kind == "sched_switch":
+        self._switch(cpu, event.sched_switch.next_pid, timestamp)
+      elif kind == "print":
+        self._print(event.pid, event.print.buf, timestamp)
+      elif kind == "rss_stat":
+        self._rss_stat(event.pid, event.rss_stat)
+    compact = bundle.compact_sched
+    timestamp = 0
+    for delta, next_pid in zip(
+        compact.switch_timestamp, compact.switch_next_pid
+    ):
+      timestamp += delta
+      self._see(timestamp)
+      self._switch(cpu, next_pid, timestamp)
+
+  def _see(self, timestamp: int):
+    if not timestamp:
+      return
+    if self.first_timestamp is None:
+      self.first_timestamp = timestamp
+    self.last_timestamp = max(self.last_timestamp, timestamp)
+
+  def _switch(self, cpu: int, next_pid: int, timestamp: int):
+    previous = self.running.get(cpu)
+    if previous is not None:
+      tid, since = previous
+      self.cpu_ns[tid] = self.cpu_ns.get(tid, 0) + timestamp - since
+    self.running[cpu] = (next_pid, timestamp)
+
+  def _print(self, tid: int, buf: str, timestamp: int):
+    parts = buf.rstrip("\n").split("|")
+    phase = parts[0]
+    if phase == "B" and len(parts) >= 3:
+      pid = _int(parts[1])
+      if self.processes.category(pid):
+        # Threads created after the process tree was written are only known
+        # from their slices.
+        self.processes.tgids.setdefault(tid, pid)
+      self.stacks.setdefault(tid, []).append((timestamp, parts[2], pid))
+    elif phase == "E":
+      stack = self.stacks.get(tid)
+      if stack:
+        start, name, pid = stack.pop()
+        if self.processes.category(pid):
+          self._add_slice(timestamp - start, start, name, pid)
+    elif phase == "C" and len(parts) >= 4 and parts[2] == _LMK_COUNTER:
+      self.lmk_kills += 1
+      self.killed.append(_int(parts[3]))
+
+  def _add_slice(self, duration: int, start: int, name: str, pid: int):
+    entry = (duration, start, name, pid)
+    if len(self.slowest) < self.top:
+      heapq.heappush(self.slowest, entry)
+    elif entry > self.slowest[0]:
+      heapq.heapreplace(self.slowest, entry)
+
+  def _rss_stat(self, tid: int, rss_stat: trace_packet_pb2.RssStatFtraceEvent):
+    # Events about the memory of other processes cannot be attributed.
+    if rss_stat.HasField("curr") and not rss_stat.curr:
+      return
+    pid = self.processes.tgids.get(tid)
+    if pid not in self.processes.adservices:
+      return
+    members = self.rss_members.setdefault(pid, {})
+    members[rss_stat.member] = rss_stat.size
+    rss_kb = sum(members.get(member, 0) for member in _RSS_MEMBERS) // 1024
+    self.peak_rss_kb = max(self.peak_rss_kb, rss_kb)
+
+  def profile(self) -> dict[str, Any]:
+    duration_ns = self.last_timestamp - (self.first_timestamp or 0)
+    cpu_ns = {CATEGORY_ADSERVICES: 0, CATEGORY_WEBVIEW: 0}
+    for tid, pid in self.processes.tgids.items():
+      category = self.processes.category(pid)
+      cpu_ns[category] += self.cpu_ns.get(tid, 0)
+    slices = []
+    for duration, start, name, pid in sorted(self.slowest, reverse=True):
+      category = self.processes.category(pid)
+      if name.startswith(_AIDL_SLICE_PREFIX):
+        category = CATEGORY_AIDL
+      slices.append({
+          "name": name,
+          "category": category,
+          "pid": pid,
+          "start_ms": _ms(start - (self.first_timestamp or 0)),
+          "duration_ms": _ms(duration),
+      })
+    return {
+        "duration_ms": _ms(duration_ns),
+        "adservices_pids": sorted(self.processes.adservices),
+        "peak_rss_kb": self.peak_rss_kb,
+        "average_rss_kb": (
+            sum(self.polled_rss_kb) // len(self.polled_rss_kb)
+            if self.polled_rss_kb
+            else None
+        ),
+        "cpu_ms": {
+            category: _ms(value) for category, value in cpu_ns.items()
+        },
+        "lmk_kills": self.lmk_kills,
+        "adservices_killed": any(
+            pid in self.processes.adservices for pid in self.killed
+        ),
+        "slowest_slices": slices,
+    }
+
+
+def analyze(path: str, top: int = 10) -> dict[str, Any]:
+  """Profile the adservices process in a trace.
+
+  Args:
+    path: Perfetto trace, for example written by `trace capture`.
+    top: number of slowest slices to report.
+
+  Returns:
+    the profile: duration of the trace, peak RSS and average polled RSS of
+    adservices, time on CPU of adservices and the WebView sandbox, low memory
+    kills and the slowest atrace slices of those processes.
+  """
+  analysis = _Analysis(find_processes(path), top)
+  with open(path, "rb") as f:
+    for payload in read_packets(f):
+      analysis.add_packet(trace_packet_pb2.TracePacket.FromString(payload))
+  return analysis.profile()
+
+
+def format_profile(profile: dict[str, Any]) -> str:
+  """Format a profile for reading in a terminal."""
+  average = profile["average_rss_kb"]
+  lines = [
+      f"Trace duration: {profile['duration_ms']:.1f} ms",
+      "adservices pids: "
+      + (", ".join(map(str, profile["adservices_pids"])) or "not found"),
+      f"Peak RSS: {profile['peak_rss_kb']} KB",
+      f"Average RSS: {'unknown' if average is None else f'{average} KB'}",
+      f"CPU time: adservices {profile['cpu_ms'][CATEGORY_ADSERVICES]:.1f} ms,"
+      f" WebView sandbox {profile['cpu_ms'][CATEGORY_WEBVIEW]:.1f} ms",
+      f"Low memory kills: {profile['lmk_kills']}"
+      + (" (including adservices)" if profile["adservices_killed"] else ""),
+      "",
+      f"{'duration ms':>12}{'start ms':>12}  {'category':<12}name",
+  ]
+  for entry in profile["slowest_slices"]:
+    lines.append(
+        f"{entry['duration_ms']:>12.1f}{entry['start_ms']:>12.1f} "
+        f" {entry['category']:<12}{entry['name']}"
+    )
+  return "\n".join(lines)
+
+
+def _read_varint(f: BinaryIO) -> int | None:
+  result = 0
+  shift = 0
+  while True:
+    byte = f.read(1)
+    if not byte:
+      if shift:
+        raise ValueError("Trace ends within a field header.")
+      return None
+    result |= (byte[0] & 0x7F) << shift
+    if not byte[0] & 0x80:
+      return result
+    shift += 7
+
+
+def _decode_varint(data: bytes, position: int) -> tuple[int, int]:
+  result = 0
+  shift = 0
+  while True:
+    byte = data[position]
+    position += 1
+    result |= (byte & 0x7F) << shift
+    if not byte & 0x80:
+      return result, position
+    shift += 7
+
+
+def _int(value: str) -> int:
+  try:
+    return int(value)
+  except ValueError:
+    return -1
+
+
+def _ms(nanoseconds: int) -> float:
+  return round(nanoseconds / 1e6, 3)
@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import tempfile
+
+from absl.testing import absltest
+
+import trace_analysis
+import trace_packet_pb2
+
+_ADSERVICES_PID = 100
+_WEBVIEW_PID = 200
+_MS = 1_000_000
+
+
+def _print(timestamp: int, tid: int, buf: str) -> trace_packet_pb2.FtraceEvent:
+  event = trace_packet_pb2.FtraceEvent(timestamp=timestamp, pid=tid)
+  event.print.buf = buf
+  return event
+
+
+def _trace() -> trace_packet_pb2.Trace:
+  trace = trace_packet_pb2.Trace()
+
+  # Slices, sched and lmk events come before the process tree, as they can
+  # in a ring buffer trace.
+  ftrace = trace.packet.add().ftrace_events
+  ftrace.cpu = 0
+  ftrace.event.extend([
+      _print(
+          10 * _MS, 101, 'B|100|AIDL::java::IAdSelectionService::selectAds'
+      ),
+      _print(12 * _MS, 101, 'B|100|runAdBiddingPerCA'),
+      _print(15 * _MS, 101, 'E|100'),
+      _print(50 * _MS, 101, 'E|100'),
+      _print(20 * _MS, 201, 'B|200|JsSandbox::evaluateJavascript'),
+      _print(40 * _MS, 201, 'E|200'),
+      # Slices of other processes are ignored.
+      _print(20 * _MS, 301, 'B|300|Choreographer#doFrame'),
+      _print(90 * _MS, 301, 'E|300'),
+      _print(60 * _MS, 42, 'C|42|kill_one_process|300'),
+  ])
+  switch = ftrace.event.add(timestamp=10 * _MS)
+  switch.sched_switch.next_pid = 101
+  compact = ftrace.compact_sched
+  # Runs adservices thread 101 until 30 ms, then the sandbox until 35 ms.
+  compact.switch_timestamp.extend([30 * _MS, 5 * _MS])
+  compact.switch_next_pid.extend([201, 0])
+  rss = ftrace.event.add(timestamp=45 * _MS, pid=101)
+  rss.rss_stat.member = 1
+  rss.rss_stat.size = 300 * 1024 * 1024
+  rss.rss_stat.curr = 1
+
+  tree = trace.packet.add().process_tree
+  tree.processes.add(
+      pid=_ADSERVICES_PID, cmdline=['com.google.android.adservices.api']
+  )
+  tree.processes.add(
+      pid=_WEBVIEW_PID,
+      cmdline=['com.google.android.webview:sandboxed_process0'],
+  )
+  tree.processes.add(pid=300, cmdline=['com.example.app'])
+  tree.threads.add(tid=101, tgid=_ADSERVICES_PID)
+
+  for timestamp, rss_kb in ((100, 200_000), (200, 100_000)):
+    stats = trace.packet.add(timestamp=timestamp * _MS).process_stats
+    stats.processes.add(pid=_ADSERVICES_PID, vm_rss_kb=rss_kb)
+    stats.processes.add(pid=300, vm_rss_kb=900_000)
+  return trace
+
+
+class TraceAnalysisTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.path = os.path.join(
+        self.enter_context(tempfile.TemporaryDirectory()), 'trace'
+    )
+    with open(self.path, 'wb') as f:
+      f.write(_trace().SerializeToString())
+
+  def test_read_packets(self):
+    with open(self.path, 'rb') as f:
+      packets = list(trace_analysis.read_packets(f))
+
+    self.assertLen(packets, 4)
+    self.assertTrue(
+        trace_packet_pb2.TracePacket.FromString(packets[1]).HasField(
+            'process_tree'
+        )
+    )
+
+  def test_read_truncated_trace(self):
+    with open(self.path, 'rb') as f:
+      data = f.read()
+
+    with self.assertRaises(ValueError):
+      list(trace_analysis.read_packets(io.BytesIO(data[:-1])))
+
+  def test_has_field(self):
+    packet = trace_packet_pb2.TracePacket(timestamp=5)
+    packet.process_tree.processes.add(pid=1)
+    payload = packet.SerializeToString()
+
+    self.assertTrue(trace_analysis.has_field(payload, 2))
+    self.assertFalse(trace_analysis.has_field(payload, 9))
+
+  def test_maps_threads_of_a_process_tree_from_the_wire(self):
+    # Encoded by hand with the field numbers of Perfetto's
+    # process_tree.proto, rather than by trace_packet_pb2.
+    cmdline = b'com.google.android.adservices.api'
+    process = b'\x08\x64' + b'\x1a' + bytes([len(cmdline)]) + cmdline
+    # tid 101 (field 1), name "w" (field 2), tgid 100 (field 3).
+    thread = b'\x08\x65' + b'\x12\x01w' + b'\x18\x64'
+    tree = (
+        b'\x0a' + bytes([len(process)]) + process
+        + b'\x12' + bytes([len(thread)]) + thread
+    )
+
+    processes = trace_analysis.Processes()
+    processes.add_tree(trace_packet_pb2.ProcessTree.FromString(tree))
+
+    self.assertEqual(processes.adservices, {_ADSERVICES_PID})
+    self.assertEqual(processes.tgids[101], _ADSERVICES_PID)
+
+  def test_analyze(self):
+    profile = trace_analysis.analyze(self.path, top=2)
+
+    self.assertEqual(profile['adservices_pids'], [_ADSERVICES_PID])
+    self.assertEqual(profile['duration_ms'], 190)
+    self.assertEqual(profile['peak_rss_kb'], 300 * 1024)
+    self.assertEqual(profile['average_rss_kb'], 150_000)
+    self.assertEqual(profile['cpu_ms'], {'adservices': 20, 'webview': 5})
+    self.assertEqual(profile['lmk_kills'], 1)
+    self.assertFalse(profile['adservices_killed'])
+    self.assertEqual(
+        [
+            (entry['category'], entry['duration_ms'])
+            for entry in profile['slowest_slices']
+        ],
+        [('aidl', 40), ('webview', 20)],
+    )
+
+  def test_format_profile(self):
+    text = trace_analysis.format_profile(trace_analysis.analyze(self.path))
+
+    self.assertIn('Peak RSS: 307200 KB', text)
+    self.assertIn('AIDL::java::IAdSelectionService::selectAds', text)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: trace_packet.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12trace_packet.proto\x12\x0fperfetto.protos\"5\n\x05Trace\x12,\n\x06packet\x18\x01 \x03(\x0b\x32\x1c.perfetto.protos.TracePacket\"\xc5\x01\n\x0bTracePacket\x12\x11\n\ttimestamp\x18\x08 \x01(\x04\x12\x39\n\rftrace_events\x18\x01 \x01(\x0b\x32\".perfetto.protos.FtraceEventBundle\x12\x32\n\x0cprocess_tree\x18\x02 \x01(\x0b\x32\x1c.perfetto.protos.ProcessTree\x12\x34\n\rprocess_stats\x18\t \x01(\x0b\x32\x1d.perfetto.protos.ProcessStats\"\xe6\x01\n\x0bProcessTree\x12\x37\n\tprocesses\x18\x01 \x03(\x0b\x32$.perfetto.protos.ProcessTree.Process\x12\x34\n\x07threads\x18\x02 \x03(\x0b\x32#.perfetto.protos.ProcessTree.Thread\x1a\x35\n\x07Process\x12\x0b\n\x03pid\x18\x01 \x01(\x05\x12\x0c\n\x04ppid\x18\x02 \x01(\x05\x12\x0f\n\x07\x63mdline\x18\x03 \x03(\t\x1a\x31\n\x06Thread\x12\x0b\n\x03tid\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04tgid\x18\x03 \x01(\x05\"\x87\x01\n\x0cProcessStats\x12\x38\n\tprocesses\x18\x01 \x03(\x0b\x32%.perfetto.protos.ProcessStats.Process\x1a=\n\x07Process\x12\x0b\n\x03pid\x18\x01 \x01(\x05\x12\x12\n\nvm_size_kb\x18\x02 \x01(\x04\x12\x11\n\tvm_rss_kb\x18\x03 \x01(\x04\"\xd8\x02\n\x11\x46traceEventBundle\x12\x0b\n\x03\x63pu\x18\x01 \x01(\r\x12+\n\x05\x65vent\x18\x02 \x03(\x0b\x32\x1c.perfetto.protos.FtraceEvent\x12\x46\n\rcompact_sched\x18\x04 \x01(\x0b\x32/.perfetto.protos.FtraceEventBundle.CompactSched\x1a\xc0\x01\n\x0c\x43ompactSched\x12\x14\n\x0cintern_table\x18\x05 \x03(\t\x12\x1c\n\x10switch_timestamp\x18\x01 \x03(\x04\x42\x02\x10\x01\x12\x1d\n\x11switch_prev_state\x18\x02 \x03(\x03\x42\x02\x10\x01\x12\x1b\n\x0fswitch_next_pid\x18\x03 \x03(\x05\x42\x02\x10\x01\x12\x1c\n\x10switch_next_prio\x18\x04 \x03(\x05\x42\x02\x10\x01\x12\"\n\x16switch_next_comm_index\x18\x06 \x03(\rB\x02\x10\x01\"\xe5\x01\n\x0b\x46traceEvent\x12\x11\n\ttimestamp\x18\x01 \x01(\x04\x12\x0b\n\x03pid\x18\x02 \x01(\r\x12\x32\n\x05print\x18\x03 \x01(\x0b\x32!.perfetto.protos.PrintFtraceEventH\x00\x12?\n\x0csched_switch\x18\x04 \x01(\x0b\x32\'.perfetto.protos.SchedSwitchFtraceEventH\x00\x12\x38\n\x08rss_stat\x18\xbe\x02 \x01(\x0b\x32#.perfetto.protos.RssStatFtraceEventH\x00\x42\x07\n\x05\x65vent\"+\n\x10PrintFtraceEvent\x12\n\n\x02ip\x18\x01 \x01(\x04\x12\x0b\n\x03\x62uf\x18\x02 \x01(\t\"\x9c\x01\n\x16SchedSwitchFtraceEvent\x12\x11\n\tprev_comm\x18\x01 \x01(\t\x12\x10\n\x08prev_pid\x18\x02 \x01(\x05\x12\x11\n\tprev_prio\x18\x03 \x01(\x05\x12\x12\n\nprev_state\x18\x04 \x01(\x03\x12\x11\n\tnext_comm\x18\x05 \x01(\t\x12\x10\n\x08next_pid\x18\x06 \x01(\x05\x12\x11\n\tnext_prio\x18\x07 \x01(\x05\"O\n\x12RssStatFtraceEvent\x12\x0e\n\x06member\x18\x01 \x01(\x05\x12\x0c\n\x04size\x18\x02 \x01(\x03\x12\x0c\n\x04\x63urr\x18\x03 \x01(\r\x12\r\n\x05mm_id\x18\x04 \x01(\r')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'trace_packet_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_timestamp']._options = None
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_timestamp']._serialized_options = b'\020\001'
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_prev_state']._options = None
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_prev_state']._serialized_options = b'\020\001'
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_next_pid']._options = None
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_next_pid']._serialized_options = b'\020\001'
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_next_prio']._options = None
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_next_prio']._serialized_options = b'\020\001'
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_next_comm_index']._options = None
+  _FTRACEEVENTBUNDLE_COMPACTSCHED.fields_by_name['switch_next_comm_index']._serialized_options = b'\020\001'
+  _TRACE._serialized_start=39
+  _TRACE._serialized_end=92
+  _TRACEPACKET._serialized_start=95
+  _TRACEPACKET._serialized_end=292
+  _PROCESSTREE._serialized_start=295
+  _PROCESSTREE._serialized_end=525
+  _PROCESSTREE_PROCESS._serialized_start=421
+  _PROCESSTREE_PROCESS._serialized_end=474
+  _PROCESSTREE_THREAD._serialized_start=476
+  _PROCESSTREE_THREAD._serialized_end=525
+  _PROCESSSTATS._serialized_start=528
+  _PROCESSSTATS._serialized_end=663
+  _PROCESSSTATS_PROCESS._serialized_start=602
+  _PROCESSSTATS_PROCESS._serialized_end=663
+  _FTRACEEVENTBUNDLE._serialized_start=666
+  _FTRACEEVENTBUNDLE._serialized_end=1010
+  _FTRACEEVENTBUNDLE_COMPACTSCHED._serialized_start=818
+  _FTRACEEVENTBUNDLE_COMPACTSCHED._serialized_end=1010
+  _FTRACEEVENT._serialized_start=1013
+  _FTRACEEVENT._serialized_end=1242
+  _PRINTFTRACEEVENT._serialized_start=1244
+  _PRINTFTRACEEVENT._serialized_end=1287
+  _SCHEDSWITCHFTRACEEVENT._serialized_start=1290
+  _SCHEDSWITCHFTRACEEVENT._serialized_end=1446
+  _RSSSTATFTRACEEVENT._serialized_start=1448
+  _RSSSTATFTRACEEVENT._serialized_end=1527
+# @@protoc_insertion_point(module_scope)
@@ -14,6 +14,14 @@
 
 """Common Utilities for executing AdServices CLI commands."""
 
+import collections
+from collections.abc import Callable, Iterable, Iterator
+import concurrent.futures
+from typing import TypeVar
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
 
 def format_command(
     command_prefix: str,
@@ -51,3 +59,32 @@ def split_adb_command(command: str) -> list[str]:
    (list[str]) list of strings from the command.
   """
   return command.split(" ")
+
+
+def map_bounded(
+    pool: concurrent.futures.Executor,
+    function: Callable[[_T], _R],
+    items: Iterable[_T],
+    max_pending: int,
+) -> Iterator[_R]:
+  """Like `pool.map`, but only reads items as results are consumed.
+
+  `Executor.map` submits every item up front, so it reads all of the items
+  and can hold all of the results in memory at once.
+
+  Args:
+    pool: runs the function.
+    function: applied to every item.
+    items: read lazily.
+    max_pending: maximum number of items submitted but not yet yielded.
+
+  Yields:
+    the result of every item, in the order of the items.
+  """
+  pending = collections.deque()
+  for item in items:
+    pending.append(pool.submit(function, item))
+    if len(pending) >= max_pending:
+      yield pending.popleft().result()
+  while pending:
+    yield pending.popleft().result()